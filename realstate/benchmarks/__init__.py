@@ -0,0 +1,5 @@
+"""Reproducible performance benchmarks for the prediction code.
+
+Run from the Django project directory, e.g. ``python -m benchmarks.bench_predict``.
+``python -m benchmarks.run`` runs the endpoint suite and writes/compares JSON results.
+"""
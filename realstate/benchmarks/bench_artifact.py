@@ -0,0 +1,79 @@
+"""Startup time and per-worker memory: joblib pickle vs the compact artifact.
+
+    python -m benchmarks.bench_artifact [--workers 4]
+
+Exports the legacy pickle to a temporary compact artifact, then starts
+fresh interpreter processes that only import dashboard.ai_model and load
+one of the two. Each reports its load time, RSS, and the private vs shared
+part of its memory from /proc/self/smaps_rollup. --workers processes are
+kept alive together, so the pages they share show up as shared, the way
+they would in a pre-forked server.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from .common import setup_django
+
+CHILD = r'''
+import json, os, sys, time
+started = time.perf_counter()
+from dashboard.ai_model import HousePriceModel
+imported = time.perf_counter()
+model = HousePriceModel(sys.argv[1], version='bench', fast_path=True)
+loaded = time.perf_counter()
+model.warm_up()
+memory = {}
+with open('/proc/self/smaps_rollup') as f:
+    for line in f:
+        key, _, value = line.partition(':')
+        if key in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty', 'Shared_Clean', 'Shared_Dirty'):
+            memory[key] = int(value.split()[0])
+print(json.dumps({'import_ms': (imported - started) * 1000, 'load_ms': (loaded - imported) * 1000,
+                  'sklearn_imported': 'sklearn' in sys.modules, **memory}), flush=True)
+sys.stdin.read()
+'''
+
+
+def measure(path, workers):
+    env = dict(os.environ, PYTHONPATH=os.getcwd() + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    children = [
+        subprocess.Popen([sys.executable, '-W', 'ignore', '-c', CHILD, path], stdin=subprocess.PIPE,
+                         stdout=subprocess.PIPE, text=True, env=env)
+        for _ in range(workers)
+    ]
+    reports = [json.loads(child.stdout.readline()) for child in children]
+    for child in children:
+        child.stdin.close()
+        child.wait()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    setup_django()
+    from dashboard.ai_model import HousePriceModel, export_compact, legacy_model_path
+
+    pickle_path = legacy_model_path()
+    with tempfile.TemporaryDirectory() as root:
+        manifest = export_compact(HousePriceModel(pickle_path, fast_path=True), os.path.join(root, 'compact'))
+        size = sum(os.path.getsize(os.path.join(root, 'compact', f)) for f in os.listdir(os.path.join(root, 'compact')))
+        print(f"artifact size: pickle {os.path.getsize(pickle_path) / 1024:.0f} KiB, compact {size / 1024:.0f} KiB")
+        print(f"{args.workers} workers each   import ms  load ms    RSS MiB  private MiB  shared MiB  sklearn")
+        for label, path in (('pickle', pickle_path), ('compact', manifest)):
+            reports = measure(path, args.workers)
+            mean = {key: sum(r[key] for r in reports) / len(reports) for key in reports[0] if key != 'sklearn_imported'}
+            private = (mean['Private_Clean'] + mean['Private_Dirty']) / 1024
+            shared = (mean['Shared_Clean'] + mean['Shared_Dirty']) / 1024
+            print(f"  {label:<16} {mean['import_ms']:10.0f} {mean['load_ms']:8.1f} {mean['Rss'] / 1024:10.1f} "
+                  f"{private:12.1f} {shared:11.1f}  {reports[0]['sklearn_imported']}")
+
+
+if __name__ == '__main__':
+    main()
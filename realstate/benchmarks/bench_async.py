@@ -0,0 +1,201 @@
+"""Load test: sync views under WSGI vs the async views under ASGI, in process.
+
+    python -m benchmarks.bench_async [--endpoint analyze] [--concurrency 1 8 32 64] [--requests 400]
+
+Each concurrency level runs that many closed-loop clients until --requests
+requests are done. "wsgi" calls the WSGI handler from client threads gated
+by --wsgi-threads, like a threaded WSGI server; "asgi-sync" serves the sync
+views through the ASGI handler (Django runs them one at a time in its sync
+thread); "asgi" drives the dashboard/async/ views from one event loop. No
+HTTP server is involved, so the numbers compare request handling only.
+Rejected (429) requests are counted, not retried.
+"""
+import argparse
+import asyncio
+import io
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from .common import setup_django, synthetic_frame
+
+ENDPOINTS = {
+    # name: (sync path, async path)
+    'analyze': ('/dashboard/api/analyze-property/', '/dashboard/async/api/analyze-property/'),
+    'upload': ('/dashboard/model-prediction/', '/dashboard/async/model-prediction/'),
+    'insights': ('/dashboard/api/market-insights/', '/dashboard/async/api/market-insights/'),
+    'recommendations': ('/dashboard/api/get-recommendations/', '/dashboard/async/api/get-recommendations/'),
+}
+
+
+def request_body(endpoint, upload_rows):
+    if endpoint == 'upload':
+        boundary = 'benchmarkboundary'
+        csv = synthetic_frame(upload_rows, seed=5).to_csv(index=False)
+        body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="upload.csv"\r\n'
+                f'Content-Type: text/csv\r\n\r\n{csv}\r\n--{boundary}--\r\n').encode()
+        return 'POST', body, f'multipart/form-data; boundary={boundary}'
+    if endpoint == 'insights':
+        return 'GET', b'', 'text/plain'
+    payload = {'sqft_living': 1850, 'bedrooms': 3, 'bathrooms': 2, 'quality': 7, 'neighborhood': 'CollgCr',
+               'year_built': 1998, 'lot_area': 9000, 'garage_cars': 2, 'budget': 250000}
+    return 'POST', json.dumps(payload).encode(), 'application/json'
+
+
+def summarize(latencies, statuses, seconds):
+    ok = [latency for latency, status in zip(latencies, statuses) if status == 200]
+    quantiles = statistics.quantiles(ok, n=100) if len(ok) > 1 else [ok[0] if ok else 0.0] * 99
+    return {
+        'requests': len(statuses),
+        'ok': len(ok),
+        'rejected': statuses.count(429),
+        'errors': len(statuses) - len(ok) - statuses.count(429),
+        'throughput': len(ok) / seconds,
+        'p50_ms': quantiles[49] * 1000,
+        'p95_ms': quantiles[94] * 1000,
+        'p99_ms': quantiles[98] * 1000,
+    }
+
+
+def run_wsgi(path, method, body, content_type, clients, total, server_threads):
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+    gate = threading.Semaphore(server_threads)
+    latencies, statuses = [], []
+    remaining = iter(range(total))
+    lock = threading.Lock()
+
+    def call():
+        environ = {}
+        setup_testing_defaults(environ)
+        environ.update({
+            'REQUEST_METHOD': method, 'PATH_INFO': path, 'HTTP_HOST': 'localhost',
+            'CONTENT_TYPE': content_type, 'CONTENT_LENGTH': str(len(body)), 'wsgi.input': io.BytesIO(body),
+        })
+        status = []
+        with gate:
+            chunks = application(environ, lambda s, headers, exc_info=None: status.append(int(s.split()[0])))
+            b''.join(chunks)
+        return status[0]
+
+    def client():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            status = call()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                statuses.append(status)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        for _ in range(clients):
+            pool.submit(client)
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+async def asgi_call(application, path, method, body, content_type):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'content-type', content_type.encode()),
+                    (b'content-length', str(len(body)).encode())],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    pending = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    disconnected = asyncio.get_running_loop().create_future()
+    status = []
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        # no disconnect until the response is complete
+        return await disconnected
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            if not disconnected.done():
+                disconnected.set_result({'type': 'http.disconnect'})
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def run_asgi(path, method, body, content_type, clients, total):
+    from django.core.asgi import get_asgi_application
+    application = get_asgi_application()
+
+    async def main():
+        latencies, statuses = [], []
+        remaining = iter(range(total))
+
+        async def client():
+            while next(remaining, None) is not None:
+                started = time.perf_counter()
+                status = await asgi_call(application, path, method, body, content_type)
+                latencies.append(time.perf_counter() - started)
+                statuses.append(status)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        return summarize(latencies, statuses, time.perf_counter() - started)
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoint', choices=list(ENDPOINTS), default='analyze')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--wsgi-threads', type=int, default=8, help='Worker threads of the simulated WSGI server')
+    parser.add_argument('--upload-rows', type=int, default=100)
+    parser.add_argument('--modes', nargs='+', choices=['wsgi', 'asgi-sync', 'asgi'], default=['wsgi', 'asgi-sync', 'asgi'])
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    setup_django()
+    import logging
+    from django.test.runner import DiscoverRunner
+    from dashboard.ai_model import get_model
+    from dashboard.comparables import get_index
+
+    logging.disable(logging.WARNING)
+    runner = DiscoverRunner(verbosity=0)
+    databases = runner.setup_databases()
+    try:
+        get_model()
+        get_index()
+        sync_path, async_path = ENDPOINTS[args.endpoint]
+        method, body, content_type = request_body(args.endpoint, args.upload_rows)
+        results = []
+        for clients in args.concurrency:
+            for mode in args.modes:
+                if mode == 'wsgi':
+                    stats = run_wsgi(sync_path, method, body, content_type, clients, args.requests, args.wsgi_threads)
+                else:
+                    path = async_path if mode == 'asgi' else sync_path
+                    stats = run_asgi(path, method, body, content_type, clients, args.requests)
+                results.append({'mode': mode, 'clients': clients, **stats})
+    finally:
+        runner.teardown_databases(databases)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.endpoint}: {args.requests} requests per run, WSGI server threads={args.wsgi_threads}")
+    print(f"{'mode':<10} {'clients':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'429':>5} {'err':>4}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['clients']:>7} {r['throughput']:9.1f} {r['p50_ms']:9.1f} {r['p95_ms']:9.1f} "
+              f"{r['p99_ms']:9.1f} {r['rejected']:>5} {r['errors']:>4}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Comparables index build time, query latency and add latency at 10k/100k/1M sales.
+
+    python -m benchmarks.bench_comparables [--sizes 10000 100000 1000000] [--queries 1000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from .common import setup_django, synthetic_frame
+
+
+def sales_frame(rows, seed=0):
+    from dashboard import datasets
+    from dashboard.comparables import FEATURES
+    frame = synthetic_frame(rows, seed=seed)[FEATURES + ['Neighborhood']]
+    prices = datasets.read('train.csv', columns=['SalePrice'], raw=True)['SalePrice'].to_numpy()
+    frame['SalePrice'] = np.random.default_rng(seed).choice(prices, rows)
+    # small jitter so synthetic rows are not exact duplicates of train.csv values
+    frame['GrLivArea'] += np.random.default_rng(seed + 1).normal(0, 25, rows)
+    frame['id'] = 'bench:' + pd.Series(np.arange(rows)).astype(str)
+    return frame
+
+
+def latencies(func, queries):
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        func(query)
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from dashboard.comparables import FEATURES, ComparablesIndex
+
+    for size in args.sizes:
+        frame = sales_frame(size)
+        queries = sales_frame(args.queries, seed=1)[FEATURES + ['Neighborhood']].to_dict('records')
+        print(f"{size:,} sales")
+        for backend, brute_force_rows in (('brute-force', size + 1), ('kd-tree', None)):
+            started = time.perf_counter()
+            index = ComparablesIndex(frame, brute_force_rows=brute_force_rows)
+            built = time.perf_counter() - started
+            p50, p99 = latencies(lambda q: index.query(q, q['Neighborhood'], args.k), queries)
+            all_p50, all_p99 = latencies(lambda q: index.query(q, None, args.k), queries[:100])
+            print(f"  {backend:<12} build {built:6.2f} s  neighborhood p50 {p50:6.3f} ms p99 {p99:6.3f} ms  "
+                  f"all neighborhoods p50 {all_p50:6.3f} ms p99 {all_p99:6.3f} ms")
+        adds = sales_frame(args.queries, seed=2).to_dict('records')
+        started = time.perf_counter()
+        for sale in adds:
+            index.add(sale['id'] + 'new', sale['Neighborhood'], sale, sale['SalePrice'])
+        print(f"  add          {(time.perf_counter() - started) / len(adds) * 1000:6.3f} ms per sale")
+
+
+if __name__ == '__main__':
+    main()
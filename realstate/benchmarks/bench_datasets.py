@@ -0,0 +1,68 @@
+"""Parse time and in-memory size: pd.read_csv vs the typed columnar cache (dashboard.datasets).
+
+    python -m benchmarks.bench_datasets [--scale 1 100] [--repeat 5]
+
+--scale N concatenates N copies of each CSV (row ids renumbered) into a
+temporary file, so the larger runs show how both readers grow. Each run
+compares the full CSV parse with a typed read, a raw read (read_csv
+dtypes), and the column projection market insights uses.
+"""
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+from .common import best_of, dataset_path, setup_django
+
+
+def megabytes(frame):
+    return frame.memory_usage(deep=True).sum() / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--files', nargs='+', default=['train.csv', 'test.csv'])
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import override_settings
+    from dashboard import datasets
+    from dashboard.insights import SNAPSHOT_COLUMNS
+
+    with tempfile.TemporaryDirectory() as root, override_settings(HOUSE_PRICE_DATASET_CACHE_DIR=root):
+        print(f"{'file':<22} {'reader':<18} {'ms':>9} {'MB':>8} {'x time':>7} {'x size':>7}")
+        for name in args.files:
+            for scale in args.scale:
+                path = dataset_path(name)
+                if scale > 1:
+                    frame = pd.read_csv(path)
+                    frame = pd.concat([frame] * scale, ignore_index=True)
+                    frame['Id'] = range(1, len(frame) + 1)
+                    path = os.path.join(root, f'{scale}x-{name}')
+                    frame.to_csv(path, index=False)
+                label = f'{name} x{scale}'
+                build = best_of(lambda: datasets.build(path, os.path.join(root, 'build-probe', label), 'probe'), 1)
+                datasets.read(path)
+                csv = pd.read_csv(path)
+                runs = [
+                    ('read_csv', lambda: pd.read_csv(path)),
+                    ('typed', lambda: datasets.read(path)),
+                    ('raw', lambda: datasets.read(path, raw=True)),
+                ]
+                if 'SalePrice' in csv.columns:
+                    runs.append(('insights columns', lambda: datasets.read(path, columns=SNAPSHOT_COLUMNS)))
+                baseline_seconds, baseline_size = None, megabytes(csv)
+                for reader, func in runs:
+                    seconds = best_of(func, args.repeat)
+                    size = megabytes(func())
+                    baseline_seconds = baseline_seconds or seconds
+                    print(f"{label:<22} {reader:<18} {seconds * 1000:9.1f} {size:8.2f} "
+                          f"{baseline_seconds / seconds:7.1f} {baseline_size / size:7.1f}")
+                print(f"{label:<22} {'(one-off build)':<18} {build * 1000:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
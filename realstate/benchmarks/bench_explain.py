@@ -0,0 +1,85 @@
+"""Cost of per-prediction feature contributions (dashboard.explanations).
+
+    python -m benchmarks.bench_explain [--rows 10000] [--exact-rows 200] [--top 5]
+
+On `rows` synthetic properties it times a plain prediction, Saabas
+contributions with an empty and with a warm prediction cache, and turning
+them into top-N JSON rows. Exact TreeSHAP is timed on --exact-rows rows
+and scaled up, since a full run takes close to a minute per 10k rows on one
+core. The same rows also show how close Saabas gets to TreeSHAP: how often
+the largest contribution names the same feature, and the rank correlation
+of the |contribution| orderings. Last, the one-off global importance.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from .common import best_of, setup_django, synthetic_frame
+
+
+def rank_correlation(a, b):
+    ranks_a, ranks_b = np.argsort(np.argsort(a)), np.argsort(np.argsort(b))
+    return np.corrcoef(ranks_a, ranks_b)[0, 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--exact-rows', type=int, default=200)
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import override_settings
+    from dashboard.ai_model import HousePriceModel, legacy_model_path
+    from dashboard.explanations import SAABAS, TREE_SHAP, compute_importance, explain_frame
+    from dashboard.prediction_cache import get_prediction_cache
+
+    model = HousePriceModel(legacy_model_path())
+    frame = synthetic_frame(args.rows, seed=1)
+    cache = get_prediction_cache()
+
+    def cold(method):
+        cache.cache.clear()
+        return explain_frame(model, frame, method=method)
+
+    with override_settings(HOUSE_PRICE_EXPLAIN_MAX_ROWS=args.rows, HOUSE_PRICE_PREDICTION_CACHE_MAX_ROWS=args.rows):
+        predict = best_of(lambda: model.predict_frame(frame), args.repeat)
+        saabas = best_of(lambda: cold(SAABAS), args.repeat)
+        explanation = explain_frame(model, frame, method=SAABAS)
+        warm = best_of(lambda: explain_frame(model, frame, method=SAABAS), args.repeat)
+        serialize = best_of(lambda: explanation.rows(args.top), args.repeat)
+        sample = frame.iloc[:args.exact_rows]
+        cache.cache.clear()
+        started = time.perf_counter()
+        exact = explain_frame(model, sample, method=TREE_SHAP)
+        exact_seconds = (time.perf_counter() - started) * args.rows / len(sample)
+
+    print(f"{args.rows} rows, model {model.version} ({len(model.feature_names)} features)")
+    print(f"{'step':<38} {'ms':>10} {'x predict':>10} {'us/row':>8}")
+    for label, seconds in (
+        ('predict_frame', predict),
+        ('Saabas contributions, cold cache', saabas),
+        ('Saabas contributions, warm cache', warm),
+        (f'top-{args.top} JSON rows', serialize),
+        (f'TreeSHAP (scaled from {len(sample)} rows)', exact_seconds),
+    ):
+        print(f"{label:<38} {seconds * 1000:10.1f} {seconds / predict:10.1f} {seconds / args.rows * 1e6:8.1f}")
+
+    approx = explanation.contributions[:len(sample)].astype(np.float64)
+    shap = exact.contributions.astype(np.float64)
+    additivity = np.abs(approx.sum(axis=1) + explanation.base_value - explanation.predictions[:len(sample)]).max()
+    same_top = np.mean(np.abs(approx).argmax(axis=1) == np.abs(shap).argmax(axis=1))
+    correlation = np.mean([rank_correlation(np.abs(a), np.abs(s)) for a, s in zip(approx, shap)])
+    print(f"\nSaabas vs TreeSHAP on {len(sample)} rows: same top feature {same_top:.0%}, "
+          f"mean rank correlation {correlation:.3f}, max additivity error ${additivity:.2f}")
+
+    importance = compute_importance(model)
+    top = ', '.join(f"{entry['feature']} {entry['share']:.0%}" for entry in importance['features'][:5])
+    print(f"global importance over {importance['rows']} rows: {importance['seconds']:.2f}s once per version ({top})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Per-instance get_property_features against the columnar build_feature_frame.
+
+    python -m benchmarks.bench_features [--rows 100000]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from .common import best_of, setup_django
+
+
+def source_rows(rows, seed=0):
+    """values()-style dicts for synthetic submissions"""
+    from dashboard.features import SOURCE_FIELDS
+    rng = np.random.default_rng(seed)
+    qualities = np.array(['excellent', 'good', 'average', 'fair', 'poor', 'none'], dtype=object)
+    types = np.array(['single_family', 'townhouse', 'condo', 'multi_family', 'luxury', 'commercial', 'land'], dtype=object)
+    columns = {
+        'property_type': rng.choice(types, rows),
+        'neighborhood': rng.choice(np.array(['NAmes', 'CollgCr', 'OldTown', 'Edwards'], dtype=object), rows),
+        'bedrooms': rng.integers(1, 7, rows),
+        'bathrooms': rng.choice([1.0, 1.5, 2.0, 2.5, 3.0], rows),
+        'living_area': rng.integers(600, 4500, rows),
+        'lot_area': rng.integers(1500, 40000, rows),
+        'year_built': rng.integers(1900, 2024, rows),
+        'year_remodeled': np.where(rng.random(rows) < 0.5, None, rng.integers(1950, 2024, rows)),
+        'overall_quality': rng.integers(1, 11, rows),
+        'overall_condition': rng.integers(1, 11, rows),
+        'garage_cars': rng.integers(0, 4, rows),
+        'garage_area': rng.integers(0, 900, rows),
+        'basement_area': rng.integers(0, 2000, rows),
+        'basement_quality': rng.choice(qualities, rows),
+        'exterior_quality': rng.choice(qualities[:5], rows),
+        'kitchen_quality': rng.choice(qualities[:5], rows),
+        'has_pool': rng.random(rows) < 0.05,
+        'pool_quality': rng.choice(qualities, rows),
+        'has_fireplace': rng.random(rows) < 0.5,
+        'fireplace_quality': rng.choice(qualities, rows),
+    }
+    return pd.DataFrame(columns)[SOURCE_FIELDS].to_dict('records')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from dashboard.features import build_feature_frame, source_frame
+    from dashboard.models import PropertySubmission
+
+    rows = source_rows(args.rows)
+    submissions = [PropertySubmission(**row) for row in rows]
+    source = source_frame(rows)
+
+    per_row = best_of(lambda: pd.DataFrame.from_records([s.get_property_features() for s in submissions]), 1)
+    from_rows = best_of(lambda: build_feature_frame(rows), args.repeat)
+    columnar = best_of(lambda: build_feature_frame(source), args.repeat)
+    print(f"{args.rows:,} submissions")
+    print(f"  get_property_features        {per_row * 1000:10.1f} ms")
+    print(f"  build_feature_frame(dicts)   {from_rows * 1000:10.1f} ms  x{per_row / from_rows:.0f}")
+    print(f"  build_feature_frame(frame)   {columnar * 1000:10.1f} ms  x{per_row / columnar:.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Cost and coverage of the conformal prediction intervals (dashboard.intervals).
+
+    python -m benchmarks.bench_intervals [--rows 1 100 10000 1000000] [--splits 200]
+
+Cost: predict_frame alone vs predict_frame + HousePriceModel.bounds() on
+synthetic rows of each size, and the bounds lookup on its own.
+
+Coverage: the legacy model's 292-row train.csv holdout is split in half
+--splits times; intervals are calibrated on one half and checked on the
+other, for the neighborhood x band table and for a single global quantile
+(--min-group larger than the holdout). Out-of-sample coverage should sit
+at or just above the target.
+"""
+import argparse
+
+import numpy as np
+
+from .common import best_of, setup_django, synthetic_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1, 100, 10000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--splits', type=int, default=200)
+    parser.add_argument('--coverage', type=float, default=0.9)
+    args = parser.parse_args()
+
+    setup_django()
+    from dashboard.ai_model import HousePriceModel, legacy_model_path
+    from dashboard.intervals import ConformalIntervals
+    from dashboard.training import holdout_split, load_training_frame, neighborhoods
+
+    model = HousePriceModel(legacy_model_path())
+    X, y = load_training_frame('train.csv')
+    _, X_holdout, _, y_holdout = holdout_split(X, y)
+    predicted, actual, names = model.predict_frame(X_holdout), y_holdout.to_numpy(), neighborhoods(X_holdout)
+    model.intervals = ConformalIntervals.calibrate(predicted, actual, names, coverage=args.coverage)
+
+    print(f"{'rows':>9} {'predict ms':>11} {'+ bounds ms':>12} {'bounds ms':>10} {'overhead':>9} {'bounds ns/row':>14}")
+    for rows in args.rows:
+        frame = synthetic_frame(rows, seed=rows)
+        repeat = args.repeat if rows < 1000000 else 1
+        predictions = model.predict_frame(frame)
+        plain = best_of(lambda: model.predict_frame(frame), repeat)
+        both = best_of(lambda: model.bounds(frame, model.predict_frame(frame)), repeat)
+        lookup = best_of(lambda: model.bounds(frame, predictions), repeat)
+        print(f"{rows:>9} {plain * 1000:11.2f} {both * 1000:12.2f} {lookup * 1000:10.3f} "
+              f"{lookup / plain:9.2%} {lookup / rows * 1e9:14.0f}")
+
+    rng = np.random.default_rng(0)
+    print(f"\nout-of-sample coverage over {args.splits} half/half splits of {len(actual)} holdout rows "
+          f"(target {args.coverage:.0%})")
+    print(f"{'table':<24} {'coverage':>9} {'p10':>6} {'p90':>6} {'mean width':>11}")
+    for label, min_group in (('neighborhood x band', 20), ('price band only', None), ('global', len(actual) + 1)):
+        covered, widths = [], []
+        for _ in range(args.splits):
+            order = rng.permutation(len(actual))
+            calibration, test = order[:len(order) // 2], order[len(order) // 2:]
+            intervals = ConformalIntervals.calibrate(
+                predicted[calibration], actual[calibration],
+                None if min_group is None else names[calibration], coverage=args.coverage,
+                min_group=min_group or 20,
+            )
+            lower, upper = intervals.bounds(predicted[test], names[test])
+            covered.append(np.mean((actual[test] >= lower) & (actual[test] <= upper)))
+            widths.append(np.mean((upper - lower) / predicted[test]))
+        covered = np.asarray(covered)
+        print(f"{label:<24} {covered.mean():9.1%} {np.quantile(covered, 0.1):6.1%} {np.quantile(covered, 0.9):6.1%} "
+              f"{np.mean(widths):11.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Bulk scoring throughput with 1/2/4/8 worker processes.
+
+    python -m benchmarks.bench_parallel [--rows 2000000] [--shard-rows 50000] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+
+from .common import best_of, setup_django, synthetic_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--shard-rows', type=int, default=50_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from dashboard.ai_model import get_model
+    from dashboard.parallel import ParallelScorer
+
+    model = get_model()
+    frame = synthetic_frame(args.rows)
+    print(f"{args.rows:,} synthetic rows, shards of {args.shard_rows:,}, {os.cpu_count()} CPUs")
+
+    baseline = best_of(lambda: model.predict_frame(frame), args.repeat)
+    print(f"  in-process       {baseline:8.2f} s  {args.rows / baseline:12,.0f} rows/s")
+    for workers in args.workers:
+        scorer = ParallelScorer(model, workers, args.shard_rows)
+        scorer.warm_up()  # start the workers and load the model outside the timing
+        seconds = best_of(lambda: scorer.predict_frame(frame), args.repeat)
+        scorer.shutdown()
+        print(f"  {workers} worker(s)     {seconds:8.2f} s  {args.rows / seconds:12,.0f} rows/s  x{baseline / seconds:.2f}")
+
+
+if __name__ == '__main__':
+    main()
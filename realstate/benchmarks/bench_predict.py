@@ -0,0 +1,45 @@
+"""Compare the row-dict prediction path with predict_frame / predict_array.
+
+    python -m benchmarks.bench_predict [--rows 1000000]
+"""
+import argparse
+
+from .common import best_of, setup_django, synthetic_frame
+
+
+def run(frame, model, label, repeat):
+    def dict_round_trip():
+        # what model_prediction used to do: DataFrame -> records -> DataFrame
+        model.predict(frame.to_dict('records'))
+
+    columns = {name: frame[name].to_numpy() for name in frame.columns}
+    timings = {
+        'dict_round_trip': best_of(dict_round_trip, repeat),
+        'predict_frame': best_of(lambda: model.predict_frame(frame), repeat),
+        'predict_array': best_of(lambda: model.predict_array(columns), repeat),
+    }
+    baseline = timings['dict_round_trip']
+    print(f"{label} ({len(frame):,} rows)")
+    for name, seconds in timings.items():
+        print(f"  {name:<16} {seconds * 1000:10.1f} ms  {len(frame) / seconds:12,.0f} rows/s  x{baseline / seconds:.2f}")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Synthetic rows for the large run')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from dashboard import datasets
+    from dashboard.ai_model import get_model
+    model = get_model()
+
+    run(datasets.read('test.csv', raw=True), model, 'dataset/test.csv', args.repeat)
+    if args.rows:
+        run(synthetic_frame(args.rows), model, 'synthetic', 1)
+
+
+if __name__ == '__main__':
+    main()
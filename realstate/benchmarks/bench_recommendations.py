@@ -0,0 +1,77 @@
+"""Recommendation search latency as the candidate set grows, against a full NumPy scan.
+
+    python -m benchmarks.bench_recommendations [--sizes 10000 100000 1000000 5000000] [--queries 500]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from .common import setup_django
+
+NEIGHBORHOODS = ['NAmes', 'CollgCr', 'OldTown', 'Edwards', 'Somerst', 'NridgHt', 'Gilbert', 'Sawyer']
+
+
+def candidates(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    listed = rng.lognormal(12.0, 0.45, rows).round(2)
+    predicted = listed * rng.normal(1.0, 0.1, rows)
+    return {
+        'id': np.arange(rows),
+        'neighborhood': rng.choice(NEIGHBORHOODS, rows).astype(object),
+        'bedrooms': rng.integers(1, 7, rows),
+        'bathrooms': rng.integers(1, 4, rows).astype('float64'),
+        'sqft': rng.integers(600, 4500, rows),
+        'listed_price': listed,
+        'predicted_price': predicted,
+        'value_score': (predicted - listed) / listed * 100,
+        'features': np.empty(rows, dtype=object),
+    }
+
+
+def linear_scan(columns, budget, bedrooms, neighborhood, limit):
+    mask = (columns['listed_price'] <= budget) & (columns['bedrooms'] >= bedrooms)
+    if neighborhood:
+        mask &= columns['neighborhood'] == neighborhood
+    rows = np.flatnonzero(mask)
+    scores = columns['value_score'][rows]
+    top = np.argpartition(-scores, limit)[:limit] if len(rows) > limit else np.arange(len(rows))
+    return rows[top[np.argsort(-scores[top])]]
+
+
+def per_query_ms(func, queries):
+    started = time.perf_counter()
+    for query in queries:
+        func(*query)
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 5_000_000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from dashboard.recommendations import RecommendationIndex
+
+    rng = np.random.default_rng(1)
+    queries = [
+        (float(rng.uniform(80_000, 600_000)), int(rng.integers(1, 5)),
+         NEIGHBORHOODS[rng.integers(len(NEIGHBORHOODS))] if rng.random() < 0.5 else None, args.limit)
+        for _ in range(args.queries)
+    ]
+    for size in args.sizes:
+        columns = candidates(size)
+        started = time.perf_counter()
+        index = RecommendationIndex(columns)
+        built = time.perf_counter() - started
+        indexed = per_query_ms(index.search, queries)
+        scanned = per_query_ms(lambda *q: linear_scan(columns, *q), queries[:50])
+        print(f"{size:>10,} candidates  build {built:6.2f} s  index {indexed:7.3f} ms/query  "
+              f"scan {scanned:8.3f} ms/query  x{scanned / indexed:.0f}")
+
+
+if __name__ == '__main__':
+    main()
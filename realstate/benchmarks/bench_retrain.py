@@ -0,0 +1,92 @@
+"""Incremental retraining (dashboard.retraining) vs a full train_model search.
+
+    python -m benchmarks.bench_retrain [--rows 1000 5000] [--workers N]
+
+Runs against a throwaway test database filled with `rows` verified
+synthetic submissions. Their sale prices are the legacy model's
+prediction, shifted by --drift (market movement the model has not seen)
+and multiplied by log-normal --noise, so they measure speed and the
+gate, not real-world accuracy gains. For each size it times
+retrain() in boost and window mode, and a full successive-halving search
+on train.csv plus the new sales.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from .common import dataset_path, setup_django, synthetic_submissions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--workers', type=int, default=None, help='Processes of the full search')
+    parser.add_argument('--drift', type=float, default=0.1, help='Relative price change of the new sales')
+    parser.add_argument('--noise', type=float, default=0.1, help='Sigma of the log-normal price noise')
+    parser.add_argument('--skip-full', action='store_true', help='Only time the incremental modes')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    setup_django()
+    import logging
+    import pandas as pd
+    from django.test.runner import DiscoverRunner
+    from dashboard.ai_model import HousePriceModel, legacy_model_path
+    from dashboard.features import build_feature_frame, submissions_frame
+    from dashboard.models import PropertySubmission
+    from dashboard.retraining import retrain, verified_sales
+    from dashboard.training import load_training_frame, train
+
+    logging.disable(logging.WARNING)
+    model = HousePriceModel(legacy_model_path())
+    runner = DiscoverRunner(verbosity=0)
+    databases = runner.setup_databases()
+    results = []
+    try:
+        for rows in args.rows:
+            PropertySubmission.objects.all().delete()
+            submissions = synthetic_submissions(rows, seed=rows)
+            prices = model.predict_frame(build_feature_frame(submissions_frame(submissions)))
+            noise = np.exp(np.random.default_rng(rows).normal(0, args.noise, rows))
+            for submission, price in zip(submissions, prices * (1 + args.drift) * noise):
+                submission.is_verified = True
+                submission.verification_status = 'verified'
+                submission.sale_price = round(float(price), 2)
+            PropertySubmission.objects.bulk_create(submissions, batch_size=2000)
+
+            for mode in ('boost', 'window'):
+                started = time.perf_counter()
+                result = retrain(model, mode=mode)
+                seconds = time.perf_counter() - started
+                metrics = result.metrics
+                results.append({'rows': rows, 'mode': mode, 'seconds': seconds,
+                                'trained_on': metrics['rows']['trained_on'], 'accepted': metrics['accepted'],
+                                'parent_rmse': metrics['parent_holdout']['rmse'], 'rmse': metrics['holdout']['rmse']})
+            if not args.skip_full:
+                X, y = load_training_frame(dataset_path('train.csv'))
+                X_sales, y_sales, _ = verified_sales()
+                started = time.perf_counter()
+                result = train(pd.concat([X, X_sales], ignore_index=True),
+                               pd.concat([y, pd.Series(y_sales, name=y.name)], ignore_index=True),
+                               workers=args.workers)
+                results.append({'rows': rows, 'mode': 'full search', 'seconds': time.perf_counter() - started,
+                                'trained_on': result.metrics['rows']['fit'] + result.metrics['rows']['validation'],
+                                'accepted': None, 'parent_rmse': None, 'rmse': result.metrics['holdout']['rmse']})
+    finally:
+        runner.teardown_databases(databases)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'new rows':>8} {'mode':<12} {'seconds':>8} {'trained on':>10} {'RMSE before':>12} {'after':>8}  accepted")
+    for r in results:
+        before = f"{r['parent_rmse']:12.0f}" if r['parent_rmse'] is not None else f"{'-':>12}"
+        accepted = '-' if r['accepted'] is None else r['accepted']
+        print(f"{r['rows']:>8} {r['mode']:<12} {r['seconds']:8.2f} {r['trained_on']:>10} {before} {r['rmse']:8.0f}  {accepted}")
+    print("full search RMSE is on its own holdout split of train.csv + new sales, not the gate's")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Hyperparameter search: the notebook's GridSearchCV vs successive halving (dashboard.training).
+
+    python -m benchmarks.bench_train [--workers 4] [--cv 5] [--grid-sample 6]
+
+The notebook grid is 50 n_estimators x 4 learning rates x 3 depths, scored
+with 5-fold GridSearchCV: 3000 full pipeline fits. Running it takes hours,
+so the benchmark measures it in two parts:
+
+* wall time: --grid-sample configurations are fitted on every fold exactly
+  as GridSearchCV would, and the mean fit time is scaled to the full grid;
+* quality: trees are added one at a time and never change, so a model with
+  n_estimators=k is the first k rounds of one with 598. One 598-round fit
+  per (learning rate, depth, fold) therefore scores all 50 n_estimators
+  values exactly, and the grid winner is refitted and scored on the holdout.
+
+Successive halving runs for real. Both winners are scored on the notebook's
+holdout split, next to the legacy artifact trained in the notebook.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from .common import dataset_path, setup_django
+
+N_ESTIMATORS = list(range(500, 600, 2))
+
+
+def grid_fit_seconds(X, y, configs, cv):
+    from sklearn.model_selection import KFold
+    from dashboard.training import build_pipeline
+    seconds = []
+    for params in configs:
+        for fit_index, _ in KFold(cv).split(X):
+            started = time.perf_counter()
+            build_pipeline(X, **params).fit(X.iloc[fit_index], y.iloc[fit_index])
+            seconds.append(time.perf_counter() - started)
+    return float(np.mean(seconds))
+
+
+def grid_winner(X, y, cv):
+    """Best notebook-grid configuration by mean CV R2, computed from one max-length fit per fold"""
+    from sklearn.metrics import r2_score
+    from sklearn.model_selection import KFold
+    from dashboard.training import LEARNING_RATES, MAX_DEPTHS, build_pipeline
+    scores = {}
+    for learning_rate in LEARNING_RATES:
+        for max_depth in MAX_DEPTHS:
+            fold_scores = []
+            for fit_index, score_index in KFold(cv).split(X):
+                pipeline = build_pipeline(X, learning_rate=learning_rate, max_depth=max_depth,
+                                          n_estimators=N_ESTIMATORS[-1])
+                pipeline.fit(X.iloc[fit_index], y.iloc[fit_index])
+                encoded = pipeline.named_steps['preprocessor'].transform(X.iloc[score_index])
+                regressor = pipeline.named_steps['model']
+                fold_scores.append([r2_score(y.iloc[score_index], regressor.predict(encoded, iteration_range=(0, n)))
+                                    for n in N_ESTIMATORS])
+            for n, score in zip(N_ESTIMATORS, np.mean(fold_scores, axis=0)):
+                scores[(learning_rate, max_depth, n)] = score
+    learning_rate, max_depth, n_estimators = max(scores, key=scores.get)
+    return {'learning_rate': learning_rate, 'max_depth': max_depth, 'n_estimators': n_estimators}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=None, help='Successive-halving trial processes')
+    parser.add_argument('--cv', type=int, default=5, help='GridSearchCV folds')
+    parser.add_argument('--grid-sample', type=int, default=6, help='Grid configurations timed per fold')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    setup_django()
+    import logging
+    from dashboard.ai_model import HousePriceModel, legacy_model_path
+    from dashboard.training import (
+        LEARNING_RATES, MAX_DEPTHS, build_pipeline, holdout_split, load_training_frame, regression_metrics, train,
+    )
+
+    logging.disable(logging.WARNING)
+    X, y = load_training_frame(dataset_path('train.csv'))
+    X_train, X_holdout, y_train, y_holdout = holdout_split(X, y)
+    grid = [{'learning_rate': lr, 'max_depth': depth, 'n_estimators': n}
+            for n in N_ESTIMATORS for lr in LEARNING_RATES for depth in MAX_DEPTHS]
+    rng = np.random.default_rng(0)
+    sample = [grid[i] for i in rng.choice(len(grid), size=min(args.grid_sample, len(grid)), replace=False)]
+
+    fit_seconds = grid_fit_seconds(X_train, y_train, sample, args.cv)
+    grid_params = grid_winner(X_train, y_train, args.cv)
+    grid_model = build_pipeline(X_train, **grid_params).fit(X_train, y_train)
+
+    started = time.perf_counter()
+    result = train(X, y, workers=args.workers)
+    halving_seconds = time.perf_counter() - started
+
+    legacy = HousePriceModel(legacy_model_path(), fast_path=False)
+    results = [
+        {'search': 'legacy artifact', 'seconds': None, 'fits': None, 'params': None,
+         **regression_metrics(y_holdout.to_numpy(), legacy.model.predict(X_holdout))},
+        {'search': f'grid {args.cv}-fold (est.)', 'seconds': fit_seconds * len(grid) * args.cv,
+         'fits': len(grid) * args.cv, 'params': grid_params,
+         **regression_metrics(y_holdout.to_numpy(), grid_model.predict(X_holdout))},
+        {'search': 'successive halving', 'seconds': halving_seconds,
+         'fits': sum(rung['trained'] for rung in result.metrics['search']['rungs']), 'params': result.params,
+         **result.metrics['holdout']},
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"grid fit: {fit_seconds:.2f}s mean over {len(sample)} configurations x {args.cv} folds")
+    print(f"{'search':<22} {'seconds':>9} {'fits':>6} {'R2':>7} {'RMSE':>8} {'RMSLE':>7}  params")
+    for r in results:
+        seconds = f"{r['seconds']:9.1f}" if r['seconds'] is not None else f"{'-':>9}"
+        fits = f"{r['fits']:6d}" if r['fits'] is not None else f"{'-':>6}"
+        print(f"{r['search']:<22} {seconds} {fits} {r['r2']:7.4f} {r['rmse']:8.0f} {r['rmsle']:7.4f}  {r['params'] or ''}")
+    print(f"speedup: {results[1]['seconds'] / halving_seconds:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
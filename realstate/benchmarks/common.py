@@ -0,0 +1,78 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realstate.settings')
+    import django
+    django.setup()
+
+
+def dataset_path(name):
+    from django.conf import settings
+    return os.path.join(settings.DATASET_DIR, name)
+
+
+def synthetic_frame(rows, seed=0, source='train.csv'):
+    """Synthetic properties drawn column by column from the empirical distributions in train.csv"""
+    from dashboard import datasets
+    train = datasets.read(source, raw=True).drop(columns=['SalePrice'], errors='ignore')
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        column: train[column].to_numpy()[rng.integers(0, len(train), rows)]
+        for column in train.columns
+    })
+    frame['Id'] = np.arange(1, rows + 1)
+    return frame
+
+
+def synthetic_submissions(rows, seed=0):
+    """Unsaved PropertySubmission objects whose fields come from synthetic_frame rows"""
+    from dashboard.features import OPTIONAL_QUALITY_CODES, QUALITY_CODES
+    from dashboard.models import PropertySubmission
+    frame = synthetic_frame(rows, seed)
+    quality = {code: name for name, code in OPTIONAL_QUALITY_CODES.items()}
+    property_types = {'1Fam': 'single_family', 'TwnhsE': 'townhouse', 'Twnhs': 'condo', '2fmCon': 'multi_family', 'Duplex': 'multi_family'}
+
+    def choices(column, mapping, default):
+        return frame[column].map(mapping).fillna(default).tolist()
+
+    columns = {
+        'property_type': choices('BldgType', property_types, 'single_family'),
+        'neighborhood': frame['Neighborhood'].tolist(),
+        'bedrooms': frame['BedroomAbvGr'].tolist(),
+        'bathrooms': (frame['FullBath'] + 0.5 * frame['HalfBath']).tolist(),
+        'living_area': frame['GrLivArea'].tolist(),
+        'lot_area': frame['LotArea'].tolist(),
+        'year_built': frame['YearBuilt'].tolist(),
+        'year_remodeled': frame['YearRemodAdd'].tolist(),
+        'overall_quality': frame['OverallQual'].tolist(),
+        'overall_condition': frame['OverallCond'].tolist(),
+        'garage_cars': frame['GarageCars'].fillna(0).astype(int).tolist(),
+        'garage_area': frame['GarageArea'].fillna(0).astype(int).tolist(),
+        'basement_area': frame['TotalBsmtSF'].fillna(0).astype(int).tolist(),
+        'basement_quality': choices('BsmtQual', quality, 'none'),
+        'exterior_quality': choices('ExterQual', {c: n for n, c in QUALITY_CODES.items()}, 'average'),
+        'kitchen_quality': choices('KitchenQual', {c: n for n, c in QUALITY_CODES.items()}, 'average'),
+        'has_pool': (frame['PoolArea'] > 0).tolist(),
+        'pool_quality': choices('PoolQC', quality, 'none'),
+        'has_fireplace': (frame['Fireplaces'] > 0).tolist(),
+        'fireplace_quality': choices('FireplaceQu', quality, 'none'),
+    }
+    return [
+        PropertySubmission(address=f'{i} Benchmark St', city='Ames', state='IA', zip_code='50010', **values)
+        for i, values in enumerate((dict(zip(columns, row)) for row in zip(*columns.values())), 1)
+    ]
+
+
+def best_of(func, repeat=3):
+    """Best wall-clock time of `repeat` runs, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
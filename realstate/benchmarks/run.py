@@ -0,0 +1,282 @@
+"""Benchmark suite for the prediction and insights endpoints.
+
+    python -m benchmarks.run [--quick] [--output results.json] [--baseline baseline.json]
+    python -m benchmarks.run --results results.json --baseline baseline.json
+
+Runs every case against a throwaway test database with synthetic data drawn
+from dataset/train.csv, and writes the best-of-N timings plus the software
+and hardware they were measured on as JSON. With --baseline, each case is
+compared against a stored result file and the exit status is 1 when any
+case got slower by more than --threshold. The prediction cache is turned
+off so repeated calls measure the model, not cache hits.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from .common import setup_django, synthetic_frame, synthetic_submissions
+
+BATCH_SIZES = [1, 100, 10_000, 1_000_000]
+CSV_UPLOAD_ROWS = 10_000
+SINGLE_CALLS = 200
+
+
+def timed(func, repeat, setup=None):
+    """Best wall-clock time of `repeat` runs of func(), calling setup() untimed before each"""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def result(seconds, rows=None, calls=1, repeat=1):
+    entry = {'seconds': seconds, 'repeat': repeat}
+    if calls > 1:
+        entry['calls'] = calls
+        entry['seconds_per_call'] = seconds / calls
+    if rows:
+        entry['rows'] = rows
+        entry['rows_per_second'] = rows * calls / seconds
+    return entry
+
+
+def bench_predict_single(ctx):
+    from dashboard.ai_model import predict_one
+    row = synthetic_frame(1, seed=1).iloc[0].to_dict()
+    model = ctx['model']
+
+    def batched():
+        for _ in range(SINGLE_CALLS):
+            predict_one(row)
+
+    def direct():
+        for _ in range(SINGLE_CALLS):
+            model.predict(row)
+
+    return {
+        'predict_single': result(timed(batched, ctx['repeat']), 1, SINGLE_CALLS, ctx['repeat']),
+        'predict_single_unbatched': result(timed(direct, ctx['repeat']), 1, SINGLE_CALLS, ctx['repeat']),
+    }
+
+
+def bench_predict_batch(ctx):
+    results = {}
+    for rows in ctx['batch_sizes']:
+        frame = synthetic_frame(rows, seed=2)
+        repeat = ctx['repeat'] if rows < 1_000_000 else 1
+        seconds = timed(lambda: ctx['model'].predict_frame(frame), repeat)
+        results[f'predict_batch_{rows}'] = result(seconds, rows, repeat=repeat)
+    return results
+
+
+def bench_csv_upload(ctx):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    rows = ctx['csv_rows']
+    data = synthetic_frame(rows, seed=3).to_csv(index=False).encode()
+
+    def upload():
+        response = ctx['client'].post('/dashboard/model-prediction/', {
+            'file': SimpleUploadedFile('upload.csv', data, content_type='text/csv')
+        })
+        assert response.status_code == 200, response.content[:500]
+
+    return {f'csv_upload_{rows}': result(timed(upload, ctx['repeat']), rows, repeat=ctx['repeat'])}
+
+
+def bench_market_insights(ctx):
+    from django.core.cache import cache
+    from dashboard.models import MarketInsight
+
+    def request():
+        response = ctx['client'].get('/dashboard/api/market-insights/')
+        assert response.status_code == 200, response.content[:500]
+
+    def forget():
+        cache.clear()
+        MarketInsight.objects.all().delete()
+
+    cold = timed(request, ctx['repeat'], setup=forget)
+    request()
+    warm = timed(request, ctx['repeat'])
+    return {
+        'market_insights_cold': result(cold, repeat=ctx['repeat']),
+        'market_insights_warm': result(warm, repeat=ctx['repeat']),
+    }
+
+
+def bench_analyze_property(ctx):
+    from dashboard.comparables import get_index
+    get_index()  # built once per process; not part of a request
+    payload = json.dumps({'sqft_living': 1850, 'bedrooms': 3, 'bathrooms': 2, 'quality': 7,
+                          'neighborhood': 'CollgCr', 'year_built': 1998, 'lot_area': 9000, 'garage_cars': 2})
+
+    def request():
+        for _ in range(SINGLE_CALLS):
+            response = ctx['client'].post('/dashboard/api/analyze-property/', payload, content_type='application/json')
+            assert response.status_code == 200, response.content[:500]
+
+    return {'analyze_property': result(timed(request, ctx['repeat']), calls=SINGLE_CALLS, repeat=ctx['repeat'])}
+
+
+def bench_regenerate_predictions(ctx):
+    from dashboard.models import PropertySubmission
+    from dashboard.repredict import repredict_submissions
+    rows = ctx['submissions']
+    PropertySubmission.objects.all().delete()
+    PropertySubmission.objects.bulk_create(synthetic_submissions(rows, seed=4), batch_size=2000)
+    # what the admin "Regenerate predictions" action runs on the selected rows
+    seconds = timed(lambda: repredict_submissions(PropertySubmission.objects.all(), force=True), ctx['repeat'])
+    return {f'regenerate_predictions_{rows}': result(seconds, rows, repeat=ctx['repeat'])}
+
+
+CASES = {
+    'predict_single': bench_predict_single,
+    'predict_batch': bench_predict_batch,
+    'csv_upload': bench_csv_upload,
+    'market_insights': bench_market_insights,
+    'analyze_property': bench_analyze_property,
+    'regenerate_predictions': bench_regenerate_predictions,
+}
+
+
+def environment(model):
+    import django
+    import sklearn
+    import xgboost
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'model_version': model.version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'versions': {
+            'django': django.get_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'sklearn': sklearn.__version__, 'xgboost': xgboost.__version__,
+        },
+    }
+
+
+def run_suite(args):
+    from django.test import Client, override_settings
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from dashboard.ai_model import get_model
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    databases = runner.setup_databases()
+    try:
+        with override_settings(HOUSE_PRICE_PREDICTION_CACHE=None):
+            model = get_model()
+            ctx = {
+                'model': model,
+                'client': Client(),
+                'repeat': args.repeat,
+                'batch_sizes': [rows for rows in BATCH_SIZES if rows <= args.max_rows],
+                'csv_rows': min(CSV_UPLOAD_ROWS, args.max_rows),
+                'submissions': args.submissions,
+            }
+            results = {}
+            for name in args.cases:
+                started = time.perf_counter()
+                results.update(CASES[name](ctx))
+                print(f"  {name:<24} done in {time.perf_counter() - started:6.1f}s", file=sys.stderr)
+            return {'environment': environment(model), 'results': results}
+    finally:
+        runner.teardown_databases(databases)
+        teardown_test_environment()
+
+
+def compare(results, baseline, threshold):
+    """Print current vs baseline per case; returns the names of cases that regressed"""
+    regressions = []
+    print(f"{'case':<32} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, current in results['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<32} {'-':>12} {current['seconds'] * 1000:10.1f}ms {'':>7}  new")
+            continue
+        ratio = current['seconds'] / base['seconds']
+        if ratio > 1 + threshold:
+            status = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 / (1 + threshold):
+            status = 'faster'
+        else:
+            status = ''
+        print(f"{name:<32} {base['seconds'] * 1000:10.1f}ms {current['seconds'] * 1000:10.1f}ms {ratio:7.2f}  {status}")
+    for name in baseline['results'].keys() - results['results'].keys():
+        print(f"{name:<32} missing from the current results")
+    if baseline.get('environment', {}).get('cpu_count') != results.get('environment', {}).get('cpu_count'):
+        print("note: baseline was measured on a machine with a different CPU count")
+    return regressions
+
+
+def print_results(results):
+    for name, entry in results['results'].items():
+        line = f"{name:<32} {entry['seconds'] * 1000:10.1f} ms"
+        if 'seconds_per_call' in entry:
+            line += f"  {entry['seconds_per_call'] * 1000:8.3f} ms/call"
+        if 'rows_per_second' in entry:
+            line += f"  {entry['rows_per_second']:12,.0f} rows/s"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-rows', type=int, default=max(BATCH_SIZES), help='Skip batch sizes above this')
+    parser.add_argument('--submissions', type=int, default=5000, help='Submissions for regenerate_predictions')
+    parser.add_argument('--quick', action='store_true', help='Smaller inputs and one repeat, for a smoke run')
+    parser.add_argument('--output', help='Write the results JSON here')
+    parser.add_argument('--results', help='Compare this results file instead of running the suite')
+    parser.add_argument('--baseline', help='Results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Slowdown ratio above 1 that counts as a regression')
+    args = parser.parse_args()
+    if args.quick:
+        args.repeat, args.max_rows, args.submissions = 1, min(args.max_rows, 10_000), min(args.submissions, 500)
+
+    if args.results:
+        with open(args.results) as f:
+            results = json.load(f)
+    else:
+        setup_django()
+        logging.disable(logging.WARNING)
+        results = run_suite(args)
+        logging.disable(logging.NOTSET)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+        print_results(results)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import PropertySubmission, MarketInsight, UserSubmissionAnalytics
+from .models import PropertySubmission, MarketInsight, MarketAggregate, CandidateProperty, UserSubmissionAnalytics, PredictionJob
+from .market_stats import update_with_stats
+from .repredict import repredict_submissions
 import json
 
 @admin.register(PropertySubmission)
@@ -15,7 +17,7 @@ class PropertySubmissionAdmin(admin.ModelAdmin):
         'submission_date', 'is_verified'
     ]
     search_fields = ['address', 'city', 'neighborhood', 'contact_email', 'contact_name']
-    readonly_fields = ['submission_date', 'prediction_timestamp']
+    readonly_fields = ['submission_date', 'prediction_timestamp', 'prediction_version']
     fieldsets = (
         ('Contact Information', {
             'fields': ('user', 'contact_name', 'contact_email', 'contact_phone')
@@ -42,8 +44,8 @@ class PropertySubmissionAdmin(admin.ModelAdmin):
         }),
         ('AI Prediction', {
             'fields': (
-                'predicted_price', 'prediction_confidence', 
-                'prediction_timestamp', 'verification_status', 'is_verified'
+                'predicted_price', 'prediction_lower', 'prediction_upper', 'prediction_confidence',
+                'prediction_timestamp', 'prediction_version', 'verification_status', 'is_verified'
             )
         }),
         ('Images', {
@@ -79,20 +81,18 @@ class PropertySubmissionAdmin(admin.ModelAdmin):
     verification_status_display.short_description = 'Status'
     
     def verify_selected(self, request, queryset):
-        queryset.update(verification_status='verified', is_verified=True)
-        self.message_user(request, f"{queryset.count()} properties verified.")
+        count = update_with_stats(queryset, verification_status='verified', is_verified=True)
+        self.message_user(request, f"{count} properties verified.")
     verify_selected.short_description = "Mark selected as verified"
     
     def mark_as_pending(self, request, queryset):
-        queryset.update(verification_status='pending', is_verified=False)
-        self.message_user(request, f"{queryset.count()} properties marked as pending.")
+        count = update_with_stats(queryset, verification_status='pending', is_verified=False)
+        self.message_user(request, f"{count} properties marked as pending.")
     mark_as_pending.short_description = "Mark selected as pending"
     
     def regenerate_predictions(self, request, queryset):
-        count = 0
-        for obj in queryset:
-            if obj.predict_price():
-                count += 1
+        # one model call and one bulk_update per chunk instead of a predict + save per row
+        count = repredict_submissions(queryset, force=True)
         self.message_user(request, f"Predictions regenerated for {count} properties.")
     regenerate_predictions.short_description = "Regenerate predictions"
 
@@ -112,8 +112,39 @@ class MarketInsightAdmin(admin.ModelAdmin):
     insights_preview.short_description = 'Insights Data'
 
 
+@admin.register(MarketAggregate)
+class MarketAggregateAdmin(admin.ModelAdmin):
+    list_display = ['scope', 'key', 'count', 'verified_count', 'avg_price_display', 'updated_at']
+    list_filter = ['scope']
+    search_fields = ['key']
+
+    def avg_price_display(self, obj):
+        if obj.count:
+            return f"${obj.price_sum / obj.count:,.0f}"
+        return "-"
+    avg_price_display.short_description = 'Average Price'
+
+
+@admin.register(CandidateProperty)
+class CandidatePropertyAdmin(admin.ModelAdmin):
+    list_display = ['source_ref', 'neighborhood', 'bedrooms', 'listed_price', 'predicted_price', 'value_score', 'model_version']
+    list_filter = ['neighborhood', 'bedrooms']
+    search_fields = ['source_ref', 'neighborhood']
+
+
 @admin.register(UserSubmissionAnalytics)
 class UserSubmissionAnalyticsAdmin(admin.ModelAdmin):
     list_display = ['user', 'date', 'total_submissions', 'verified_submissions']
     list_filter = ['date', 'user']
-    date_hierarchy = 'date'
\ No newline at end of file
+    date_hierarchy = 'date'
+
+
+@admin.register(PredictionJob)
+class PredictionJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'original_filename', 'status', 'rows_done', 'total_rows', 'model_version', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['id', 'original_filename']
+    readonly_fields = [
+        'input_file', 'output_file', 'model_version', 'chunk_rows', 'total_rows',
+        'rows_done', 'chunks_done', 'output_bytes', 'created_at', 'started_at', 'finished_at', 'updated_at'
+    ]
@@ -1,31 +1,860 @@
 import numpy as np
 import pandas as pd
+import hashlib
+import json
 import os
+import shutil
+import tempfile
+import time
+import queue
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future
+from typing import NamedTuple
 import joblib
+import xgboost as xgb
 from django.conf import settings
 
+from . import metrics
+from .intervals import INTERVALS_FILENAME, load_intervals
+from .prediction_cache import cached_predict_frame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = 'house_price'
+ARTIFACT_FILENAME = 'model.pkl'
+# compact artifact: booster in XGBoost's UBJSON format + preprocessing as .npy, described by a manifest
+MANIFEST_FILENAME = 'manifest.json'
+BOOSTER_FILENAME = 'booster.ubj'
+COMPACT_FORMAT = 1
+COMPACT_ARRAYS = ('medians', 'means', 'scales')
+ACTIVE_FILENAME = 'ACTIVE'
+HISTORY_FILENAME = 'HISTORY'
+# below this many rows plain dict lookups beat building pandas hash indexes
+SMALL_BATCH_ROWS = 256
+
+
+class Prediction(NamedTuple):
+    """One scored row; the interval fields are None when the model version has no calibrated intervals"""
+    price: float
+    version: str
+    lower: float | None = None
+    upper: float | None = None
+    # nominal probability that [lower, upper] holds the sale price
+    coverage: float | None = None
+
+
+def legacy_model_path():
+    return os.path.join(settings.BASE_DIR, 'dashboard', 'xgb_pipeline_with_features.pkl')
+
+
+def model_dir():
+    return str(getattr(settings, 'HOUSE_PRICE_MODEL_DIR', os.path.join(settings.BASE_DIR, 'dashboard', 'artifacts')))
+
+
+def available_versions():
+    """Versions in the model directory, oldest first (directory names sort by version).
+
+    Dot-prefixed entries are the staging directories of publish/export and never count as versions.
+    """
+    root = model_dir()
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        entry for entry in os.listdir(root)
+        if not entry.startswith('.') and (
+            os.path.exists(os.path.join(root, entry, MANIFEST_FILENAME))
+            or os.path.exists(os.path.join(root, entry, ARTIFACT_FILENAME))
+        )
+    )
+
+
+def read_active_version():
+    try:
+        with open(os.path.join(model_dir(), ACTIVE_FILENAME)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _replace_file(path, text):
+    tmp_path = os.path.join(os.path.dirname(path), f'.{os.path.basename(path)}.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_active_version(version):
+    """Point every worker at `version`; watchers pick the change up on their next poll"""
+    if version not in available_versions():
+        raise ValueError(f"Unknown model version: {version}")
+    root = model_dir()
+    _replace_file(os.path.join(root, ACTIVE_FILENAME), version)
+    with open(os.path.join(root, HISTORY_FILENAME), 'a') as f:
+        f.write(version + '\n')
+
+
+def read_version_history():
+    try:
+        with open(os.path.join(model_dir(), HISTORY_FILENAME)) as f:
+            return [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def rollback_active_version():
+    """Point every worker at the version that was active before the current one; returns it.
+
+    HISTORY is used as a stack: the current version's entries are popped
+    off its top, so each rollback walks one activation further back. With
+    no history left, the next older version by name is used.
+    """
+    versions = available_versions()
+    current = resolve_artifact()[0]
+    history = read_version_history()
+    while history and (history[-1] == current or history[-1] not in versions):
+        history.pop()
+    if history:
+        previous = history[-1]
+    elif current in versions and versions.index(current) > 0:
+        previous = versions[versions.index(current) - 1]
+        history = [previous]
+    else:
+        raise ValueError("No previous version to roll back to")
+    root = model_dir()
+    _replace_file(os.path.join(root, ACTIVE_FILENAME), previous)
+    _replace_file(os.path.join(root, HISTORY_FILENAME), ''.join(f'{version}\n' for version in history))
+    return previous
+
+
+def resolve_artifact(version=None):
+    """Return (version, path) for `version`, the ACTIVE pointer, the newest version, or the legacy pickle.
+
+    A version directory holding a compact artifact resolves to its manifest, otherwise to model.pkl.
+    """
+    versions = available_versions()
+    version = version or read_active_version() or (versions[-1] if versions else None)
+    if version is None:
+        path = legacy_model_path()
+        return os.path.splitext(os.path.basename(path))[0], path
+    manifest = os.path.join(model_dir(), version, MANIFEST_FILENAME)
+    if os.path.exists(manifest):
+        return version, manifest
+    return version, os.path.join(model_dir(), version, ARTIFACT_FILENAME)
+
+
+def artifact_state():
+    """Cheap fingerprint of the model directory, compared by the watcher between polls"""
+    root = model_dir()
+    try:
+        return (read_active_version(), tuple(available_versions()), os.stat(root).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+
+class CompiledPipeline:
+    """NumPy re-implementation of the fitted preprocessing that feeds the booster directly.
+
+    The training pipeline is ColumnTransformer(num: median imputer -> scaler,
+    cat: most-frequent imputer -> ordinal encoder) -> XGBRegressor. Exporting it
+    to plain arrays skips sklearn/pandas validation on every call while doing
+    the same float64 arithmetic, so predictions are identical.
+    """
+
+    def __init__(self, arrays, booster, iteration_range=(0, 0), missing=np.nan):
+        self.arrays = arrays
+        self.numeric_columns = list(arrays['numeric_columns'])
+        self.categorical_columns = list(arrays['categorical_columns'])
+        self.medians = np.asarray(arrays['medians'], dtype=np.float64)
+        self.means = np.asarray(arrays['means'], dtype=np.float64)
+        self.scales = np.asarray(arrays['scales'], dtype=np.float64)
+        self.fill_values = list(arrays['fill_values'])
+        # category -> code lookup tables: dicts for small batches, pandas hash indexes for big ones
+        self.category_codes = [{value: code for code, value in enumerate(categories)}
+                               for categories in arrays['categories']]
+        self.category_indexes = [pd.Index(categories, dtype=object) for categories in arrays['categories']]
+        self.booster = booster
+        self.iteration_range = tuple(iteration_range)
+        self.missing = missing
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        preprocessor = pipeline.named_steps['preprocessor']
+        regressor = pipeline.named_steps['model']
+        return cls(export_preprocessor(preprocessor), regressor.get_booster(),
+                   iteration_range=_iteration_range(regressor), missing=regressor.missing)
+
+    @property
+    def columns(self):
+        return self.numeric_columns + self.categorical_columns
+
+    def transform(self, frame: pd.DataFrame):
+        """Model input matrix for `frame`, in ColumnTransformer output order"""
+        n_numeric = len(self.numeric_columns)
+        X = np.empty((len(frame), n_numeric + len(self.categorical_columns)), dtype=np.float64)
+        numeric = X[:, :n_numeric]
+        if frame.columns.isin(self.numeric_columns).sum() == n_numeric:
+            numeric[:] = frame[self.numeric_columns].to_numpy(dtype=np.float64)
+        else:
+            for i, column in enumerate(self.numeric_columns):
+                numeric[:, i] = _numeric_values(frame, column)
+        missing = np.isnan(numeric)
+        if missing.any():
+            numeric[missing] = np.take(self.medians, np.nonzero(missing)[1])
+        numeric -= self.means
+        numeric /= self.scales
+        for i, column in enumerate(self.categorical_columns):
+            values = _object_values(frame, column)
+            # the imputer only treats float NaN as missing (not None), same as sklearn
+            missing = values != values
+            if missing.any():
+                values = values.copy()
+                values[missing] = self.fill_values[i]
+            if len(values) <= SMALL_BATCH_ROWS:
+                codes = self.category_codes[i]
+                X[:, n_numeric + i] = [codes.get(value, -1) for value in values]
+            else:
+                X[:, n_numeric + i] = self.category_indexes[i].get_indexer(values)
+        return X
+
+    def predict(self, frame: pd.DataFrame):
+        return self.predict_matrix(self.transform(frame))
+
+    def predict_matrix(self, X: np.ndarray):
+        """Booster output for an already transformed input matrix"""
+        return self.booster.inplace_predict(
+            X,
+            iteration_range=self.iteration_range,
+            missing=self.missing,
+            validate_features=False,
+        )
+
+    def contributions_matrix(self, X: np.ndarray, approximate=False):
+        return _contributions(self.booster, X, self.iteration_range, self.missing, approximate)
+
+
+def export_preprocessor(preprocessor):
+    """Turn the fitted ColumnTransformer into plain arrays, refusing layouts the runtime can't mirror"""
+    transformers = {name: (step, columns) for name, step, columns in preprocessor.transformers_
+                    if name != 'remainder'}
+    if list(transformers) != ['num', 'cat'] or preprocessor.remainder != 'drop':
+        raise ValueError("Expected a ColumnTransformer with only 'num' and 'cat' steps")
+    numeric, numeric_columns = transformers['num']
+    categorical, categorical_columns = transformers['cat']
+    imputer, scaler = numeric.named_steps['imputer'], numeric.named_steps['scaler']
+    cat_imputer, encoder = categorical.named_steps['imputer'], categorical.named_steps['encoder']
+    if imputer.strategy != 'median' or cat_imputer.strategy != 'most_frequent':
+        raise ValueError("Unsupported imputer strategy")
+    if np.isnan(imputer.statistics_).any() or encoder.unknown_value != -1:
+        raise ValueError("Unsupported imputer or encoder settings")
+    n_numeric = len(numeric_columns)
+    return {
+        'numeric_columns': list(numeric_columns),
+        'medians': np.asarray(imputer.statistics_, dtype=np.float64),
+        'means': scaler.mean_ if scaler.with_mean else np.zeros(n_numeric),
+        'scales': scaler.scale_ if scaler.with_std else np.ones(n_numeric),
+        'categorical_columns': list(categorical_columns),
+        'fill_values': list(cat_imputer.statistics_),
+        'categories': [list(categories) for categories in encoder.categories_],
+    }
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_compact(model, directory, check=None):
+    """Write `model` as a compact artifact into the new directory `directory`; returns the manifest path.
+
+    Only models running the compiled pipeline can be exported. Files are
+    written to a dot-prefixed temporary sibling directory, which is not a
+    version yet, and renamed into place once `check(manifest_path)` (if
+    given) has returned for the staged copy.
+    """
+    if model.compiled is None:
+        raise ValueError(f"Model {model.version} has no compiled pipeline to export")
+    if os.path.exists(directory):
+        raise ValueError(f"{directory} already exists")
+    compiled = model.compiled
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.export-', dir=parent)
+    try:
+        compiled.booster.save_model(os.path.join(staging, BOOSTER_FILENAME))
+        for name in COMPACT_ARRAYS:
+            np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(getattr(compiled, name), dtype=np.float64))
+        files = [BOOSTER_FILENAME] + [f'{name}.npy' for name in COMPACT_ARRAYS]
+        manifest = {
+            'format': COMPACT_FORMAT,
+            'version': model.version,
+            'features': list(model.features),
+            'numeric_columns': compiled.numeric_columns,
+            'categorical_columns': compiled.categorical_columns,
+            'fill_values': [_json_scalar(value) for value in compiled.fill_values],
+            'categories': [[_json_scalar(value) for value in categories] for categories in compiled.arrays['categories']],
+            'iteration_range': list(compiled.iteration_range),
+            'missing': None if np.isnan(compiled.missing) else float(compiled.missing),
+            'xgboost': xgb.__version__,
+            'sha256': {name: _file_digest(os.path.join(staging, name)) for name in files},
+        }
+        with open(os.path.join(staging, MANIFEST_FILENAME), 'w') as f:
+            json.dump(manifest, f, indent=1)
+        if model.intervals is not None:
+            model.intervals.save(os.path.join(staging, INTERVALS_FILENAME))
+        if check is not None:
+            check(os.path.join(staging, MANIFEST_FILENAME))
+        os.replace(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return os.path.join(directory, MANIFEST_FILENAME)
+
+
+def _json_scalar(value):
+    # categories come out of sklearn as NumPy scalars
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def load_compact(manifest_path, verify=False):
+    """(manifest, CompiledPipeline) for a compact artifact.
+
+    The preprocessing arrays are memory-mapped read-only, so workers on one
+    machine share their pages; nothing is unpickled, so loading does not
+    depend on the sklearn version that trained the model.
+    """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != COMPACT_FORMAT:
+        raise ValueError(f"Unsupported compact artifact format: {manifest.get('format')}")
+    directory = os.path.dirname(manifest_path)
+    if verify:
+        for name, expected in manifest['sha256'].items():
+            if _file_digest(os.path.join(directory, name)) != expected:
+                raise ValueError(f"{name} does not match its checksum in {manifest_path}")
+    arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in COMPACT_ARRAYS}
+    arrays.update({
+        'numeric_columns': manifest['numeric_columns'],
+        'categorical_columns': manifest['categorical_columns'],
+        'fill_values': manifest['fill_values'],
+        'categories': manifest['categories'],
+    })
+    booster = xgb.Booster()
+    booster.load_model(os.path.join(directory, BOOSTER_FILENAME))
+    missing = np.nan if manifest['missing'] is None else manifest['missing']
+    return manifest, CompiledPipeline(arrays, booster, iteration_range=manifest['iteration_range'], missing=missing)
+
+
+def _contributions(booster, X, iteration_range, missing, approximate):
+    """Per-feature contributions plus a last bias column; each row sums to the prediction.
+
+    Exact TreeSHAP, or with `approximate` the per-node attribution of
+    Saabas, which costs about as much as a few predictions instead of
+    hundreds (inplace_predict has no contribution output, so this builds a
+    DMatrix).
+    """
+    return booster.predict(
+        xgb.DMatrix(X, missing=missing),
+        pred_contribs=True,
+        approx_contribs=approximate,
+        iteration_range=iteration_range,
+        validate_features=False,
+    )
+
+
+def _iteration_range(regressor):
+    # mirrors XGBModel.predict: use best_iteration when early stopping recorded one
+    try:
+        return (0, regressor.best_iteration + 1)
+    except AttributeError:
+        return (0, 0)
+
+
+def _numeric_values(frame, column):
+    if column not in frame:
+        return np.nan
+    return np.asarray(frame[column], dtype=np.float64)
+
+
+def _object_values(frame, column):
+    if column not in frame:
+        return np.full(len(frame), np.nan, dtype=object)
+    return frame[column].to_numpy(dtype=object)
 
 
 class HousePriceModel:
-    def __init__(self):
-        model_path = os.path.join(
-            settings.BASE_DIR,
-            'dashboard',
-            'xgb_pipeline_with_features.pkl'
-            )
-        
+    def __init__(self, model_path=None, version=None, fast_path=None):
+        if model_path is None:
+            version, model_path = resolve_artifact(version)
+
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model file not found at {model_path}")
+        self.path = model_path
+        # distinguishes a re-published artifact under the same version name (used in cache keys)
+        stat = os.stat(model_path)
+        self.fingerprint = f'{stat.st_mtime_ns:x}{stat.st_size:x}'
+        # calibrated prediction intervals stored next to the artifact, if any
+        self.intervals = load_intervals(model_path)
+        if os.path.basename(model_path) == MANIFEST_FILENAME:
+            # compact artifact: there is no sklearn pipeline, only the compiled one
+            manifest, self.compiled = load_compact(model_path)
+            self.model = None
+            self.features = manifest['features']
+            self.version = version or manifest['version']
+            return
         Artifact = joblib.load(model_path)
         self.model = Artifact['pipeline']
         self.features = Artifact['features']
+        self.version = version or Artifact.get('version') or os.path.splitext(os.path.basename(model_path))[0]
+        self.compiled = None
+        if fast_path is None:
+            fast_path = getattr(settings, 'HOUSE_PRICE_FAST_PATH', True)
+        if fast_path:
+            try:
+                self.compiled = CompiledPipeline.from_pipeline(self.model)
+            except (AttributeError, KeyError, ValueError) as e:
+                logger.warning("Model %s can't use the compiled fast path, falling back to sklearn: %s", self.version, e)
 
     def predict(self, data: dict | list[dict]):
-        df = pd.DataFrame(data if isinstance(data, list) else [data])
-        predictions = self.model.predict(df)
-        return [float(p) for p in predictions]
-    
-    
+        with metrics.stage('features'):
+            df = pd.DataFrame.from_records(data if isinstance(data, list) else [data])
+        return cached_predict_frame(self, df).tolist()
+
+    def align(self, frame: pd.DataFrame):
+        """Line the input columns up against the trained feature list (missing ones become NaN)"""
+        if list(frame.columns) == self.features:
+            return frame
+        return frame.reindex(columns=self.features)
+
+    def predict_frame(self, frame: pd.DataFrame):
+        """Predict straight from a DataFrame without a round trip through row dicts"""
+        started = time.perf_counter()
+        predictions = self.predict_matrix(self.transform(frame))
+        metrics.record_batch(len(predictions), time.perf_counter() - started)
+        return predictions
+
+    def bounds(self, frame: pd.DataFrame, predictions: np.ndarray):
+        """(lower, upper) arrays of the calibrated interval around `predictions`, or None if uncalibrated"""
+        if self.intervals is None:
+            return None
+        with metrics.stage('interval'):
+            neighborhoods = frame['Neighborhood'].to_numpy(dtype=object) if 'Neighborhood' in frame else None
+            return self.intervals.bounds(predictions, neighborhoods)
+
+    @property
+    def coverage(self):
+        """Nominal coverage of the intervals, or None"""
+        return self.intervals.coverage if self.intervals is not None else None
+
+    @property
+    def feature_names(self):
+        """Names of the transform() columns; every column is one input feature, scaled or encoded"""
+        if self.compiled is not None:
+            return self.compiled.columns
+        return [column for name, _, columns in self.model[:-1][0].transformers_ if name != 'remainder'
+                for column in columns]
+
+    def transform(self, frame: pd.DataFrame):
+        """The float matrix the regressor actually sees for `frame`"""
+        with metrics.stage('preprocess'):
+            if self.compiled is not None:
+                return self.compiled.transform(frame)
+            return np.asarray(self.model[:-1].transform(self.align(frame)), dtype=np.float64)
+
+    def predict_matrix(self, X: np.ndarray):
+        """Predict from the output of transform()"""
+        with metrics.stage('booster'):
+            if self.compiled is not None:
+                return self.compiled.predict_matrix(X).astype(np.float64)
+            return self.model[-1].predict(X).astype(np.float64)
+
+    def contributions_matrix(self, X: np.ndarray, approximate=False):
+        """Feature contributions for the output of transform(): one column per feature_names entry plus the bias"""
+        with metrics.stage('explain'):
+            if self.compiled is not None:
+                return self.compiled.contributions_matrix(X, approximate)
+            regressor = self.model[-1]
+            return _contributions(regressor.get_booster(), X, _iteration_range(regressor), regressor.missing,
+                                  approximate)
+
+    def predict_array(self, columns: dict | np.ndarray):
+        """Predict from a mapping of feature name -> 1-D array, or a NumPy structured array"""
+        if isinstance(columns, np.ndarray):
+            if columns.dtype.names is None:
+                raise ValueError("predict_array needs a structured array with named fields")
+            columns = {name: columns[name] for name in columns.dtype.names}
+        return self.predict_frame(pd.DataFrame(columns, copy=False))
+
+    def warm_up(self):
+        """Run one throwaway prediction so the first real request is not the slow one"""
+        row = pd.DataFrame(np.nan, index=[0], columns=self.features)
+        return self.predict_frame(row).tolist()
+
+    def validate(self):
+        """Smoke-test a freshly loaded artifact before it is allowed to serve traffic"""
+        predictions = self.warm_up()
+        if not predictions or not np.all(np.isfinite(predictions)):
+            raise ValueError(f"Model version {self.version} produced an invalid smoke prediction: {predictions}")
+        return predictions
+
+
+class ModelRegistry:
+    """Process-wide store of loaded models, keyed by name and version.
+
+    Models are loaded once and then shared read-only between request threads;
+    the lock only guards loading and the bookkeeping dicts. Swapping the active
+    version only rebinds a reference, so requests that already fetched a model
+    finish on it while new requests get the new one.
+    """
+
+    def __init__(self, history_size=None):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._models = {}
+        self._active = {}
+        self._history = {}
+        self._history_size = history_size
+
+    @property
+    def history_size(self):
+        if self._history_size is not None:
+            return self._history_size
+        return getattr(settings, 'HOUSE_PRICE_MODEL_HISTORY', 3)
+
+    def register(self, model, name=DEFAULT_MODEL_NAME, activate=True):
+        with self._lock:
+            self._models[(name, model.version)] = model
+            if activate or name not in self._active:
+                self._activate_unlocked(name, model.version)
+        return model
+
+    def load(self, name=DEFAULT_MODEL_NAME, model_path=None, version=None, activate=True, warm_up=True):
+        started = time.perf_counter()
+        model = HousePriceModel(model_path, version=version)
+        if warm_up:
+            model.validate()
+        elapsed = time.perf_counter() - started
+        metrics.record_model_load(model.version, elapsed)
+        logger.info("Loaded model %s version %s from %s in %.2fs", name, model.version, model.path, elapsed)
+        return self.register(model, name=name, activate=activate)
+
+    def get(self, name=DEFAULT_MODEL_NAME, version=None):
+        """Return a loaded model, loading the default artifact on first use"""
+        model = self._lookup(name, version)
+        if model is not None:
+            return model
+        if version is not None:
+            raise KeyError(f"Model {name} version {version} is not loaded")
+        # double-checked so concurrent first requests only unpickle once
+        with self._load_lock:
+            model = self._lookup(name, None)
+            if model is None:
+                model = self.load(name=name)
+        return model
+
+    def activate(self, version, name=DEFAULT_MODEL_NAME):
+        with self._lock:
+            if (name, version) not in self._models:
+                raise KeyError(f"Model {name} version {version} is not loaded")
+            self._activate_unlocked(name, version)
+
+    def rollback(self, name=DEFAULT_MODEL_NAME):
+        """Switch back to the previous version still held in memory"""
+        with self._lock:
+            history = self._history.get(name)
+            if not history:
+                raise KeyError(f"No previous version of {name} to roll back to")
+            previous = history.pop()
+            current = self._active.get(name)
+            self._active[name] = previous
+            self._models.pop((name, current), None)
+        logger.warning("Rolled model %s back from %s to %s", name, current, previous)
+        return previous
+
+    def refresh(self, name=DEFAULT_MODEL_NAME):
+        """Load and activate whatever version the model directory currently points at.
+
+        Returns the newly active version, or None when nothing changed. A version
+        that fails to load or to pass its smoke prediction raises, and the current
+        one keeps serving.
+        """
+        version, path = resolve_artifact()
+        if version == self.active_version(name):
+            return None
+        if self._lookup(name, version) is not None:
+            self.activate(version, name=name)
+        else:
+            with self._load_lock:
+                self.load(name=name, model_path=path, version=version)
+        logger.info("Model %s now serving version %s", name, version)
+        return version
+
+    def versions(self, name=DEFAULT_MODEL_NAME):
+        with self._lock:
+            return [v for (n, v) in self._models if n == name]
+
+    def previous_versions(self, name=DEFAULT_MODEL_NAME):
+        with self._lock:
+            return list(self._history.get(name, ()))
+
+    def active_version(self, name=DEFAULT_MODEL_NAME):
+        return self._active.get(name)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._active.clear()
+            self._history.clear()
+
+    def _lookup(self, name, version):
+        with self._lock:
+            version = version or self._active.get(name)
+            return self._models.get((name, version))
+
+    def _activate_unlocked(self, name, version):
+        current = self._active.get(name)
+        if current == version:
+            return
+        history = self._history.setdefault(name, deque(maxlen=self.history_size))
+        if version in history:
+            history.remove(version)
+        if current is not None:
+            history.append(current)
+        self._active[name] = version
+        # keep the active version plus the last N for instant rollback
+        keep = set(history) | {version}
+        for key in [key for key in self._models if key[0] == name and key[1] not in keep]:
+            del self._models[key]
+
+
+class ModelWatcher(threading.Thread):
+    """Background thread that polls the model directory and hot-swaps new versions"""
+
+    def __init__(self, registry, interval, name=DEFAULT_MODEL_NAME):
+        super().__init__(name='house-price-model-watcher', daemon=True)
+        self.registry = registry
+        self.interval = interval
+        self.model_name = name
+        self._stop_event = threading.Event()
+        self._state = artifact_state()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.poll()
+
+    def poll(self):
+        """Refresh the registry if the model directory changed since the last successful refresh.
+
+        The new state is only remembered once the refresh worked, so a version
+        that failed to load (e.g. caught mid-copy) is retried on the next poll.
+        """
+        state = artifact_state()
+        if state == self._state:
+            return
+        try:
+            self.registry.refresh(self.model_name)
+        except Exception:
+            logger.exception("Model watcher could not refresh %s; retrying on the next poll", self.model_name)
+            return
+        self._state = state
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class BatchStats:
+    """Counters describing how full the micro-batches are and how long rows wait for them"""
+
+    FILL_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+    DELAY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100)
+
+    def __init__(self, max_batch_size):
+        self._lock = threading.Lock()
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.rows = 0
+        self.fill_counts = [0] * (len(self.FILL_BUCKETS) + 1)
+        self.delay_counts = [0] * (len(self.DELAY_BUCKETS_MS) + 1)
+        self.delay_total_ms = 0.0
+        self.delay_max_ms = 0.0
+
+    def record(self, batch_size, delays_ms):
+        with self._lock:
+            self.batches += 1
+            self.rows += batch_size
+            self.fill_counts[_bucket(self.FILL_BUCKETS, batch_size)] += 1
+            for delay in delays_ms:
+                self.delay_counts[_bucket(self.DELAY_BUCKETS_MS, delay)] += 1
+                self.delay_total_ms += delay
+                self.delay_max_ms = max(self.delay_max_ms, delay)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'rows': self.rows,
+                'avg_batch_size': self.rows / self.batches if self.batches else 0.0,
+                'avg_batch_fill': self.rows / (self.batches * self.max_batch_size) if self.batches else 0.0,
+                'batch_size_histogram': _histogram(self.FILL_BUCKETS, self.fill_counts),
+                'avg_queue_delay_ms': self.delay_total_ms / self.rows if self.rows else 0.0,
+                'max_queue_delay_ms': self.delay_max_ms,
+                'queue_delay_histogram_ms': _histogram(self.DELAY_BUCKETS_MS, self.delay_counts),
+            }
+
+
+def _bucket(bounds, value):
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            return i
+    return len(bounds)
+
+
+def _histogram(bounds, counts):
+    labels = [f'<={bound}' for bound in bounds] + [f'>{bounds[-1]}']
+    return dict(zip(labels, counts))
+
+
+class PredictionBatcher:
+    """Coalesces concurrent single-row predictions into one batched model call.
+
+    A background thread takes the first queued row, keeps collecting until the
+    batch is full or that row has waited max_wait_ms, then scores the whole
+    batch with one predict_frame call and resolves each caller's Future with
+    a Prediction (price, model_version and the interval bounds, looked up for
+    the whole batch at once).
+    """
+
+    def __init__(self, max_batch_size=64, max_wait_ms=2.0, name=DEFAULT_MODEL_NAME):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.model_name = name
+        self.stats = BatchStats(max_batch_size)
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, row: dict):
+        future = Future()
+        self._ensure_started()
+        self._queue.put((row, future, time.perf_counter()))
+        return future
+
+    def predict(self, row: dict, timeout=None):
+        return self.submit(row).result(timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='house-price-batcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = batch[0][2] + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._execute(batch)
+
+    def _execute(self, batch):
+        started = time.perf_counter()
+        self.stats.record(len(batch), [(started - enqueued) * 1000.0 for _, _, enqueued in batch])
+        try:
+            model = registry.get(self.model_name)
+            with metrics.stage('features'):
+                frame = pd.DataFrame.from_records([row for row, _, _ in batch])
+            predictions = cached_predict_frame(model, frame)
+            bounds = model.bounds(frame, predictions)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for i, (_, future, _) in enumerate(batch):
+            future.set_result(_prediction(model, predictions, bounds, i))
+
+
+def batcher_metrics():
+    """Micro-batcher counters for /metrics, read from its BatchStats"""
+    if _batcher is None:
+        return []
+    stats = _batcher.stats
+    with stats._lock:
+        return [
+            metrics.Counter.of('house_price_batcher_batches_total', 'Micro-batches scored', stats.batches),
+            metrics.Counter.of('house_price_batcher_rows_total', 'Rows scored through the micro-batcher', stats.rows),
+            metrics.Histogram.from_counts('house_price_batcher_batch_rows', 'Rows per micro-batch',
+                                          stats.FILL_BUCKETS, stats.fill_counts, stats.rows),
+            metrics.Histogram.from_counts('house_price_batcher_queue_delay_seconds', 'Time rows waited for their batch',
+                                          [bound / 1000.0 for bound in stats.DELAY_BUCKETS_MS],
+                                          stats.delay_counts, stats.delay_total_ms / 1000.0),
+        ]
+
+
+registry = ModelRegistry()
+metrics.registry.add_collector(batcher_metrics)
+_watcher = None
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_model(name=DEFAULT_MODEL_NAME, version=None):
+    """Shortcut used by views and models to fetch the shared model instance"""
+    return registry.get(name, version)
+
+
+def start_model_watcher(interval=None):
+    global _watcher
+    if interval is None:
+        interval = getattr(settings, 'HOUSE_PRICE_MODEL_WATCH_INTERVAL', 0)
+    if not interval or _watcher is not None:
+        return _watcher
+    _watcher = ModelWatcher(registry, interval)
+    _watcher.start()
+    return _watcher
+
+
+def get_batcher():
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = PredictionBatcher(
+                    max_batch_size=getattr(settings, 'HOUSE_PRICE_BATCH_MAX_SIZE', 64),
+                    max_wait_ms=getattr(settings, 'HOUSE_PRICE_BATCH_MAX_WAIT_MS', 2.0),
+                )
+    return _batcher
+
+
+def confidence_percent(coverage):
+    """PropertySubmission.prediction_confidence for an interval coverage (None when uncalibrated)"""
+    return None if coverage is None else round(coverage * 100, 1)
+
+
+def _prediction(model, predictions, bounds, i):
+    if bounds is None:
+        return Prediction(float(predictions[i]), model.version)
+    return Prediction(float(predictions[i]), model.version, float(bounds[0][i]), float(bounds[1][i]), model.coverage)
 
 
+def predict_one(row: dict):
+    """Score one property, through the micro-batcher when batching is enabled.
 
+    Returns a Prediction (price, model_version, lower, upper).
+    """
+    if getattr(settings, 'HOUSE_PRICE_BATCHING', True):
+        return get_batcher().predict(row)
+    model = get_model()
+    with metrics.stage('features'):
+        frame = pd.DataFrame.from_records([row])
+    predictions = cached_predict_frame(model, frame)
+    return _prediction(model, predictions, model.bounds(frame, predictions), 0)
@@ -1,5 +1,39 @@
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 
 class DashboardConfig(AppConfig):
     name = 'dashboard'
+
+    def ready(self):
+        # Keep MarketAggregate rows and the in-memory indexes in step with model writes
+        from . import comparables, market_stats, recommendations  # noqa: F401
+
+
+def start_server():
+    """Warm up a process that serves requests: load the model and start the background threads.
+
+    Called from realstate/wsgi.py and asgi.py once the apps are loaded
+    (runserver imports wsgi.py too). Management commands such as migrate
+    never import those modules, so they neither load the model nor start
+    the threads; there the model is loaded on first use.
+    """
+    from .comparables import start_index_build
+    from .jobs import start_job_sweeper
+
+    # bulk jobs left behind by a dead worker are resumed at start and on every sweep
+    start_job_sweeper()
+    if getattr(settings, 'HOUSE_PRICE_COMPARABLES_PRELOAD', True):
+        start_index_build()
+    if not getattr(settings, 'HOUSE_PRICE_MODEL_PRELOAD', True):
+        return
+    from .ai_model import registry, start_model_watcher
+    try:
+        registry.get()
+    except Exception:
+        logger.exception("Could not preload the house price model; it will be loaded on first use")
+    start_model_watcher()
@@ -0,0 +1,286 @@
+"""Async versions of the prediction endpoints for ASGI deployments (realstate/asgi.py).
+
+Under ASGI the request body is read without blocking the event loop
+before the view runs. The CPU-bound part of each request runs on one
+bounded thread pool per process: multipart parsing, CSV parsing, feature
+assembly, inference and serialization. Single-row prices go through
+the micro-batcher's futures, so they need no pool thread at all. Once
+workers + queue depth requests are in flight, new ones get 429 with a
+Retry-After header instead of queueing without limit.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from . import metrics
+from .ai_model import get_batcher, get_model, predict_one
+from .explanations import TooManyRows, global_importance
+from .log import log_request
+from .serializers import interval_payload, prediction_rows
+from .views import (
+    SAMPLE_PROPERTY, STREAM_CONTENT_TYPES, analysis_input, analysis_payload, csv_prediction_payload,
+    explain_param, explain_payload, market_insights_payload, recommendations_payload
+)
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class Saturated(Exception):
+    """The inference executor already holds as many requests as it may"""
+
+
+class InferenceExecutor:
+    """Thread pool that refuses work beyond `workers` running plus `queue_depth` waiting calls"""
+
+    def __init__(self, workers, queue_depth):
+        self.workers = workers
+        self.limit = workers + queue_depth
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='house-price-async')
+
+    def submit(self, fn, *args, admitted=False):
+        """Run fn(*args) on the pool; `admitted` work continues a request that already got in"""
+        with self._lock:
+            if self.in_flight >= self.limit and not admitted:
+                self.rejected += 1
+                raise Saturated()
+            self.in_flight += 1
+        # run in a copy of the caller's context so request-scoped log sampling carries over
+        future = self._pool.submit(contextvars.copy_context().run, _call, fn, args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _call(fn, args):
+    # pool threads are long-lived, so drop DB connections the way request_finished would
+    close_old_connections()
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = InferenceExecutor(
+                    getattr(settings, 'HOUSE_PRICE_ASYNC_WORKERS', 4),
+                    getattr(settings, 'HOUSE_PRICE_ASYNC_QUEUE_DEPTH', 16),
+                )
+    return _executor
+
+
+async def offload(fn, *args, admitted=False):
+    """Await fn(*args) on the bounded executor; raises Saturated when it is full"""
+    return await asyncio.wrap_future(get_executor().submit(fn, *args, admitted=admitted))
+
+
+async def price(row):
+    """Prediction for one row without tying up an executor thread"""
+    if getattr(settings, 'HOUSE_PRICE_BATCHING', True):
+        return await asyncio.wrap_future(get_batcher().submit(row))
+    return await offload(predict_one, row)
+
+
+def backpressure(view):
+    """Answer 429 + Retry-After when the executor is saturated"""
+    @functools.wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except Saturated:
+            retry_after = getattr(settings, 'HOUSE_PRICE_ASYNC_RETRY_AFTER', 1)
+            response = JsonResponse({'success': False, 'error': 'Server busy, retry later'}, status=429)
+            response['Retry-After'] = str(retry_after)
+            return response
+
+    return wrapped
+
+
+def _uploaded_csv(request):
+    # multipart parsing of an already buffered body; CPU work, so it runs on the executor
+    return request.FILES.get('file')
+
+
+async def _stream(reader, model, output_format, summary=None):
+    # the response has started: later chunks must not be turned away
+    summary = {} if summary is None else summary
+    summary['rows'] = 0
+    next_id = 1
+    first = True
+    while True:
+        try:
+            body, rows = await offload(_stream_chunk, reader, model, output_format, next_id, first, admitted=True)
+        except Exception as e:
+            summary['error'] = str(e)
+            raise
+        if body is None:
+            break
+        if rows is None:
+            # the in-band NDJSON error line ends the stream
+            summary['error'] = json.loads(body)['error']
+            yield body
+            return
+        next_id += rows
+        first = False
+        yield body
+        summary['rows'] = next_id - 1
+    logger.info("Streamed %d predictions", next_id - 1)
+
+
+def _stream_chunk(reader, model, output_format, next_id, first):
+    chunk = next(reader, None)
+    if chunk is None:
+        return None, 0
+    try:
+        predictions = model.predict_frame(chunk)
+        results = prediction_rows(chunk, predictions, next_id, model.bounds(chunk, predictions))
+    except Exception as e:
+        # same reporting as views._stream_predictions: an NDJSON error line, an aborted CSV
+        logger.error("Streaming prediction failed at row %d: %s", next_id, e, exc_info=True)
+        if output_format != 'ndjson':
+            raise
+        return json.dumps({'success': False, 'error': str(e), 'row': next_id}) + '\n', None
+    with metrics.stage('serialize'):
+        if output_format == 'csv':
+            return results.to_csv(index=False, header=first), len(chunk)
+        return results.to_json(orient='records', lines=True), len(chunk)
+
+
+@csrf_exempt
+@metrics.instrument_view
+@log_request
+@backpressure
+async def model_prediction(request):
+    """Async model_prediction: CSV parsing, inference and serialization run on the executor"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Only POST requests are allowed',
+                             'received_method': request.method}, status=405)
+    try:
+        upload = await offload(_uploaded_csv, request)
+        if upload is None:
+            prediction = await price(SAMPLE_PROPERTY)
+            request.log_summary.update(rows=1, model_version=prediction.version)
+            return JsonResponse({'success': True, 'prediction': prediction.price,
+                                 'interval': interval_payload(prediction), 'test_mode': True,
+                                 'model_version': prediction.version})
+
+        output_format = request.GET.get('format') or request.POST.get('format')
+        if output_format in STREAM_CONTENT_TYPES:
+            model = get_model()
+            chunk_rows = getattr(settings, 'HOUSE_PRICE_STREAM_CHUNK_ROWS', 10000)
+            # open the reader up front so unreadable uploads still get a JSON error
+            reader = await offload(functools.partial(pd.read_csv, upload, chunksize=chunk_rows))
+            request.log_summary.update(model_version=model.version, streaming=output_format)
+            # the summary record is written once the last row has gone out
+            response = StreamingHttpResponse(
+                request.log_summary.stream_async(_stream(reader, model, output_format, request.log_summary)),
+                content_type=STREAM_CONTENT_TYPES[output_format]
+            )
+            response['X-Model-Version'] = model.version
+            return response
+
+        response_data = await offload(csv_prediction_payload, upload, explain_param(request))
+        request.log_summary.update(rows=response_data['count'], model_version=response_data['model_version'])
+        return JsonResponse(response_data)
+    except Saturated:
+        raise
+    except TooManyRows as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=413)
+    except Exception as e:
+        logger.error("async model_prediction failed: %s: %s", type(e).__name__, e, exc_info=True)
+        return JsonResponse({'success': False, 'error': str(e), 'error_type': type(e).__name__}, status=500)
+
+
+@csrf_exempt
+@metrics.instrument_view
+@backpressure
+async def analyze_property(request):
+    """Async analyze_property: price via the micro-batcher, comparables on the executor"""
+    try:
+        with metrics.stage('parse'):
+            data = json.loads(request.body)
+        property_data = analysis_input(data)
+        prediction = await price(property_data)
+        return JsonResponse(await offload(analysis_payload, data, property_data, prediction))
+    except Saturated:
+        raise
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@metrics.instrument_view
+@backpressure
+async def get_recommendations(request):
+    """Async get_recommendations: the index search runs on the executor"""
+    try:
+        data = json.loads(request.body)
+        return JsonResponse(await offload(recommendations_payload, data))
+    except Saturated:
+        raise
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@metrics.instrument_view
+@backpressure
+async def get_market_insights(request):
+    """Async get_market_insights: snapshot and live stats are read on the executor"""
+    try:
+        return JsonResponse(await offload(market_insights_payload))
+    except Saturated:
+        raise
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@metrics.instrument_view
+@backpressure
+async def explain_prediction(request):
+    """Async explain_prediction: importance and contributions are computed on the executor"""
+    try:
+        if request.method == 'GET':
+            return JsonResponse({'success': True, 'importance': await offload(global_importance, get_model())})
+        if request.method != 'POST':
+            return JsonResponse({'success': False, 'error': 'Only GET and POST requests are allowed'}, status=405)
+        with metrics.stage('parse'):
+            data = json.loads(request.body)
+        return JsonResponse(await offload(explain_payload, data))
+    except Saturated:
+        raise
+    except TooManyRows as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=413)
+    except (ValueError, TypeError, KeyError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error("async explain_prediction failed: %s", e, exc_info=True)
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -0,0 +1,367 @@
+"""Nearest-neighbour comparable sales for analyze_property.
+
+Sales from train.csv and verified PropertySubmission rows are indexed per
+Neighborhood on standardized numeric features. Each neighborhood partition
+is immutable: a KD-tree (or plain NumPy brute force for small partitions)
+over its base rows, a small append buffer for sales added since, and a set
+of removed ids. Adding a sale swaps in a new partition object, so queries
+never take a lock; a partition is rebuilt once its buffer grows past
+HOUSE_PRICE_COMPARABLES_REBUILD_ROWS.
+
+Submission writes update the index of the process that made them through
+signals, and bump the shared 'comparables' DataVersion; every other process
+sees the token move and rebuilds its index on the next query.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from sklearn.neighbors import KDTree
+
+from . import datasets
+from .market_stats import submissions_updated
+from .models import DataVersion, PropertySubmission
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ['GrLivArea', 'OverallQual', 'YearBuilt', 'LotArea', 'GarageCars']
+# PropertySubmission field holding each feature
+SUBMISSION_FIELDS = {
+    'GrLivArea': 'living_area',
+    'OverallQual': 'overall_quality',
+    'YearBuilt': 'year_built',
+    'LotArea': 'lot_area',
+    'GarageCars': 'garage_cars',
+}
+
+VERSION_NAME = 'comparables'
+
+_index = None
+# DataVersion token the index was built from (plus this process's own changes since)
+_index_version = None
+_index_lock = threading.Lock()
+# while a build reads the database, submission changes queue up here and are replayed onto
+# the new index before it is published; None when no build is running
+_pending = None
+_pending_lock = threading.Lock()
+
+
+class Partition:
+    """Comparables of one neighborhood: tree over base rows plus an append buffer"""
+
+    def __init__(self, points, raw, prices, ids, brute_force_rows, removed=frozenset(), buffer=None):
+        self.points = points
+        self.raw = raw
+        self.prices = prices
+        self.ids = ids
+        self.removed = removed
+        self.tree = KDTree(points) if len(points) > brute_force_rows else None
+        self.brute_force_rows = brute_force_rows
+        dims = points.shape[1]
+        self.buffer = buffer or (
+            np.empty((0, dims)), np.empty((0, dims)), np.empty(0), np.empty(0, dtype=object)
+        )
+
+    def __len__(self):
+        return len(self.points) - len(self.removed) + len(self.buffer[0])
+
+    @property
+    def pending(self):
+        return len(self.buffer[0]) + len(self.removed)
+
+    def with_sale(self, point, raw, price, sale_id):
+        points, raws, prices, ids = self.buffer
+        buffer = (
+            np.vstack([points, point]), np.vstack([raws, raw]),
+            np.append(prices, price), np.append(ids, np.array([sale_id], dtype=object))
+        )
+        return self._copy(buffer=buffer)
+
+    def without(self, sale_id):
+        points, raws, prices, ids = self.buffer
+        keep = ids != sale_id
+        buffer = (points[keep], raws[keep], prices[keep], ids[keep])
+        removed = self.removed | {sale_id} if sale_id in self._base_ids() else self.removed
+        return self._copy(buffer=buffer, removed=removed)
+
+    def rebuilt(self):
+        """Fold the buffer into the base rows and drop removed sales"""
+        keep = ~np.isin(self.ids, list(self.removed)) if self.removed else slice(None)
+        points, raws, prices, ids = self.buffer
+        return Partition(
+            np.vstack([self.points[keep], points]), np.vstack([self.raw[keep], raws]),
+            np.concatenate([self.prices[keep], prices]), np.concatenate([self.ids[keep], ids]),
+            self.brute_force_rows
+        )
+
+    def nearest(self, point, k):
+        """Up to k (distance, raw, price, id) tuples closest to the scaled query point"""
+        found = []
+        fetch = min(k + len(self.removed), len(self.points))
+        if fetch:
+            if self.tree is not None:
+                distances, rows = self.tree.query(point[None, :], k=fetch)
+                distances, rows = distances[0], rows[0]
+            else:
+                distances, rows = _brute_force(self.points, point, fetch)
+            for distance, row in zip(distances, rows):
+                if self.ids[row] not in self.removed:
+                    found.append((distance, self.raw[row], self.prices[row], self.ids[row]))
+        points, raws, prices, ids = self.buffer
+        if len(points):
+            distances, rows = _brute_force(points, point, min(k, len(points)))
+            found.extend((d, raws[r], prices[r], ids[r]) for d, r in zip(distances, rows))
+        found.sort(key=lambda item: item[0])
+        return found[:k]
+
+    def _base_ids(self):
+        if not hasattr(self, '_id_set'):
+            self._id_set = frozenset(self.ids)
+        return self._id_set
+
+    def _copy(self, buffer, removed=None):
+        partition = Partition.__new__(Partition)
+        partition.__dict__.update(self.__dict__)
+        partition.buffer = buffer
+        partition.removed = self.removed if removed is None else removed
+        return partition
+
+
+def _brute_force(points, point, k):
+    distances = np.sqrt(((points - point) ** 2).sum(axis=1))
+    if k < len(distances):
+        rows = np.argpartition(distances, k - 1)[:k]
+    else:
+        rows = np.arange(len(distances))
+    rows = rows[np.argsort(distances[rows], kind='stable')]
+    return distances[rows], rows
+
+
+class ComparablesIndex:
+    """k-nearest comparable sales, partitioned by neighborhood"""
+
+    def __init__(self, frame, brute_force_rows=None, rebuild_rows=None):
+        """frame has the FEATURES columns plus Neighborhood, SalePrice and id"""
+        self.brute_force_rows = brute_force_rows or getattr(settings, 'HOUSE_PRICE_COMPARABLES_BRUTE_FORCE_ROWS', 1024)
+        self.rebuild_rows = rebuild_rows or getattr(settings, 'HOUSE_PRICE_COMPARABLES_REBUILD_ROWS', 1024)
+        raw = frame[FEATURES].to_numpy(dtype='float64')
+        self.means = np.nanmean(raw, axis=0)
+        scales = np.nanstd(raw, axis=0)
+        self.scales = np.where(scales > 0, scales, 1.0)
+        raw = np.where(np.isnan(raw), self.means, raw)
+        points = (raw - self.means) / self.scales
+        prices = frame['SalePrice'].to_numpy(dtype='float64')
+        ids = frame['id'].to_numpy(dtype=object)
+        neighborhoods = frame['Neighborhood'].fillna('').astype(str).to_numpy()
+        self.partitions = {}
+        self.locations = {}
+        for name in np.unique(neighborhoods):
+            rows = np.flatnonzero(neighborhoods == name)
+            self.partitions[name] = Partition(points[rows], raw[rows], prices[rows], ids[rows], self.brute_force_rows)
+            self.locations.update(dict.fromkeys(ids[rows], name))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(partition) for partition in self.partitions.values())
+
+    def scale(self, features):
+        raw = np.array([features.get(name, np.nan) for name in FEATURES], dtype='float64')
+        raw = np.where(np.isnan(raw), self.means, raw)
+        return raw, (raw - self.means) / self.scales
+
+    def query(self, features, neighborhood=None, k=5):
+        """k nearest sales to `features`; searches every neighborhood when none (or an unknown one) is given"""
+        _, point = self.scale(features)
+        partition = self.partitions.get(neighborhood)
+        partitions = {neighborhood: partition} if partition is not None else dict(self.partitions)
+        found = []
+        for name, partition in partitions.items():
+            found.extend((distance, name, raw, price, sale_id)
+                         for distance, raw, price, sale_id in partition.nearest(point, k))
+        found.sort(key=lambda item: item[0])
+        return [
+            {
+                'id': sale_id,
+                'neighborhood': name,
+                'price': float(price),
+                'sqft': float(raw[0]),
+                'distance': round(float(distance), 4),
+                **{feature: float(value) for feature, value in zip(FEATURES, raw)},
+            }
+            for distance, name, raw, price, sale_id in found[:k]
+        ]
+
+    def add(self, sale_id, neighborhood, features, price):
+        """Add or replace one sale"""
+        raw, point = self.scale(features)
+        with self._lock:
+            self._discard_unlocked(sale_id)
+            partition = self.partitions.get(neighborhood)
+            if partition is None:
+                self.partitions[neighborhood] = Partition(
+                    point[None, :], raw[None, :], np.array([price], dtype='float64'),
+                    np.array([sale_id], dtype=object), self.brute_force_rows
+                )
+            else:
+                self._store(neighborhood, partition.with_sale(point, raw, price, sale_id))
+            self.locations[sale_id] = neighborhood
+
+    def discard(self, sale_id):
+        with self._lock:
+            self._discard_unlocked(sale_id)
+
+    def _discard_unlocked(self, sale_id):
+        neighborhood = self.locations.pop(sale_id, None)
+        if neighborhood is not None:
+            self._store(neighborhood, self.partitions[neighborhood].without(sale_id))
+
+    def _store(self, neighborhood, partition):
+        if partition.pending > self.rebuild_rows:
+            partition = partition.rebuilt()
+        self.partitions[neighborhood] = partition
+
+
+def training_sales():
+    frame = datasets.read('train.csv', columns=['Id', 'Neighborhood', 'SalePrice'] + FEATURES, raw=True)
+    frame['id'] = 'train:' + frame.pop('Id').astype(str)
+    return frame
+
+
+def submission_sales(queryset=None):
+    """Verified submissions with a recorded sale price, in the training column names"""
+    queryset = PropertySubmission.objects.all() if queryset is None else queryset
+    fields = ['pk', 'neighborhood', 'sale_price'] + list(SUBMISSION_FIELDS.values())
+    rows = queryset.filter(is_verified=True, sale_price__isnull=False).values_list(*fields)
+    frame = pd.DataFrame.from_records(list(rows), columns=['pk', 'Neighborhood', 'SalePrice'] + FEATURES)
+    frame['id'] = 'submission:' + frame.pop('pk').astype(str)
+    return frame
+
+
+def build_index():
+    started = time.perf_counter()
+    frames = [training_sales()]
+    try:
+        frames.append(submission_sales())
+    except Exception as e:
+        # e.g. before the submissions table exists
+        logger.warning("Comparables index built without submissions: %s", e)
+    index = ComparablesIndex(pd.concat(frames, ignore_index=True))
+    logger.info("Built comparables index of %d sales in %.2fs", len(index), time.perf_counter() - started)
+    return index
+
+
+def shared_version():
+    try:
+        return DataVersion.current(VERSION_NAME)
+    except DatabaseError:
+        # e.g. before migrate created the table; the index is then built from train.csv alone
+        return None
+
+
+def get_index():
+    """The shared index, built on first use and rebuilt once another process changed the submissions"""
+    global _index, _index_version, _pending
+    version = shared_version()
+    if _index is None or version != _index_version:
+        with _index_lock:
+            # read before the build, so a change committed while it runs moves the token on again
+            version = shared_version()
+            if _index is None or version != _index_version:
+                with _pending_lock:
+                    _pending = []
+                try:
+                    index = build_index()
+                except BaseException:
+                    with _pending_lock:
+                        _pending = None
+                    raise
+                with _pending_lock:
+                    for change in _pending:
+                        change(index)
+                    _index, _index_version, _pending = index, version, None
+    return _index
+
+
+def start_index_build():
+    """Build the index in the background so the first analyze_property call does not wait.
+
+    Called by server processes once the apps are loaded (dashboard.apps.start_server),
+    never from AppConfig.ready(), so management commands do not build it.
+    """
+    thread = threading.Thread(target=get_index, name='comparables-index', daemon=True)
+    thread.start()
+    return thread
+
+
+def apply_change(change):
+    """Run change(index) on this process's index, and tell the other processes to rebuild theirs.
+
+    A change made while a build is running is also queued for the new index.
+    With no index and no build there is nothing to update locally: the next
+    build reads the change from the database.
+    """
+    global _index_version
+    with _pending_lock:
+        index, expected = _index, _index_version
+        if _pending is not None:
+            _pending.append(change)
+            index = None
+    if index is None:
+        DataVersion.bump(VERSION_NAME)
+        return
+    change(index)
+    # when nobody else moved the token since our index was built, our index stays current
+    version = DataVersion.advance(VERSION_NAME, expected)
+    if version is None:
+        DataVersion.bump(VERSION_NAME)
+    else:
+        with _pending_lock:
+            if _index is index and _index_version == expected:
+                _index_version = version
+
+
+def submission_features(instance):
+    return {feature: getattr(instance, field) for feature, field in SUBMISSION_FIELDS.items()}
+
+
+@receiver(post_save, sender=PropertySubmission)
+def update_index_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sale_id = f'submission:{instance.pk}'
+    if instance.is_verified and instance.sale_price is not None:
+        features, neighborhood, price = submission_features(instance), instance.neighborhood, float(instance.sale_price)
+        apply_change(lambda index: index.add(sale_id, neighborhood, features, price))
+    else:
+        apply_change(lambda index: index.discard(sale_id))
+
+
+@receiver(post_delete, sender=PropertySubmission)
+def update_index_on_delete(sender, instance, **kwargs):
+    sale_id = f'submission:{instance.pk}'
+    apply_change(lambda index: index.discard(sale_id))
+
+
+@receiver(submissions_updated)
+def update_index_on_bulk_update(sender, pks, **kwargs):
+    if _index is None and _pending is None:
+        # nothing to update here, but other processes must still rebuild
+        DataVersion.bump(VERSION_NAME)
+        return
+    sales = submission_sales(PropertySubmission.objects.filter(pk__in=pks))
+    removed = set(pks) - {int(sale_id.split(':')[1]) for sale_id in sales['id']}
+    records = sales.to_dict('records')
+
+    def change(index):
+        for pk in removed:
+            index.discard(f'submission:{pk}')
+        for sale in records:
+            index.add(sale['id'], sale['Neighborhood'], sale, float(sale['SalePrice']))
+
+    apply_change(change)
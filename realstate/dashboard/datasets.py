@@ -0,0 +1,170 @@
+"""Typed columnar cache of the Kaggle CSVs (train.csv, test.csv).
+
+The first read of a CSV converts it into a directory holding one .npy file
+per column and a meta.json schema:
+
+* text columns become pandas categoricals, stored as small integer codes
+  with the categories listed in the schema;
+* integer columns are downcast to the smallest integer type holding them;
+* float columns are stored as float32 where that is lossless (the Kaggle
+  floats are integer-valued columns with NaNs), else as float64.
+
+Directories are named after the sha256 of the CSV contents, so an edited
+CSV gets a new cache and readers never see a half-written one. Each read
+only loads the requested columns. read(..., raw=True) restores the exact
+dtypes pd.read_csv would give (int64, float64, object), for code such as
+the training pipeline whose column selection depends on them.
+
+Parquet or feather would need pyarrow, which is not a dependency of this
+project, so the columns are plain NumPy files.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 1
+SCHEMA_FILENAME = 'meta.json'
+
+_lock = threading.Lock()
+# (cache dir, path, mtime_ns, size) -> cache directory, so unchanged files are never re-hashed
+_directories = {}
+# cache directory -> {column name: (schema entry, CategoricalDtype or None)}; directories never change
+_schemas = {}
+
+
+def cache_dir():
+    return str(getattr(settings, 'HOUSE_PRICE_DATASET_CACHE_DIR', os.path.join(settings.DATASET_DIR, '.cache')))
+
+
+def source_path(source):
+    """Absolute path of `source`: a path, or a file name inside DATASET_DIR"""
+    source = str(source)
+    if os.path.dirname(source):
+        return os.path.abspath(source)
+    return os.path.join(settings.DATASET_DIR, source)
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(1 << 20):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _column(values):
+    """(stored array, schema entry) for one CSV column"""
+    if values.dtype == object:
+        categorical = pd.Categorical(values)
+        return categorical.codes, {'kind': 'category', 'categories': categorical.categories.tolist()}
+    if values.dtype.kind in 'iu':
+        return pd.to_numeric(values, downcast='integer').to_numpy(), {'kind': 'int'}
+    array = values.to_numpy(dtype=np.float64)
+    narrow = array.astype(np.float32)
+    if np.array_equal(narrow.astype(np.float64), array, equal_nan=True):
+        array = narrow
+    return array, {'kind': 'float'}
+
+
+def build(path, directory, digest):
+    """Convert the CSV at `path` (content hash `digest`) into the columnar directory `directory`"""
+    frame = pd.read_csv(path)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.build-', dir=parent)
+    try:
+        columns = []
+        for i, name in enumerate(frame.columns):
+            array, entry = _column(frame[name])
+            np.save(os.path.join(staging, f'{i}.npy'), array)
+            columns.append({'name': name, 'file': f'{i}.npy', 'dtype': array.dtype.str, **entry})
+        schema = {'format': FORMAT, 'source': os.path.basename(path), 'sha256': digest, 'rows': len(frame),
+                  'columns': columns}
+        with open(os.path.join(staging, SCHEMA_FILENAME), 'w') as f:
+            json.dump(schema, f)
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            # another process built the same content first
+            if not os.path.exists(os.path.join(directory, SCHEMA_FILENAME)):
+                raise
+            shutil.rmtree(staging, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    logger.info("Cached %s as %d typed columns in %s", path, len(columns), directory)
+
+
+def columnar(source):
+    """Cache directory for `source`, converting the CSV on first use or after it changed"""
+    path = source_path(source)
+    stat = os.stat(path)
+    root = cache_dir()
+    signature = (root, path, stat.st_mtime_ns, stat.st_size)
+    directory = _directories.get(signature)
+    if directory is not None and os.path.isdir(directory):
+        return directory
+    with _lock:
+        digest = file_digest(path)
+        directory = os.path.join(root, f'{os.path.splitext(os.path.basename(path))[0]}-{digest[:16]}')
+        if not os.path.exists(os.path.join(directory, SCHEMA_FILENAME)):
+            build(path, directory, digest)
+        _directories[signature] = directory
+    return directory
+
+
+def schema(source):
+    with open(os.path.join(columnar(source), SCHEMA_FILENAME)) as f:
+        return json.load(f)
+
+
+def column_names(source):
+    return list(_columns(columnar(source)))
+
+
+def _columns(directory):
+    columns = _schemas.get(directory)
+    if columns is None:
+        with open(os.path.join(directory, SCHEMA_FILENAME)) as f:
+            entries = json.load(f)['columns']
+        # building a CategoricalDtype validates its categories; do that once, not on every read
+        columns = _schemas[directory] = {
+            entry['name']: (entry, pd.CategoricalDtype(entry['categories']) if entry['kind'] == 'category' else None)
+            for entry in entries
+        }
+    return columns
+
+
+def read(source, columns=None, raw=False):
+    """DataFrame of `source` (restricted to `columns`, in that order) from the typed columnar cache.
+
+    Columns missing from the file raise KeyError, like usecols does.
+    """
+    directory = columnar(source)
+    entries = _columns(directory)
+    names = list(entries) if columns is None else list(columns)
+    missing = [name for name in names if name not in entries]
+    if missing:
+        raise KeyError(f"{missing} not in {source}")
+    data = {}
+    for name in names:
+        entry, dtype = entries[name]
+        array = np.load(os.path.join(directory, entry['file']))
+        if dtype is not None:
+            values = pd.Categorical.from_codes(array, dtype=dtype, validate=False)
+            data[name] = np.asarray(values, dtype=object) if raw else values
+        elif raw:
+            data[name] = array.astype(np.int64 if entry['kind'] == 'int' else np.float64)
+        else:
+            data[name] = array
+    return pd.DataFrame(data, copy=False)
@@ -0,0 +1,196 @@
+"""Model input features for PropertySubmission rows, one column at a time.
+
+PropertySubmission.get_property_features builds an ~80-key dict per
+instance. build_feature_frame produces the same values for a whole queryset
+or DataFrame with vectorized maps and broadcast constants; the mapping
+tables below are shared by both so they cannot drift apart.
+"""
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+
+MS_SUBCLASS = {
+    'single_family': 20,
+    'townhouse': 30,
+    'condo': 50,
+    'multi_family': 70,
+    'luxury': 80,
+    'commercial': 90,
+    'land': 180
+}
+MS_ZONING = {
+    'single_family': 'RL',
+    'townhouse': 'RM',
+    'condo': 'RM',
+    'multi_family': 'RM',
+    'luxury': 'RL',
+    'commercial': 'C',
+    'land': 'RL'
+}
+BLDG_TYPE = {
+    'single_family': '1Fam',
+    'townhouse': 'TwnhsE',
+    'condo': 'Twnhs',
+    'multi_family': '2fmCon',
+    'luxury': '1Fam',
+    'commercial': '1Fam',
+    'land': '1Fam'
+}
+QUALITY_CODES = {
+    'excellent': 'Ex',
+    'good': 'Gd',
+    'average': 'TA',
+    'fair': 'Fa',
+    'poor': 'Po'
+}
+# basement, fireplace and pool qualities also have a 'none' choice
+OPTIONAL_QUALITY_CODES = {**QUALITY_CODES, 'none': 'NA'}
+DEFAULT_LOT_FRONTAGE = 80
+
+# PropertySubmission fields the features are derived from
+SOURCE_FIELDS = [
+    'property_type', 'neighborhood', 'bedrooms', 'bathrooms', 'living_area', 'lot_area',
+    'year_built', 'year_remodeled', 'overall_quality', 'overall_condition',
+    'garage_cars', 'garage_area', 'basement_area', 'basement_quality',
+    'exterior_quality', 'kitchen_quality', 'has_pool', 'pool_quality',
+    'has_fireplace', 'fireplace_quality'
+]
+
+
+def _mapped(values, mapping, default, dtype=object):
+    # choice fields have a handful of distinct values: map those, then take by code
+    codes, uniques = values if isinstance(values, tuple) else pd.factorize(values, use_na_sentinel=False)
+    return np.array([mapping.get(value, default) for value in uniques], dtype=dtype)[codes]
+
+
+def _optional_quality(values, present):
+    # no feature -> 'NA'; feature with an unknown quality -> 'TA'
+    return np.where(present, _mapped(values, OPTIONAL_QUALITY_CODES, 'TA'), 'NA').astype(object)
+
+
+def submissions_frame(submissions):
+    """SOURCE_FIELDS of already loaded instances as columns"""
+    return pd.DataFrame({field: [getattr(s, field) for s in submissions] for field in SOURCE_FIELDS})
+
+
+def source_frame(data):
+    """SOURCE_FIELDS columns from a queryset, values() dicts or a DataFrame"""
+    if isinstance(data, pd.DataFrame):
+        return data
+    if hasattr(data, 'model') and hasattr(data, 'values_list'):
+        data = data.values_list(*SOURCE_FIELDS)
+    return pd.DataFrame.from_records(list(data), columns=SOURCE_FIELDS)
+
+
+def build_feature_frame(data, now=None):
+    """Model input frame for a PropertySubmission queryset, values() rows or a DataFrame of SOURCE_FIELDS.
+
+    Row i equals get_property_features() of the i-th submission; `now`
+    (default timezone.now(), read once) supplies MoSold/YrSold.
+    """
+    df = source_frame(data)
+    now = now or timezone.now()
+    n = len(df)
+
+    def constant(value):
+        if not isinstance(value, str):
+            return np.full(n, value)
+        column = np.empty(n, dtype=object)
+        column.fill(value)
+        return column
+
+    bedrooms = df['bedrooms'].to_numpy(dtype=np.int64)
+    bathrooms = df['bathrooms'].to_numpy(dtype=np.float64)
+    full_baths = np.trunc(bathrooms)
+    living_area = df['living_area'].to_numpy(dtype=np.int64)
+    lot_area = df['lot_area'].to_numpy(dtype=np.int64)
+    year_built = df['year_built'].to_numpy(dtype=np.int64)
+    remodeled = pd.to_numeric(df['year_remodeled'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+    basement_area = df['basement_area'].to_numpy(dtype=np.int64)
+    has_basement = basement_area > 0
+    has_fireplace = df['has_fireplace'].to_numpy(dtype=bool)
+    has_pool = df['has_pool'].to_numpy(dtype=bool)
+    property_type = pd.factorize(df['property_type'], use_na_sentinel=False)
+
+    # copy=False keeps one block per column; consolidating ~45 object columns costs more than building them
+    return pd.DataFrame({
+        'BedroomAbvGr': bedrooms,
+        'FullBath': full_baths.astype(np.int64),
+        'HalfBath': ((bathrooms - full_baths) * 2).astype(np.int64),
+        'GrLivArea': living_area,
+        'LotArea': lot_area,
+        'OverallQual': df['overall_quality'].to_numpy(dtype=np.int64),
+        'OverallCond': df['overall_condition'].to_numpy(dtype=np.int64),
+        'YearBuilt': year_built,
+        'YearRemodAdd': np.where(remodeled != 0, remodeled, year_built),
+        'GarageCars': df['garage_cars'].to_numpy(dtype=np.int64),
+        'GarageArea': df['garage_area'].to_numpy(dtype=np.int64),
+        'TotalBsmtSF': basement_area,
+        'Neighborhood': df['neighborhood'].to_numpy(dtype=object),
+        'MSSubClass': _mapped(property_type, MS_SUBCLASS, 20, np.int64),
+        'MSZoning': _mapped(property_type, MS_ZONING, 'RL'),
+        'LotFrontage': np.where(lot_area > 0, np.sqrt(np.maximum(lot_area, 0)).astype(np.int64), DEFAULT_LOT_FRONTAGE),
+        'Street': constant('Pave'),
+        'Alley': constant('NA'),
+        'LotShape': constant('Reg'),
+        'LandContour': constant('Lvl'),
+        'Utilities': constant('AllPub'),
+        'LotConfig': constant('Inside'),
+        'LandSlope': constant('Gtl'),
+        'Condition1': constant('Norm'),
+        'Condition2': constant('Norm'),
+        'BldgType': _mapped(property_type, BLDG_TYPE, '1Fam'),
+        'HouseStyle': np.select([bedrooms <= 3, bedrooms <= 5], ['1Story', '2Story'], 'SLvl').astype(object),
+        'RoofStyle': constant('Gable'),
+        'RoofMatl': constant('CompShg'),
+        'Exterior1st': constant('VinylSd'),
+        'Exterior2nd': constant('VinylSd'),
+        'MasVnrType': constant('None'),
+        'MasVnrArea': constant(0),
+        'ExterQual': _mapped(df['exterior_quality'], QUALITY_CODES, 'TA'),
+        'ExterCond': constant('TA'),
+        'Foundation': constant('PConc'),
+        'BsmtQual': _mapped(df['basement_quality'], OPTIONAL_QUALITY_CODES, 'NA'),
+        'BsmtCond': constant('TA'),
+        'BsmtExposure': constant('No'),
+        'BsmtFinType1': constant('GLQ'),
+        'BsmtFinSF1': np.where(has_basement, basement_area * 0.6, 0.0),
+        'BsmtFinType2': constant('Unf'),
+        'BsmtFinSF2': constant(0),
+        'BsmtUnfSF': np.where(has_basement, basement_area * 0.4, 0.0),
+        'Heating': constant('GasA'),
+        'HeatingQC': constant('Ex'),
+        'CentralAir': constant('Y'),
+        'Electrical': constant('SBrkr'),
+        '1stFlrSF': living_area * 0.5,
+        '2ndFlrSF': np.where(bedrooms > 3, living_area * 0.5, 0.0),
+        'LowQualFinSF': constant(0),
+        'BsmtFullBath': constant(0),
+        'BsmtHalfBath': constant(0),
+        'KitchenAbvGr': constant(1),
+        'KitchenQual': _mapped(df['kitchen_quality'], QUALITY_CODES, 'TA'),
+        'TotRmsAbvGrd': bedrooms + 2,
+        'Functional': constant('Typ'),
+        'Fireplaces': has_fireplace.astype(np.int64),
+        'FireplaceQu': _optional_quality(df['fireplace_quality'], has_fireplace),
+        'GarageType': constant('Attchd'),
+        'GarageYrBlt': year_built,
+        'GarageFinish': constant('Fin'),
+        'GarageQual': constant('TA'),
+        'GarageCond': constant('TA'),
+        'PavedDrive': constant('Y'),
+        'WoodDeckSF': constant(0),
+        'OpenPorchSF': constant(100),
+        'EnclosedPorch': constant(0),
+        '3SsnPorch': constant(0),
+        'ScreenPorch': constant(0),
+        'PoolArea': np.where(has_pool, 200, 0),
+        'PoolQC': _optional_quality(df['pool_quality'], has_pool),
+        'Fence': constant('NA'),
+        'MiscFeature': constant('NA'),
+        'MiscVal': constant(0),
+        'MoSold': constant(now.month),
+        'YrSold': constant(now.year),
+        'SaleType': constant('WD'),
+        'SaleCondition': constant('Normal'),
+    }, copy=False)
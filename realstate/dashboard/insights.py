@@ -0,0 +1,236 @@
+"""Market insights snapshot computed once per version of the source data.
+
+get_market_insights used to re-read train.csv and redo every aggregation on
+each request. The snapshot is now keyed by the content hash of the source
+file, stored in MarketInsight and in the Django cache, and only recomputed
+when the file changes or refresh_market_insights is run.
+
+Model metrics and feature impact describe the serving model rather than the
+data, so market_insights_payload adds them on every request.
+"""
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from . import datasets
+from .models import MarketInsight
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'market_insights'
+# the only columns compute_snapshot looks at
+SNAPSHOT_COLUMNS = ['SalePrice', 'YrSold', 'MoSold', 'Neighborhood', 'BldgType']
+
+_compute_lock = threading.Lock()
+# (path, mtime_ns, size) -> sha256, so unchanged files are never re-hashed
+_hash_memo = {}
+
+
+def source_path():
+    return str(getattr(settings, 'MARKET_INSIGHTS_DATA', os.path.join(settings.DATASET_DIR, 'train.csv')))
+
+
+def source_hash(path):
+    """Content hash of the source file, recomputed only when its mtime or size changes"""
+    stat = os.stat(path)
+    signature = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _hash_memo.get(signature)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while block := f.read(1 << 20):
+                sha.update(block)
+        digest = sha.hexdigest()
+        _hash_memo.clear()
+        _hash_memo[signature] = digest
+    return digest
+
+
+def get_market_snapshot(force=False):
+    """Current insights snapshot, or None when there is no source data file"""
+    path = source_path()
+    if not os.path.exists(path):
+        return None
+    digest = source_hash(path)
+    cache_key = f'{CACHE_KEY_PREFIX}:{digest}'
+    if not force:
+        snapshot = cache.get(cache_key)
+        if snapshot is not None:
+            return snapshot
+
+    with _compute_lock:
+        if not force:
+            snapshot = cache.get(cache_key)
+            if snapshot is not None:
+                return snapshot
+            stored = MarketInsight.objects.filter(insights__source_hash=digest).first()
+            if stored is not None:
+                cache.set(cache_key, stored.insights, None)
+                return stored.insights
+
+        logger.info("Computing market insights snapshot from %s", path)
+        available = datasets.column_names(path)
+        df = datasets.read(path, columns=[column for column in SNAPSHOT_COLUMNS if column in available])
+        snapshot = compute_snapshot(df)
+        snapshot['source_hash'] = digest
+        MarketInsight.objects.create(
+            insights=snapshot,
+            avg_price=snapshot['avg_price'],
+            min_price=snapshot['min_price'],
+            max_price=snapshot['max_price'],
+            total_properties=snapshot['total_properties'],
+            avg_days_on_market=snapshot['days_on_market']
+        )
+        cache.set(cache_key, snapshot, None)
+        return snapshot
+
+
+def compute_snapshot(df):
+    """Every aggregate the dashboard shows, computed in one pass over the source frame"""
+    # Calculate real insights from data
+    avg_price = df['SalePrice'].mean() if 'SalePrice' in df.columns else 250000
+    min_price = df['SalePrice'].min() if 'SalePrice' in df.columns else 100000
+    max_price = df['SalePrice'].max() if 'SalePrice' in df.columns else 500000
+
+    # Calculate price trend (simulate based on time)
+    if 'YrSold' in df.columns and 'MoSold' in df.columns:
+        # Group by sale month to get trends (MoSold is already the calendar month)
+        monthly_prices = df.groupby('MoSold')['SalePrice'].mean()
+
+        # Calculate year-over-year change
+        if len(monthly_prices) > 1:
+            price_trend = ((monthly_prices.iloc[-1] - monthly_prices.iloc[0]) / monthly_prices.iloc[0]) * 100
+            avg_price_trend = f"+{price_trend:.1f}%" if price_trend > 0 else f"{price_trend:.1f}%"
+        else:
+            avg_price_trend = "+5.2%"  # Fallback
+    else:
+        avg_price_trend = "+5.2%"
+
+    # Calculate top neighborhoods
+    if 'Neighborhood' in df.columns and 'SalePrice' in df.columns:
+        neighborhood_stats = df.groupby('Neighborhood', observed=True)['SalePrice'].agg(['mean', 'count']).reset_index()
+        top_neighborhoods = neighborhood_stats.nlargest(3, 'mean')
+        top_neighborhoods_list = []
+        for _, row in top_neighborhoods.iterrows():
+            top_neighborhoods_list.append({
+                'name': row['Neighborhood'],
+                'avg_price': int(row['mean']),
+                'count': int(row['count'])
+            })
+    else:
+        top_neighborhoods_list = [
+            {'name': 'NoRidge', 'avg_price': 750000, 'count': 45},
+            {'name': 'StoneBr', 'avg_price': 680000, 'count': 32},
+            {'name': 'NridgHt', 'avg_price': 680000, 'count': 28}
+        ]
+
+    # Calculate seasonal trends from actual data
+    if 'MoSold' in df.columns and 'SalePrice' in df.columns:
+        monthly_avg = df.groupby('MoSold')['SalePrice'].mean()
+        seasonal_trends_list = []
+        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+        for month_num in range(1, 13):
+            if month_num in monthly_avg.index:
+                avg_price_month = int(monthly_avg[month_num])
+            else:
+                # Generate realistic seasonal pattern
+                base_price = 280000
+                seasonal_factor = 1 + 0.15 * np.sin((month_num - 6) * np.pi / 6)
+                avg_price_month = int(base_price * seasonal_factor)
+
+            seasonal_trends_list.append({
+                'month': months[month_num - 1],
+                'avg_price': avg_price_month
+            })
+    else:
+        seasonal_trends_list = [
+            {'month': 'Jan', 'avg_price': 280000},
+            {'month': 'Feb', 'avg_price': 285000},
+            {'month': 'Mar', 'avg_price': 295000},
+            {'month': 'Apr', 'avg_price': 305000},
+            {'month': 'May', 'avg_price': 315000},
+            {'month': 'Jun', 'avg_price': 325000},
+            {'month': 'Jul', 'avg_price': 320000},
+            {'month': 'Aug', 'avg_price': 310000},
+            {'month': 'Sep', 'avg_price': 300000},
+            {'month': 'Oct', 'avg_price': 290000},
+            {'month': 'Nov', 'avg_price': 285000},
+            {'month': 'Dec', 'avg_price': 280000}
+        ]
+
+    # Calculate property distribution
+    if 'BldgType' in df.columns:
+        property_counts = df['BldgType'].value_counts(normalize=True) * 100
+        property_distribution_list = []
+
+        # Map building types to categories
+        type_mapping = {
+            '1Fam': 'Single Family',
+            '2fmCon': 'Duplex',
+            'Duplex': 'Multi-Family',
+            'TwnhsE': 'Townhouse',
+            'Twnhs': 'Townhouse'
+        }
+
+        for bldg_type, percentage in property_counts.items():
+            category = type_mapping.get(bldg_type, bldg_type)
+            property_distribution_list.append({
+                'type': category,
+                'percentage': round(percentage, 1)
+            })
+
+        # Limit to top 5 categories
+        property_distribution_list = sorted(property_distribution_list, key=lambda x: x['percentage'], reverse=True)[:5]
+    else:
+        property_distribution_list = [
+            {'type': 'Single Family', 'percentage': 45},
+            {'type': 'Townhouse', 'percentage': 25},
+            {'type': 'Condo', 'percentage': 15},
+            {'type': 'Multi-Family', 'percentage': 10},
+            {'type': 'Luxury', 'percentage': 5}
+        ]
+
+    insights = {
+        'avg_price_trend': avg_price_trend,
+        'days_on_market': 42,  # This would come from actual data if available
+        'avg_price': int(avg_price),
+        'min_price': int(min_price),
+        'max_price': int(max_price),
+        'total_properties': len(df),
+        'top_neighborhoods': top_neighborhoods_list,
+        'seasonal_trends': seasonal_trends_list,
+        'property_distribution': property_distribution_list,
+        'data_source': 'real_data',
+        'last_updated': datetime.now().isoformat()
+    }
+    return insights
+
+
+
+def serving_model_metrics(model):
+    """Holdout metrics of the serving model version, from its interval calibration.
+
+    These depend on the model, not on the source data, so they are not part
+    of the cached snapshot. None when the version was never calibrated.
+    """
+    if model.intervals is None:
+        return None
+    calibration = model.intervals.metrics
+    return {
+        'accuracy': round(calibration['r2'] * 100, 1),
+        # relative half-width of the interval at its nominal coverage
+        'error_margin': round(calibration['margin'] * 100, 1),
+        'coverage': round(model.intervals.coverage * 100, 1),
+        'r2_score': round(calibration['r2'], 4),
+        'rmse': round(calibration['rmse']),
+        'mae': round(calibration['mae']),
+        'holdout_rows': calibration['rows'],
+        'model_version': model.version,
+    }
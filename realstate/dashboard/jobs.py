@@ -0,0 +1,230 @@
+import csv
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .ai_model import HousePriceModel, available_versions, get_model, resolve_artifact
+from .models import PredictionJob
+from .parallel import get_scorer
+from .serializers import prediction_rows
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# jobs sitting in (or running on) this process's pool, so a sweep never queues one twice
+_pending = set()
+_sweeper = None
+
+
+def get_executor():
+    """Local worker pool shared by every job submitted to this process"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'HOUSE_PRICE_JOB_WORKERS', 2),
+                thread_name_prefix='prediction-job'
+            )
+    return _executor
+
+
+def submit_job(upload, user=None):
+    """Store the upload and queue it; returns the PredictionJob"""
+    job = PredictionJob(
+        user=user if user is not None and user.is_authenticated else None,
+        original_filename=upload.name,
+        chunk_rows=getattr(settings, 'HOUSE_PRICE_JOB_CHUNK_ROWS', 50000)
+    )
+    job.input_file.save(f'{job.id}.csv', upload, save=False)
+    job.save()
+    enqueue(job.pk)
+    return job
+
+
+def enqueue(job_id):
+    """Queue a job on this process's pool; False when it is already queued or running here"""
+    with _executor_lock:
+        if job_id in _pending:
+            return False
+        _pending.add(job_id)
+    get_executor().submit(run_job, job_id)
+    return True
+
+
+def stale_jobs():
+    """Queued jobs plus running ones whose worker stopped sending progress"""
+    stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'HOUSE_PRICE_JOB_STALE_SECONDS', 300))
+    return PredictionJob.objects.filter(Q(status='queued') | Q(status='running', updated_at__lt=stale_before))
+
+
+def resume_stale_jobs():
+    job_ids = [job_id for job_id in stale_jobs().order_by('created_at').values_list('pk', flat=True)
+               if enqueue(job_id)]
+    if job_ids:
+        logger.info("Resuming %d prediction jobs", len(job_ids))
+    return job_ids
+
+
+class JobSweeper(threading.Thread):
+    """Background thread that queues jobs left behind by dead workers: once at start, then periodically"""
+
+    def __init__(self, interval):
+        super().__init__(name='prediction-job-sweeper', daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                resume_stale_jobs()
+            except Exception:
+                logger.exception("Prediction job sweep failed")
+            finally:
+                close_old_connections()
+            if self._stop_event.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_job_sweeper(interval=None):
+    global _sweeper
+    if interval is None:
+        interval = getattr(settings, 'HOUSE_PRICE_JOB_SWEEP_SECONDS', 60)
+    if not interval or _sweeper is not None:
+        return _sweeper
+    _sweeper = JobSweeper(interval)
+    _sweeper.start()
+    return _sweeper
+
+
+def claim_job(job_id):
+    """Atomically mark a job as ours so two workers never process it at once"""
+    return stale_jobs().filter(pk=job_id).update(status='running', updated_at=timezone.now()) == 1
+
+
+def run_job(job_id):
+    close_old_connections()
+    try:
+        if not claim_job(job_id):
+            return
+        process_job(PredictionJob.objects.get(pk=job_id))
+    except Exception as e:
+        logger.exception("Prediction job %s failed", job_id)
+        now = timezone.now()
+        PredictionJob.objects.filter(pk=job_id).update(status='failed', error=str(e), finished_at=now, updated_at=now)
+    finally:
+        with _executor_lock:
+            _pending.discard(job_id)
+        close_old_connections()
+
+
+def job_model(job):
+    """The model a job started with, so a resumed job is scored by one version throughout.
+
+    A new job gets the active model. When a resumed job's version can no
+    longer be loaded, the active model takes over and the switch is recorded
+    in job.resumed_model_version.
+    """
+    model = get_model()
+    if not job.model_version or job.model_version == model.version:
+        return model
+    try:
+        return get_model(version=job.model_version)
+    except KeyError:
+        pass
+    if job.model_version in available_versions():
+        original = HousePriceModel(resolve_artifact(job.model_version)[1], version=job.model_version)
+        original.validate()
+        return original
+    logger.warning("Prediction job %s started on model %s, which is gone; resuming on %s",
+                   job.id, job.model_version, model.version)
+    job.resumed_model_version = model.version
+    return model
+
+
+def process_job(job):
+    model = job_model(job)
+    scorer = get_scorer(model)
+    input_path = job.input_file.path
+    if job.total_rows is None:
+        job.total_rows = count_rows(input_path)
+    if not job.output_file:
+        job.output_file.name = f'prediction_jobs/output/{job.id}.csv'
+    output_path = job.output_file.path
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    job.started_at = job.started_at or timezone.now()
+    job.model_version = job.model_version or model.version
+    job.save(update_fields=[
+        'total_rows', 'output_file', 'started_at', 'model_version', 'resumed_model_version', 'updated_at'
+    ])
+    if job.rows_done:
+        logger.info("Resuming prediction job %s after %d rows", job.id, job.rows_done)
+
+    # drop anything written after the last committed chunk, then append from there
+    with open(output_path, 'r+b' if os.path.exists(output_path) else 'wb') as out:
+        out.truncate(job.output_bytes)
+        out.seek(job.output_bytes)
+        for chunk in read_chunks(input_path, job.chunk_rows, job.rows_done):
+            predictions = scorer.predict_frame(chunk)
+            data = prediction_rows(chunk, predictions, job.rows_done + 1, model.bounds(chunk, predictions)).to_csv(
+                index=False, header=(job.chunks_done == 0)
+            ).encode()
+            out.write(data)
+            out.flush()
+            os.fsync(out.fileno())
+            job.rows_done += len(chunk)
+            job.chunks_done += 1
+            job.output_bytes += len(data)
+            PredictionJob.objects.filter(pk=job.pk).update(
+                rows_done=job.rows_done, chunks_done=job.chunks_done,
+                output_bytes=job.output_bytes, updated_at=timezone.now()
+            )
+
+    now = timezone.now()
+    PredictionJob.objects.filter(pk=job.pk).update(
+        status='completed', total_rows=job.rows_done, finished_at=now, updated_at=now
+    )
+    logger.info("Prediction job %s completed: %d rows", job.id, job.rows_done)
+
+
+def read_chunks(path, chunk_rows, skip_rows=0):
+    """DataFrame chunks of a CSV, starting after its first `skip_rows` data rows"""
+    skip_to = record_index(path, skip_rows)
+    # a callable keeps skipping cheap; a range would be materialised as a set
+    skiprows = (lambda i: 0 < i <= skip_to) if skip_to else None
+    return pd.read_csv(path, chunksize=chunk_rows, skiprows=skiprows)
+
+
+def _records(path):
+    # pandas numbers rows the same way: a quoted field spanning lines is one row, a blank line is a row too
+    with open(path, newline='', encoding='utf-8', errors='replace') as f:
+        yield from csv.reader(f)
+
+
+def record_index(path, data_rows):
+    """Index of the CSV record holding data row number `data_rows` (blank lines are not data rows)"""
+    if not data_rows:
+        return 0
+    seen = index = 0
+    for index, record in enumerate(_records(path)):
+        if index and record:
+            seen += 1
+            if seen == data_rows:
+                return index
+    return index
+
+
+def count_rows(path):
+    """Data rows in a CSV (records minus the header, blank lines skipped), used for progress and ETA"""
+    return max(sum(1 for record in _records(path) if record) - 1, 0)
@@ -0,0 +1,195 @@
+"""Production logging for the prediction path: JSON lines written off the request thread.
+
+Selected with HOUSE_PRICE_LOG_FORMAT=json (see settings.LOGGING). Records
+are put on a queue by queue_handler() and formatted and written by a
+QueueListener thread, so a slow disk never blocks a request. Each request
+wrapped in `request_log()` ends with one summary record (view, status,
+rows, duration, model version); for a streamed response, once its body ends. DEBUG detail is kept for a sampled
+fraction of requests only; callers pass %-style arguments so records
+dropped by level are never formatted.
+"""
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction
+
+summary_logger = logging.getLogger('dashboard.requests')
+
+# True/False while a request decided whether to keep its DEBUG records, None outside requests
+_sampled = contextvars.ContextVar('house_price_log_sampled', default=None)
+
+# attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with `extra=` fields as top-level keys"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DebugSampleFilter(logging.Filter):
+    """Let through all records above DEBUG, and DEBUG records of a `rate` fraction of requests"""
+
+    def __init__(self, rate=0.01):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        sampled = _sampled.get()
+        return sampled if sampled is not None else random.random() < self.rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # the queue never leaves the process: pass the record on unformatted,
+        # the listener thread does the %-formatting and JSON encoding
+        return record
+
+
+def queue_handler(filename=None, stream=True):
+    """QueueHandler whose listener thread writes JSON lines to `filename` and/or stderr.
+
+    Used as a dictConfig handler factory ('()': 'dashboard.log.queue_handler');
+    level and filters from the config apply on the request thread, before queueing.
+    """
+    targets = []
+    if stream:
+        targets.append(logging.StreamHandler(sys.stderr))
+    if filename:
+        targets.append(logging.FileHandler(filename))
+    formatter = JsonFormatter()
+    for target in targets:
+        target.setFormatter(formatter)
+    handler = _QueueHandler(queue.SimpleQueue())
+    listener = logging.handlers.QueueListener(handler.queue, *targets, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    handler.listener = listener
+    return handler
+
+
+class RequestSummary(dict):
+    """Fields of one request's summary record.
+
+    A view whose response body is streamed hands the record over to the body
+    with stream()/stream_async(): it is then written when the stream finishes,
+    fails or is closed, with the rows and time of the whole response.
+    """
+
+    def __init__(self, view):
+        super().__init__(view=view)
+        self.started = time.perf_counter()
+        self.deferred = False
+
+    def emit(self):
+        self['duration_ms'] = round((time.perf_counter() - self.started) * 1000.0, 2)
+        summary_logger.info("%s %s rows=%s in %.1fms", self['view'], self.get('status', '-'),
+                            self.get('rows', '-'), self['duration_ms'], extra=dict(self))
+
+    def stream(self, chunks):
+        """Wrap a response body iterator so the summary is written once it ends"""
+        self.deferred = True
+        return self._stream(chunks)
+
+    def stream_async(self, chunks):
+        """stream() for an async response body"""
+        self.deferred = True
+        return self._stream_async(chunks)
+
+    def _stream(self, chunks):
+        outcome = 'closed'
+        try:
+            yield from chunks
+            outcome = 'error' if 'error' in self else 'completed'
+        except Exception as e:
+            outcome = 'error'
+            self.setdefault('error', str(e))
+            raise
+        finally:
+            self['stream'] = outcome
+            self.emit()
+
+    async def _stream_async(self, chunks):
+        outcome = 'closed'
+        try:
+            async for chunk in chunks:
+                yield chunk
+            outcome = 'error' if 'error' in self else 'completed'
+        except Exception as e:
+            outcome = 'error'
+            self.setdefault('error', str(e))
+            raise
+        finally:
+            self['stream'] = outcome
+            self.emit()
+
+
+@contextmanager
+def request_log(view, sample_rate=None):
+    """Time one request and log its summary line when it ends.
+
+    Yields a RequestSummary the view fills in (rows, model_version, status, ...);
+    every key ends up in the summary record. A streamed response logs it
+    when its body ends instead (RequestSummary.stream).
+    """
+    if sample_rate is None:
+        from django.conf import settings
+        sample_rate = getattr(settings, 'HOUSE_PRICE_LOG_DEBUG_SAMPLE_RATE', 1.0)
+    token = _sampled.set(random.random() < sample_rate)
+    summary = RequestSummary(view)
+    try:
+        yield summary
+    finally:
+        _sampled.reset(token)
+        if not summary.deferred:
+            summary.emit()
+
+
+def log_request(view):
+    """Wrap a function view (sync or async) in request_log(); the view adds fields through request.log_summary"""
+
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapped_async(request, *args, **kwargs):
+            with request_log(view.__name__) as summary:
+                request.log_summary = summary
+                response = await view(request, *args, **kwargs)
+                summary['status'] = response.status_code
+                return response
+
+        return wrapped_async
+
+    @functools.wraps(view)
+    def wrapped(request, *args, **kwargs):
+        with request_log(view.__name__) as summary:
+            request.log_summary = summary
+            response = view(request, *args, **kwargs)
+            summary['status'] = response.status_code
+            return response
+
+    return wrapped
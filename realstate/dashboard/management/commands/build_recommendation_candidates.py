@@ -0,0 +1,21 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.recommendations import build_candidates
+
+
+class Command(BaseCommand):
+    help = "Score listings from a CSV with the active model and store them as recommendation candidates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', nargs='?', default=str(settings.DATASET_DIR / 'train.csv'))
+        parser.add_argument('--price-column', default='SalePrice', help="Column holding the listed price")
+        parser.add_argument('--chunk-rows', type=int, default=settings.HOUSE_PRICE_JOB_CHUNK_ROWS)
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['csv']):
+            raise CommandError(f"{options['csv']} not found")
+        count = build_candidates(options['csv'], options['price_column'], options['chunk_rows'])
+        self.stdout.write(self.style.SUCCESS(f"Stored {count} recommendation candidates"))
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.ai_model import HousePriceModel, resolve_artifact
+from dashboard.intervals import (
+    DEFAULT_BANDS, DEFAULT_COVERAGE, DEFAULT_MIN_GROUP, ConformalIntervals, intervals_path,
+)
+from dashboard.training import holdout_split, load_training_frame, neighborhoods
+
+
+class Command(BaseCommand):
+    help = ("Calibrate split-conformal prediction intervals for a model version on the train.csv holdout "
+            "and store them next to its artifact (intervals.json)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', nargs='?', help='Version to calibrate (default: the one workers currently serve)')
+        parser.add_argument('--data', default=str(settings.DATASET_DIR / 'train.csv'),
+                            help='CSV the version was trained on; only its 20%% holdout split is used')
+        parser.add_argument('--coverage', type=float, default=DEFAULT_COVERAGE, help='Target interval coverage')
+        parser.add_argument('--bands', type=int, default=DEFAULT_BANDS, help='Predicted price bands')
+        parser.add_argument('--min-group', type=int, default=DEFAULT_MIN_GROUP,
+                            help='Smallest neighborhood/band group with its own quantile')
+
+    def handle(self, *args, **options):
+        if not 0 < options['coverage'] < 1:
+            raise CommandError("--coverage must be between 0 and 1")
+        version, path = resolve_artifact(options['source'])
+        try:
+            model = HousePriceModel(path, version=version)
+            X, y = load_training_frame(options['data'])
+        except (FileNotFoundError, KeyError) as e:
+            raise CommandError(str(e))
+        # the rows the version never trained on: the same split training.train holds out
+        _, X_holdout, _, y_holdout = holdout_split(X, y)
+        try:
+            intervals = ConformalIntervals.calibrate(
+                model.predict_frame(X_holdout), y_holdout.to_numpy(), neighborhoods(X_holdout),
+                coverage=options['coverage'], bands=options['bands'], min_group=options['min_group'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        target = intervals_path(path)
+        intervals.save(target)
+        self.stdout.write(self.style.SUCCESS(
+            f"Calibrated {version} on {len(X_holdout)} holdout rows: {intervals.coverage:.0%} interval "
+            f"±{intervals.metrics['margin']:.1%} overall, {len(intervals.neighborhoods)} neighborhoods ({target}). "
+            f"Workers use it once they load the version again."
+        ))
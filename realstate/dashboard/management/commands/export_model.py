@@ -0,0 +1,58 @@
+import os
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import datasets
+from dashboard.ai_model import (
+    HousePriceModel, export_compact, model_dir, resolve_artifact, write_active_version,
+)
+
+
+class Command(BaseCommand):
+    help = ("Export a model version as a compact artifact (XGBoost UBJSON booster + memory-mapped NumPy "
+            "preprocessing arrays) and publish it as a new version")
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', nargs='?', help='Version to export (default: the one workers currently serve)')
+        parser.add_argument('--name', help='Version name of the export (default: <version>-compact)')
+        parser.add_argument('--activate', action='store_true', help='Pin the ACTIVE pointer to the export')
+
+    def handle(self, *args, **options):
+        version, path = resolve_artifact(options['source'])
+        name = options['name'] or f'{version}-compact'
+        target = os.path.join(model_dir(), name)
+        if os.path.exists(target):
+            raise CommandError(f"Version {name} already exists")
+
+        try:
+            source = HousePriceModel(path, version=version, fast_path=True)
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        if source.compiled is None:
+            raise CommandError(f"Version {version} cannot be compiled, so it has no compact form")
+        load_seconds = []
+
+        def check(manifest):
+            # the export must score exactly like the pickle before it is renamed into the model directory
+            started = time.perf_counter()
+            exported = HousePriceModel(manifest, version=name)
+            load_seconds.append(time.perf_counter() - started)
+            frame = datasets.read('test.csv', raw=True)
+            if not np.array_equal(source.predict_frame(frame), exported.predict_frame(frame)):
+                raise CommandError("Exported model does not reproduce the source predictions; nothing published")
+
+        try:
+            export_compact(source, target, check=check)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        size = sum(os.path.getsize(os.path.join(target, f)) for f in os.listdir(target))
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {version} as {name}: {size / 1024:.0f} KiB (pickle {os.path.getsize(path) / 1024:.0f} KiB), "
+            f"loads in {load_seconds[0] * 1000:.0f} ms"
+        ))
+        if options['activate']:
+            write_active_version(name)
+            self.stdout.write(self.style.SUCCESS(f"Workers will switch to version {name} on their next poll"))
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.ai_model import (
+    ARTIFACT_FILENAME, HousePriceModel, available_versions, model_dir, resolve_artifact, rollback_active_version,
+    write_active_version,
+)
+
+
+class Command(BaseCommand):
+    help = "List, publish, activate or roll back house price model versions without restarting workers"
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+        subparsers.add_parser('list', help='Show the available versions')
+        publish = subparsers.add_parser('publish', help='Copy an artifact into the model directory')
+        publish.add_argument('artifact', help='Path to a joblib artifact with "pipeline" and "features"')
+        publish.add_argument('version', help='Version name, e.g. 2026-10-18-a')
+        publish.add_argument('--activate', action='store_true', help='Pin the ACTIVE pointer to the new version')
+        activate = subparsers.add_parser('activate', help='Switch every worker to a version')
+        activate.add_argument('version')
+        subparsers.add_parser('rollback', help='Switch back to the previously active version')
+
+    def handle(self, *args, **options):
+        action = options['action']
+        if action == 'list':
+            active = resolve_artifact()[0]
+            for version in available_versions():
+                marker = '*' if version == active else ' '
+                self.stdout.write(f"{marker} {version}")
+            if not available_versions():
+                self.stdout.write(f"* {active} (legacy artifact)")
+        elif action == 'publish':
+            self.publish(options['artifact'], options['version'], options['activate'])
+        elif action == 'activate':
+            self.activate(options['version'])
+        elif action == 'rollback':
+            try:
+                previous = rollback_active_version()
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"Workers will switch back to version {previous} on their next poll"))
+
+    def publish(self, artifact, version, activate):
+        target_dir = os.path.join(model_dir(), version)
+        if os.path.exists(target_dir):
+            raise CommandError(f"Version {version} already exists")
+        # smoke test before any worker can see it
+        try:
+            HousePriceModel(artifact, version=version).validate()
+        except Exception as e:
+            raise CommandError(f"Artifact failed validation: {e}")
+        # copy into a staging directory and rename it into place, so watchers never see a partial pickle
+        root = model_dir()
+        os.makedirs(root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.publish-', dir=root)
+        try:
+            shutil.copyfile(artifact, os.path.join(staging, ARTIFACT_FILENAME))
+            os.rename(staging, target_dir)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self.stdout.write(self.style.SUCCESS(f"Published version {version}"))
+        if activate:
+            self.activate(version)
+
+    def activate(self, version):
+        try:
+            write_active_version(version)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Workers will switch to version {version} on their next poll"))
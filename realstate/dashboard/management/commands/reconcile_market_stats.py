@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.market_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the incremental market statistics from PropertySubmission rows and report drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report drift, do not rewrite the aggregates")
+
+    def handle(self, *args, **options):
+        drift = rebuild(dry_run=options['dry_run'])
+        for scope, key, field, stored, expected in drift:
+            self.stdout.write(f"{scope}:{key or '-'} {field}: stored={stored} expected={expected}")
+        action = "found" if options['dry_run'] else "corrected"
+        self.stdout.write(self.style.SUCCESS(f"Market stats reconciled: {len(drift)} drifted values {action}"))
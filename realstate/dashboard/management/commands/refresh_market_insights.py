@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.insights import get_market_snapshot, source_path
+
+
+class Command(BaseCommand):
+    help = "Recompute the cached market insights snapshot from the source data file"
+
+    def handle(self, *args, **options):
+        snapshot = get_market_snapshot(force=True)
+        if snapshot is None:
+            raise CommandError(f"Source data not found at {source_path()}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Market insights refreshed: {snapshot['total_properties']} properties, "
+            f"source {snapshot['source_hash'][:12]}"
+        ))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.repredict import repredict_submissions
+
+
+class Command(BaseCommand):
+    help = "Re-score property submissions with the active model, resuming where an earlier run stopped"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Submissions per model call')
+        parser.add_argument('--force', action='store_true',
+                            help='Also re-score rows already priced by the active model version')
+        parser.add_argument('--after', type=int, default=0, help='Only submissions with a larger primary key')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(done, total, last_pk):
+            elapsed = time.perf_counter() - started
+            rate = done / elapsed if elapsed else 0.0
+            eta = (total - done) / rate if rate else 0.0
+            self.stdout.write(f"{done}/{total} submissions ({rate:,.0f}/s, ETA {eta:,.0f}s, last pk {last_pk})")
+
+        count = repredict_submissions(
+            chunk_size=options['chunk_size'], force=options['force'], after=options['after'], progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(f"Re-scored {count} submissions in {time.perf_counter() - started:.1f}s"))
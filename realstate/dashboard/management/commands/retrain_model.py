@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dashboard.ai_model import HousePriceModel, resolve_artifact, write_active_version
+from dashboard.retraining import MODES, retrain
+from dashboard.training import publish
+
+
+class Command(BaseCommand):
+    help = ("Retrain the current model version on verified sales it has not seen yet and publish the result "
+            "only if its holdout error does not regress")
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?', help='Version name (default: <parent>+<mode>-<timestamp>)')
+        parser.add_argument('--source', help='Version to start from (default: the one workers currently serve)')
+        parser.add_argument('--mode', choices=MODES, default='boost',
+                            help='boost: add rounds fitted on the new rows; window: refit on the most recent sales')
+        parser.add_argument('--rounds', type=int, default=50, help='Rounds added in boost mode')
+        parser.add_argument('--learning-rate', type=float, help='Learning rate of the new rounds (default: unchanged)')
+        parser.add_argument('--window', type=int, help='Most recent sales used in window mode (default: all)')
+        parser.add_argument('--holdout-fraction', type=float, default=0.2, help='Share of the new rows held out')
+        parser.add_argument('--tolerance', type=float, default=0.0,
+                            help='Accept a holdout RMSE up to this fraction above the current model')
+        parser.add_argument('--min-rows', type=int, default=1, help='Do nothing with fewer new verified sales')
+        parser.add_argument('--dry-run', action='store_true', help='Report the comparison without publishing')
+        parser.add_argument('--activate', action='store_true', help='Pin the ACTIVE pointer to the new version')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['holdout_fraction'] < 1:
+            raise CommandError("--holdout-fraction must be in [0, 1)")
+        version, path = resolve_artifact(options['source'])
+        try:
+            model = HousePriceModel(path, version=version)
+            result = retrain(model, mode=options['mode'], rounds=options['rounds'],
+                             learning_rate=options['learning_rate'], window=options['window'],
+                             holdout_fraction=options['holdout_fraction'], tolerance=options['tolerance'],
+                             min_rows=options['min_rows'])
+        except (FileNotFoundError, ValueError) as e:
+            raise CommandError(str(e))
+        if result is None:
+            self.stdout.write(f"Fewer than {options['min_rows']} new verified sales for version {version}; nothing to do")
+            return
+
+        metrics = result.metrics
+        self.stdout.write(
+            f"{metrics['mode']} from {version}: {metrics['rows']['new']} new sales, trained on "
+            f"{metrics['rows']['trained_on']} rows in {metrics['total_seconds']:.2f}s; holdout RMSE "
+            f"{metrics['parent_holdout']['rmse']:,.0f} -> {metrics['holdout']['rmse']:,.0f} "
+            f"over {metrics['rows']['holdout']} rows"
+        )
+        if not metrics['accepted']:
+            raise CommandError("Holdout error regressed; nothing published")
+        if options['dry_run']:
+            self.stdout.write("Dry run; nothing published")
+            return
+
+        name = options['name'] or f"{version}+{metrics['mode']}-{timezone.now():%Y-%m-%d-%H%M%S}"
+        try:
+            publish(result, name)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Published version {name}"))
+        if options['activate']:
+            write_active_version(name)
+            self.stdout.write(self.style.SUCCESS(f"Workers will switch to version {name} on their next poll"))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.jobs import run_job, stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued bulk prediction jobs, resuming interrupted ones from their last finished chunk"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            job_ids = list(stale_jobs().order_by('created_at').values_list('pk', flat=True))
+            for job_id in job_ids:
+                self.stdout.write(f"Running prediction job {job_id}")
+                run_job(job_id)
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,73 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dashboard.ai_model import write_active_version
+from dashboard.intervals import DEFAULT_COVERAGE
+from dashboard.training import (
+    LEARNING_RATES, MAX_DEPTHS, MAX_ROUNDS, METRICS_FILENAME, load_training_frame, publish, search_space, train,
+)
+
+
+class Command(BaseCommand):
+    help = ("Train the house price pipeline with a parallel successive-halving search and publish it "
+            "as a new model version with a metrics.json")
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?', help='Version name (default: train-<timestamp>)')
+        parser.add_argument('--data', default=str(settings.DATASET_DIR / 'train.csv'),
+                            help='CSV with the training columns and SalePrice')
+        parser.add_argument('--learning-rates', type=float, nargs='+', default=list(LEARNING_RATES))
+        parser.add_argument('--max-depths', type=int, nargs='+', default=list(MAX_DEPTHS))
+        parser.add_argument('--min-child-weights', type=float, nargs='+', help='Also search min_child_weight')
+        parser.add_argument('--subsamples', type=float, nargs='+', help='Also search subsample')
+        parser.add_argument('--max-rounds', type=int, default=MAX_ROUNDS, help='Boosting rounds of the last rung')
+        parser.add_argument('--factor', type=int, default=3, help='Keep the best 1/factor trials after each rung')
+        parser.add_argument('--patience', type=int, default=50,
+                            help='Stop a trial after this many rounds without a better validation RMSE')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Trial processes')
+        parser.add_argument('--coverage', type=float, default=DEFAULT_COVERAGE,
+                            help='Target coverage of the prediction intervals calibrated on the holdout')
+        parser.add_argument('--activate', action='store_true', help='Pin the ACTIVE pointer to the new version')
+
+    def handle(self, *args, **options):
+        if options['factor'] < 2:
+            raise CommandError("--factor must be at least 2")
+        if not 0 < options['coverage'] < 1:
+            raise CommandError("--coverage must be between 0 and 1")
+        name = options['name'] or timezone.now().strftime('train-%Y-%m-%d-%H%M%S')
+        extra = {}
+        if options['min_child_weights']:
+            extra['min_child_weight'] = options['min_child_weights']
+        if options['subsamples']:
+            extra['subsample'] = options['subsamples']
+        space = search_space(options['learning_rates'], options['max_depths'], **extra)
+
+        try:
+            X, y = load_training_frame(options['data'])
+        except (FileNotFoundError, KeyError) as e:
+            raise CommandError(f"Cannot read training data from {options['data']}: {e}")
+        self.stdout.write(f"Searching {len(space)} configurations on {len(X)} rows with {options['workers']} workers")
+        result = train(X, y, space, max_rounds=options['max_rounds'], factor=options['factor'],
+                       patience=options['patience'], workers=options['workers'], coverage=options['coverage'])
+
+        for rung in result.metrics['search']['rungs']:
+            self.stdout.write(f"  {rung['trials']:>4} trials at {rung['rounds']:>4} rounds: "
+                              f"best validation RMSE {rung['best_rmse']:,.0f} ({rung['seconds']:.1f}s)")
+        try:
+            path = publish(result, name)
+        except ValueError as e:
+            raise CommandError(str(e))
+        holdout = result.metrics['holdout']
+        self.stdout.write(self.style.SUCCESS(
+            f"Published version {name} in {result.metrics['total_seconds']:.1f}s: {json.dumps(result.params)}, "
+            f"holdout R2 {holdout['r2']:.4f}, RMSE {holdout['rmse']:,.0f}, "
+            f"{result.intervals.coverage:.0%} interval ±{result.intervals.metrics['margin']:.1%} "
+            f"({os.path.join(os.path.dirname(path), METRICS_FILENAME)})"
+        ))
+        if options['activate']:
+            write_active_version(name)
+            self.stdout.write(self.style.SUCCESS(f"Workers will switch to version {name} on their next poll"))
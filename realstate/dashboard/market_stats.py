@@ -0,0 +1,309 @@
+"""Incremental market statistics maintained on PropertySubmission writes.
+
+Each submission with a price (sale_price, else predicted_price) contributes to
+three MarketAggregate rows: all submissions, its neighborhood and its month.
+Saves and deletes apply the difference between the row's old and new
+contribution, so reads never scan the submissions table.
+"""
+import math
+from collections import Counter, namedtuple
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from .models import MarketAggregate, PropertySubmission
+
+# Log-spaced price buckets: 16 per decade from $10k to $100M
+HISTOGRAM_MIN_LOG10 = 4.0
+HISTOGRAM_BUCKETS_PER_DECADE = 16
+HISTOGRAM_BUCKETS = 64
+
+CONTRIBUTION_FIELDS = [
+    'neighborhood', 'sale_price', 'predicted_price', 'sale_date', 'submission_date',
+    'living_area', 'overall_quality', 'is_verified'
+]
+SUM_FIELDS = [
+    'price_sum', 'price_sum_sq', 'area_sum', 'area_sum_sq', 'price_area_sum',
+    'quality_sum', 'quality_sum_sq', 'price_quality_sum'
+]
+
+# Sent with pks=[...] after update_with_stats/bulk_update_with_stats, which skip save signals
+submissions_updated = Signal()
+
+Contribution = namedtuple('Contribution', 'neighborhood month price area quality verified')
+
+
+def contribution(values):
+    """What one submission adds to the aggregates, or None when it has no price yet"""
+    price = values.get('sale_price') or values.get('predicted_price')
+    if price is None:
+        return None
+    when = values.get('sale_date') or values.get('submission_date')
+    return Contribution(
+        neighborhood=values.get('neighborhood') or '',
+        month=when.strftime('%Y-%m') if when else '',
+        # prices are stored with 2 decimals; round so later subtractions cancel exactly
+        price=round(float(price), 2),
+        area=float(values.get('living_area') or 0),
+        quality=float(values.get('overall_quality') or 0),
+        verified=bool(values.get('is_verified'))
+    )
+
+
+def instance_values(instance):
+    return {field: getattr(instance, field) for field in CONTRIBUTION_FIELDS}
+
+
+def price_bucket(price):
+    if price <= 0:
+        return 0
+    bucket = int((math.log10(price) - HISTOGRAM_MIN_LOG10) * HISTOGRAM_BUCKETS_PER_DECADE)
+    return min(max(bucket, 0), HISTOGRAM_BUCKETS - 1)
+
+
+def bucket_bounds(bucket):
+    low = 10 ** (HISTOGRAM_MIN_LOG10 + bucket / HISTOGRAM_BUCKETS_PER_DECADE)
+    high = 10 ** (HISTOGRAM_MIN_LOG10 + (bucket + 1) / HISTOGRAM_BUCKETS_PER_DECADE)
+    return low, high
+
+
+class Deltas:
+    """Pending changes per (scope, key), applied to MarketAggregate in one transaction"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, item, sign=1):
+        if item is None:
+            return
+        for scope_key in (('all', ''), ('neighborhood', item.neighborhood), ('month', item.month)):
+            row = self.rows.setdefault(scope_key, {
+                'count': 0, 'verified_count': 0, 'histogram': Counter(), 'min': None, 'max': None,
+                **{field: 0.0 for field in SUM_FIELDS}
+            })
+            row['count'] += sign
+            row['verified_count'] += sign if item.verified else 0
+            row['price_sum'] += sign * item.price
+            row['price_sum_sq'] += sign * item.price * item.price
+            row['area_sum'] += sign * item.area
+            row['area_sum_sq'] += sign * item.area * item.area
+            row['price_area_sum'] += sign * item.price * item.area
+            row['quality_sum'] += sign * item.quality
+            row['quality_sum_sq'] += sign * item.quality * item.quality
+            row['price_quality_sum'] += sign * item.price * item.quality
+            row['histogram'][price_bucket(item.price)] += sign
+            if sign > 0:
+                row['min'] = item.price if row['min'] is None else min(row['min'], item.price)
+                row['max'] = item.price if row['max'] is None else max(row['max'], item.price)
+
+    def change(self, before, after):
+        if before != after:
+            self.add(before, -1)
+            self.add(after, 1)
+
+    def apply(self):
+        if not self.rows:
+            return
+        with transaction.atomic():
+            for (scope, key), delta in sorted(self.rows.items()):
+                if not delta['count'] and not any(delta['histogram'].values()) and delta['min'] is None:
+                    continue
+                aggregate, _ = MarketAggregate.objects.select_for_update().get_or_create(scope=scope, key=key)
+                merge(aggregate, delta)
+                aggregate.save()
+
+
+def merge(aggregate, delta):
+    aggregate.count += delta['count']
+    aggregate.verified_count += delta['verified_count']
+    for field in SUM_FIELDS:
+        setattr(aggregate, field, getattr(aggregate, field) + delta[field])
+    histogram = list(aggregate.histogram) or [0] * HISTOGRAM_BUCKETS
+    for bucket, n in delta['histogram'].items():
+        histogram[bucket] += n
+    aggregate.histogram = histogram
+    # min/max only widen; removals leave them as outer bounds until the next rebuild()
+    if delta['min'] is not None:
+        aggregate.min_price = delta['min'] if aggregate.min_price is None else min(aggregate.min_price, delta['min'])
+        aggregate.max_price = delta['max'] if aggregate.max_price is None else max(aggregate.max_price, delta['max'])
+    if aggregate.count <= 0:
+        aggregate.min_price = aggregate.max_price = None
+
+
+@receiver(pre_save, sender=PropertySubmission)
+def remember_previous_contribution(sender, instance, raw=False, **kwargs):
+    instance._market_previous = None
+    if raw or instance.pk is None:
+        return
+    previous = PropertySubmission.objects.filter(pk=instance.pk).values(*CONTRIBUTION_FIELDS).first()
+    instance._market_previous = contribution(previous) if previous else None
+
+
+@receiver(post_save, sender=PropertySubmission)
+def update_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = Deltas()
+    deltas.change(getattr(instance, '_market_previous', None), contribution(instance_values(instance)))
+    deltas.apply()
+
+
+@receiver(post_delete, sender=PropertySubmission)
+def update_on_delete(sender, instance, **kwargs):
+    deltas = Deltas()
+    deltas.add(contribution(instance_values(instance)), -1)
+    deltas.apply()
+
+
+def update_with_stats(queryset, **changes):
+    """queryset.update() that keeps the aggregates in step (update() skips save signals)"""
+    with transaction.atomic():
+        before = {row.pop('pk'): contribution(row) for row in queryset.values('pk', *CONTRIBUTION_FIELDS)}
+        updated = PropertySubmission.objects.filter(pk__in=before).update(**changes)
+        deltas = Deltas()
+        for row in PropertySubmission.objects.filter(pk__in=before).values('pk', *CONTRIBUTION_FIELDS):
+            deltas.change(before[row.pop('pk')], contribution(row))
+        deltas.apply()
+    submissions_updated.send(sender=PropertySubmission, pks=list(before))
+    return updated
+
+
+def bulk_update_with_stats(objs, fields, batch_size=None, **changes):
+    """bulk_update() of submissions that keeps the aggregates in step (bulk_update() skips save signals).
+
+    `changes` are values shared by every object; they are written with one
+    plain UPDATE instead of per-row CASE expressions. The objects must carry
+    all their new values either way.
+    """
+    pks = [obj.pk for obj in objs]
+    with transaction.atomic():
+        before = {
+            row.pop('pk'): contribution(row)
+            for row in PropertySubmission.objects.filter(pk__in=pks).values('pk', *CONTRIBUTION_FIELDS)
+        }
+        updated = PropertySubmission.objects.bulk_update(objs, fields, batch_size=batch_size)
+        if changes:
+            PropertySubmission.objects.filter(pk__in=pks).update(**changes)
+        deltas = Deltas()
+        for obj in objs:
+            deltas.change(before.get(obj.pk), contribution(instance_values(obj)))
+        deltas.apply()
+    submissions_updated.send(sender=PropertySubmission, pks=pks)
+    return updated
+
+
+def mean(total, count):
+    return total / count if count else None
+
+
+def stddev(total, total_sq, count):
+    if count < 2:
+        return None
+    return math.sqrt(max(total_sq - total * total / count, 0.0) / (count - 1))
+
+
+def correlation(n, sx, sy, sxx, syy, sxy):
+    denominator = (n * sxx - sx * sx) * (n * syy - sy * sy)
+    if n < 2 or denominator <= 0:
+        return None
+    return (n * sxy - sx * sy) / math.sqrt(denominator)
+
+
+def quantile(histogram, q):
+    """Approximate quantile from the log-spaced histogram (geometric interpolation in the bucket)"""
+    total = sum(histogram)
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for bucket, n in enumerate(histogram):
+        if n > 0 and seen + n >= target:
+            low, high = bucket_bounds(bucket)
+            return low * (high / low) ** ((target - seen) / n)
+        seen += n
+    return bucket_bounds(len(histogram) - 1)[1]
+
+
+def describe(aggregate):
+    n = aggregate.count
+    return {
+        'count': n,
+        'verified_count': aggregate.verified_count,
+        'avg_price': mean(aggregate.price_sum, n),
+        'std_price': stddev(aggregate.price_sum, aggregate.price_sum_sq, n),
+        'min_price': aggregate.min_price,
+        'max_price': aggregate.max_price,
+        'median_price': quantile(aggregate.histogram, 0.5),
+        'p10_price': quantile(aggregate.histogram, 0.1),
+        'p90_price': quantile(aggregate.histogram, 0.9),
+        'price_area_correlation': correlation(
+            n, aggregate.price_sum, aggregate.area_sum, aggregate.price_sum_sq,
+            aggregate.area_sum_sq, aggregate.price_area_sum
+        ),
+        'price_quality_correlation': correlation(
+            n, aggregate.price_sum, aggregate.quality_sum, aggregate.price_sum_sq,
+            aggregate.quality_sum_sq, aggregate.price_quality_sum
+        ),
+    }
+
+
+def market_summary(top_neighborhoods=5):
+    """Current submission statistics read from the aggregate rows only"""
+    aggregates = [a for a in MarketAggregate.objects.all() if a.count > 0]
+    overall = next((a for a in aggregates if a.scope == 'all'), None)
+    if overall is None:
+        return None
+    neighborhoods = sorted((a for a in aggregates if a.scope == 'neighborhood'),
+                           key=lambda a: a.price_sum / a.count, reverse=True)
+    months = sorted((a for a in aggregates if a.scope == 'month'), key=lambda a: a.key)
+    return {
+        **describe(overall),
+        'top_neighborhoods': [
+            {'name': a.key, 'avg_price': a.price_sum / a.count, 'count': a.count}
+            for a in neighborhoods[:top_neighborhoods]
+        ],
+        'monthly': [
+            {'month': a.key, 'avg_price': a.price_sum / a.count, 'count': a.count}
+            for a in months
+        ],
+    }
+
+
+def rebuild(dry_run=False, tolerance=1e-6):
+    """Recompute every aggregate from scratch and report rows that had drifted.
+
+    Returns a list of (scope, key, field, stored, expected) tuples.
+    """
+    deltas = Deltas()
+    for row in PropertySubmission.objects.values(*CONTRIBUTION_FIELDS).iterator(chunk_size=2000):
+        deltas.add(contribution(row))
+    expected = {}
+    for (scope, key), delta in deltas.rows.items():
+        aggregate = MarketAggregate(scope=scope, key=key)
+        merge(aggregate, delta)
+        expected[(scope, key)] = aggregate
+
+    compared = ['count', 'verified_count', 'min_price', 'max_price', 'histogram'] + SUM_FIELDS
+    drift = []
+    with transaction.atomic():
+        stored = {(a.scope, a.key): a for a in MarketAggregate.objects.select_for_update()}
+        for scope_key in sorted(set(stored) | set(expected)):
+            empty = MarketAggregate(scope=scope_key[0], key=scope_key[1])
+            have = stored.get(scope_key, empty)
+            want = expected.get(scope_key, empty)
+            for field in compared:
+                a, b = getattr(have, field), getattr(want, field)
+                if field == 'histogram':
+                    a, b = list(a) or [0] * HISTOGRAM_BUCKETS, list(b) or [0] * HISTOGRAM_BUCKETS
+                    same = a == b
+                elif a is None or b is None:
+                    same = a is None and b is None
+                else:
+                    same = math.isclose(a, b, rel_tol=tolerance, abs_tol=tolerance)
+                if not same:
+                    drift.append((scope_key[0], scope_key[1], field, a, b))
+        if not dry_run:
+            MarketAggregate.objects.all().delete()
+            MarketAggregate.objects.bulk_create(expected.values())
+    return drift
@@ -0,0 +1,266 @@
+"""In-process inference metrics, rendered in the Prometheus text format on /metrics.
+
+Stage timings, batch sizes, throughput and model load times go into
+counters, gauges and histograms held in this process; objects that
+already keep their own counters (the prediction cache, the micro-batcher)
+are read through collectors when /metrics is scraped. With
+HOUSE_PRICE_METRICS off, stage() hands back a shared no-op context
+manager and the record functions return on a single flag check.
+"""
+import bisect
+import functools
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096, 16384, 65536)
+THROUGHPUT_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000)
+
+_enabled = None
+
+
+def enabled():
+    global _enabled
+    if _enabled is None:
+        _enabled = bool(getattr(settings, 'HOUSE_PRICE_METRICS', True))
+    return _enabled
+
+
+@receiver(setting_changed)
+def _reset_enabled(setting, **kwargs):
+    global _enabled
+    if setting == 'HOUSE_PRICE_METRICS':
+        _enabled = None
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    @classmethod
+    def of(cls, name, help, value):
+        """Unlabelled metric holding a value read at scrape time"""
+        metric = cls(name, help)
+        metric._values[()] = value
+        return metric
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f'{self.name}{_labels(self.labelnames, key)} {_number(value)}' for key, value in values]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # per-bucket counts, then sum; made cumulative when rendered
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    @classmethod
+    def from_counts(cls, name, help, buckets, counts, total):
+        """Histogram over per-bucket counts kept elsewhere (last count is the overflow bucket)"""
+        histogram = cls(name, help, buckets)
+        histogram._values[()] = [list(counts), total]
+        return histogram
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _labels(self.labelnames + ('le',), key + (_number(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_number(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """`collector()` returns a list of metrics built at scrape time"""
+        self.collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    'house_price_stage_seconds', 'Time spent per prediction stage (parse, features, preprocess, booster, serialize)',
+    LATENCY_BUCKETS, ['stage']))
+REQUEST_SECONDS = registry.register(Histogram(
+    'house_price_request_seconds', 'View latency', LATENCY_BUCKETS, ['view', 'status']))
+BATCH_ROWS = registry.register(Histogram(
+    'house_price_batch_rows', 'Rows per model call', ROW_BUCKETS))
+BATCH_THROUGHPUT = registry.register(Histogram(
+    'house_price_batch_rows_per_second', 'Rows per second of each model call', THROUGHPUT_BUCKETS))
+PREDICTED_ROWS = registry.register(Counter(
+    'house_price_predicted_rows_total', 'Rows scored by the model'))
+MODEL_LOAD_SECONDS = registry.register(Gauge(
+    'house_price_model_load_seconds', 'Time it took to load and validate each model version', ['version']))
+
+
+class _Stage:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, self.name)
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name):
+    """Context manager timing one stage of a prediction"""
+    return _Stage(name) if enabled() else _NO_STAGE
+
+
+def record_batch(rows, seconds):
+    """One model call over `rows` rows that took `seconds` end to end"""
+    if not enabled():
+        return
+    BATCH_ROWS.observe(rows)
+    PREDICTED_ROWS.inc(rows)
+    if rows and seconds > 0:
+        BATCH_THROUGHPUT.observe(rows / seconds)
+
+
+def record_model_load(version, seconds):
+    if enabled():
+        MODEL_LOAD_SECONDS.set(seconds, version)
+
+
+def instrument_view(view):
+    """Time every call of a function view (sync or async), labelled by view name and status code"""
+    name = view.__name__
+
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapped_async(request, *args, **kwargs):
+            if not enabled():
+                return await view(request, *args, **kwargs)
+            started = time.perf_counter()
+            response = await view(request, *args, **kwargs)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, name, response.status_code)
+            return response
+
+        return wrapped_async
+
+    @functools.wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not enabled():
+            return view(request, *args, **kwargs)
+        started = time.perf_counter()
+        response = view(request, *args, **kwargs)
+        REQUEST_SECONDS.observe(time.perf_counter() - started, name, response.status_code)
+        return response
+
+    return wrapped
+
+
+def render():
+    return registry.render()
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-18 19:29
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PredictionJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='queued', max_length=20)),
+                ('original_filename', models.CharField(blank=True, max_length=255)),
+                ('input_file', models.FileField(upload_to='prediction_jobs/input/')),
+                ('output_file', models.FileField(blank=True, upload_to='prediction_jobs/output/')),
+                ('model_version', models.CharField(blank=True, max_length=100)),
+                ('chunk_rows', models.IntegerField(default=50000)),
+                ('total_rows', models.IntegerField(blank=True, null=True)),
+                ('rows_done', models.IntegerField(default=0)),
+                ('chunks_done', models.IntegerField(default=0)),
+                ('output_bytes', models.BigIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Prediction Job',
+                'verbose_name_plural': 'Prediction Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_predictionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('all', 'All Submissions'), ('neighborhood', 'Neighborhood'), ('month', 'Month')], max_length=20)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('verified_count', models.IntegerField(default=0)),
+                ('price_sum', models.FloatField(default=0)),
+                ('price_sum_sq', models.FloatField(default=0)),
+                ('min_price', models.FloatField(blank=True, null=True)),
+                ('max_price', models.FloatField(blank=True, null=True)),
+                ('area_sum', models.FloatField(default=0)),
+                ('area_sum_sq', models.FloatField(default=0)),
+                ('price_area_sum', models.FloatField(default=0)),
+                ('quality_sum', models.FloatField(default=0)),
+                ('quality_sum_sq', models.FloatField(default=0)),
+                ('price_quality_sum', models.FloatField(default=0)),
+                ('histogram', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['scope', 'key'],
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key'), name='unique_market_aggregate')],
+            },
+        ),
+    ]
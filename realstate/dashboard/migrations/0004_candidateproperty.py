@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_marketaggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateProperty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_ref', models.CharField(max_length=100, unique=True)),
+                ('neighborhood', models.CharField(max_length=100)),
+                ('bedrooms', models.IntegerField()),
+                ('bathrooms', models.FloatField()),
+                ('sqft', models.IntegerField()),
+                ('listed_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('predicted_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('value_score', models.FloatField(help_text='Percent the predicted price is above the listed price')),
+                ('features', models.JSONField(blank=True, default=list)),
+                ('model_version', models.CharField(blank=True, max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Candidate Properties',
+                'ordering': ['-value_score'],
+                'indexes': [models.Index(fields=['bedrooms', 'listed_price'], name='dashboard_c_bedroom_b02249_idx'), models.Index(fields=['neighborhood', 'bedrooms', 'listed_price'], name='dashboard_c_neighbo_068358_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_candidateproperty'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertysubmission',
+            name='prediction_version',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_propertysubmission_prediction_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertysubmission',
+            name='prediction_lower',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='propertysubmission',
+            name='prediction_upper',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 23:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_propertysubmission_prediction_interval'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionjob',
+            name='resumed_model_version',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -3,7 +3,11 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 import json
-from .ai_model import HousePriceModel
+import uuid
+from .ai_model import confidence_percent, predict_one
+from .features import (
+    BLDG_TYPE, DEFAULT_LOT_FRONTAGE, MS_SUBCLASS, MS_ZONING, OPTIONAL_QUALITY_CODES, QUALITY_CODES
+)
 
 class PropertySubmission(models.Model):
     # Basic Information
@@ -132,8 +136,12 @@ class PropertySubmission(models.Model):
     
     # AI Prediction
     predicted_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
-    prediction_confidence = models.FloatField(null=True, blank=True)
+    prediction_confidence = models.FloatField(null=True, blank=True)  # % coverage of the interval below
+    # calibrated prediction interval around predicted_price (null for uncalibrated model versions)
+    prediction_lower = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    prediction_upper = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     prediction_timestamp = models.DateTimeField(null=True, blank=True)
+    prediction_version = models.CharField(max_length=100, blank=True)  # model version behind predicted_price
     
     # Additional Notes
     description = models.TextField(blank=True)
@@ -161,7 +169,8 @@ class PropertySubmission(models.Model):
         return f"{self.address}, {self.city}, {self.state} {self.zip_code}"
     
     def get_property_features(self):
-        """Extract features for AI model prediction"""
+        """Extract features for AI model prediction (features.build_feature_frame does this for many rows)"""
+        now = timezone.now()
         features = {
             'BedroomAbvGr': self.bedrooms,
             'FullBath': int(self.bathrooms),
@@ -238,8 +247,8 @@ class PropertySubmission(models.Model):
             'Fence': 'NA',
             'MiscFeature': 'NA',
             'MiscVal': 0,
-            'MoSold': timezone.now().month,
-            'YrSold': timezone.now().year,
+            'MoSold': now.month,
+            'YrSold': now.year,
             'SaleType': 'WD',
             'SaleCondition': 'Normal'
         }
@@ -247,42 +256,15 @@ class PropertySubmission(models.Model):
     
     def get_ms_subclass(self):
         """Map property type to MSSubClass codes"""
-        mapping = {
-            'single_family': 20,
-            'townhouse': 30,
-            'condo': 50,
-            'multi_family': 70,
-            'luxury': 80,
-            'commercial': 90,
-            'land': 180
-        }
-        return mapping.get(self.property_type, 20)
+        return MS_SUBCLASS.get(self.property_type, 20)
     
     def get_ms_zoning(self):
         """Estimate zoning based on property type"""
-        mapping = {
-            'single_family': 'RL',
-            'townhouse': 'RM',
-            'condo': 'RM',
-            'multi_family': 'RM',
-            'luxury': 'RL',
-            'commercial': 'C',
-            'land': 'RL'
-        }
-        return mapping.get(self.property_type, 'RL')
+        return MS_ZONING.get(self.property_type, 'RL')
     
     def get_bldg_type(self):
         """Map property type to BldgType codes"""
-        mapping = {
-            'single_family': '1Fam',
-            'townhouse': 'TwnhsE',
-            'condo': 'Twnhs',
-            'multi_family': '2fmCon',
-            'luxury': '1Fam',
-            'commercial': '1Fam',
-            'land': '1Fam'
-        }
-        return mapping.get(self.property_type, '1Fam')
+        return BLDG_TYPE.get(self.property_type, '1Fam')
     
     def get_house_style(self):
         """Estimate house style based on bedrooms"""
@@ -295,65 +277,27 @@ class PropertySubmission(models.Model):
     
     def get_exter_qual_code(self):
         """Convert quality to codes"""
-        mapping = {
-            'excellent': 'Ex',
-            'good': 'Gd',
-            'average': 'TA',
-            'fair': 'Fa',
-            'poor': 'Po'
-        }
-        return mapping.get(self.exterior_quality, 'TA')
+        return QUALITY_CODES.get(self.exterior_quality, 'TA')
     
     def get_bsmt_qual_code(self):
         """Convert basement quality to codes"""
-        mapping = {
-            'excellent': 'Ex',
-            'good': 'Gd',
-            'average': 'TA',
-            'fair': 'Fa',
-            'poor': 'Po',
-            'none': 'NA'
-        }
-        return mapping.get(self.basement_quality, 'NA')
+        return OPTIONAL_QUALITY_CODES.get(self.basement_quality, 'NA')
     
     def get_kitchen_qual_code(self):
         """Convert kitchen quality to codes"""
-        mapping = {
-            'excellent': 'Ex',
-            'good': 'Gd',
-            'average': 'TA',
-            'fair': 'Fa',
-            'poor': 'Po'
-        }
-        return mapping.get(self.kitchen_quality, 'TA')
+        return QUALITY_CODES.get(self.kitchen_quality, 'TA')
     
     def get_fireplace_qual_code(self):
         """Convert fireplace quality to codes"""
         if not self.has_fireplace:
             return 'NA'
-        mapping = {
-            'excellent': 'Ex',
-            'good': 'Gd',
-            'average': 'TA',
-            'fair': 'Fa',
-            'poor': 'Po',
-            'none': 'NA'
-        }
-        return mapping.get(self.fireplace_quality, 'TA')
+        return OPTIONAL_QUALITY_CODES.get(self.fireplace_quality, 'TA')
     
     def get_pool_qual_code(self):
         """Convert pool quality to codes"""
         if not self.has_pool:
             return 'NA'
-        mapping = {
-            'excellent': 'Ex',
-            'good': 'Gd',
-            'average': 'TA',
-            'fair': 'Fa',
-            'poor': 'Po',
-            'none': 'NA'
-        }
-        return mapping.get(self.pool_quality, 'TA')
+        return OPTIONAL_QUALITY_CODES.get(self.pool_quality, 'TA')
     
     def estimate_lot_frontage(self):
         """Estimate lot frontage based on lot area"""
@@ -361,19 +305,21 @@ class PropertySubmission(models.Model):
         import math
         if self.lot_area > 0:
             return int(math.sqrt(self.lot_area))
-        return 80  # Default
+        return DEFAULT_LOT_FRONTAGE
     
     def predict_price(self):
         """Generate price prediction using AI model"""
         try:
-            model = HousePriceModel()
             features = self.get_property_features()
-            prediction = model.predict(features)
+            prediction = predict_one(features)
             
-            if prediction and len(prediction) > 0:
-                self.predicted_price = prediction[0]
-                self.prediction_confidence = 90.0  # This would come from model confidence
+            if prediction.price is not None:
+                self.predicted_price = round(prediction.price, 2)
+                self.prediction_lower = None if prediction.lower is None else round(prediction.lower, 2)
+                self.prediction_upper = None if prediction.upper is None else round(prediction.upper, 2)
+                self.prediction_confidence = confidence_percent(prediction.coverage)
                 self.prediction_timestamp = timezone.now()
+                self.prediction_version = prediction.version
                 self.save()
                 return self.predicted_price
         except Exception as e:
@@ -381,6 +327,76 @@ class PropertySubmission(models.Model):
             return None
 
 
+class PredictionJob(models.Model):
+    """Bulk CSV prediction processed in the background, chunk by chunk"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed')
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    original_filename = models.CharField(max_length=255, blank=True)
+    input_file = models.FileField(upload_to='prediction_jobs/input/')
+    output_file = models.FileField(upload_to='prediction_jobs/output/', blank=True)
+    model_version = models.CharField(max_length=100, blank=True)
+    # Set when a resumed job's version was gone and the rest of its rows were scored by this one
+    resumed_model_version = models.CharField(max_length=100, blank=True)
+
+    # Progress (a restarted worker resumes after the last finished chunk)
+    chunk_rows = models.IntegerField(default=50000)
+    total_rows = models.IntegerField(null=True, blank=True)
+    rows_done = models.IntegerField(default=0)
+    chunks_done = models.IntegerField(default=0)
+    output_bytes = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Prediction Job'
+        verbose_name_plural = 'Prediction Jobs'
+
+    def __str__(self):
+        return f"Prediction job {self.id} - {self.status}"
+
+    def rows_per_second(self):
+        if not self.started_at or not self.rows_done:
+            return 0.0
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return self.rows_done / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self):
+        rate = self.rows_per_second()
+        if self.status != 'running' or not self.total_rows or not rate:
+            return None
+        return max(self.total_rows - self.rows_done, 0) / rate
+
+    def progress(self):
+        return {
+            'job_id': str(self.id),
+            'status': self.status,
+            'filename': self.original_filename,
+            'rows_done': self.rows_done,
+            'total_rows': self.total_rows,
+            'percent': round(100.0 * self.rows_done / self.total_rows, 1) if self.total_rows else None,
+            'rows_per_second': round(self.rows_per_second(), 1),
+            'eta_seconds': self.eta_seconds(),
+            'model_version': self.model_version,
+            'resumed_model_version': self.resumed_model_version or None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
 class MarketInsight(models.Model):
     """Store calculated market insights"""
     date = models.DateField(auto_now_add=True)
@@ -400,6 +416,114 @@ class MarketInsight(models.Model):
         return f"Market Insights - {self.date}"
 
 
+class MarketAggregate(models.Model):
+    """Running price statistics over PropertySubmission rows, updated on every write.
+
+    Sums and sums of squares/cross-products give mean, spread and correlations
+    without scanning submissions; a log-spaced price histogram gives approximate
+    quantiles. min/max only ever widen, so removals can leave them stale until
+    the reconcile_market_stats command rebuilds the table.
+    """
+    SCOPE_CHOICES = [
+        ('all', 'All Submissions'),
+        ('neighborhood', 'Neighborhood'),
+        ('month', 'Month')
+    ]
+
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES)
+    key = models.CharField(max_length=100, blank=True)  # neighborhood name or YYYY-MM
+
+    count = models.IntegerField(default=0)
+    verified_count = models.IntegerField(default=0)
+    price_sum = models.FloatField(default=0)
+    price_sum_sq = models.FloatField(default=0)
+    min_price = models.FloatField(null=True, blank=True)
+    max_price = models.FloatField(null=True, blank=True)
+
+    # For price correlations with living area and overall quality
+    area_sum = models.FloatField(default=0)
+    area_sum_sq = models.FloatField(default=0)
+    price_area_sum = models.FloatField(default=0)
+    quality_sum = models.FloatField(default=0)
+    quality_sum_sq = models.FloatField(default=0)
+    price_quality_sum = models.FloatField(default=0)
+
+    histogram = models.JSONField(default=list, blank=True)  # counts per price bucket
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['scope', 'key']
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_market_aggregate')
+        ]
+
+    def __str__(self):
+        return f"{self.get_scope_display()} {self.key}".strip()
+
+
+class CandidateProperty(models.Model):
+    """Listed property with its model price computed ahead of time, searched by get_recommendations"""
+    source_ref = models.CharField(max_length=100, unique=True)  # e.g. train.csv:1
+    neighborhood = models.CharField(max_length=100)
+    bedrooms = models.IntegerField()
+    bathrooms = models.FloatField()
+    sqft = models.IntegerField()
+    listed_price = models.DecimalField(max_digits=12, decimal_places=2)
+    predicted_price = models.DecimalField(max_digits=12, decimal_places=2)
+    value_score = models.FloatField(help_text="Percent the predicted price is above the listed price")
+    features = models.JSONField(default=list, blank=True)
+    model_version = models.CharField(max_length=100, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-value_score']
+        verbose_name_plural = 'Candidate Properties'
+        indexes = [
+            models.Index(fields=['bedrooms', 'listed_price']),
+            models.Index(fields=['neighborhood', 'bedrooms', 'listed_price']),
+        ]
+
+    def __str__(self):
+        return f"{self.source_ref} - ${self.listed_price:,.0f} ({self.value_score:+.1f}%)"
+
+
+class DataVersion(models.Model):
+    """Token that changes whenever the rows behind an in-memory index change.
+
+    Each worker process compares it with the token its index was built from,
+    so a write made by one process gets every process to rebuild.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    version = models.CharField(max_length=32)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} {self.version}"
+
+    @classmethod
+    def current(cls, name):
+        return cls.objects.filter(name=name).values_list('version', flat=True).first()
+
+    @classmethod
+    def bump(cls, name):
+        version = uuid.uuid4().hex
+        if not cls.objects.filter(name=name).update(version=version, updated_at=timezone.now()):
+            cls.objects.get_or_create(name=name, defaults={'version': version})
+        return version
+
+    @classmethod
+    def advance(cls, name, expected):
+        """bump() only if the token is still `expected` (None: no row yet); returns the new token,
+        or None when someone else moved it"""
+        version = uuid.uuid4().hex
+        if expected is None:
+            created = cls.objects.get_or_create(name=name, defaults={'version': version})[1]
+        else:
+            created = cls.objects.filter(name=name, version=expected).update(
+                version=version, updated_at=timezone.now())
+        return version if created else None
+
+
 class UserSubmissionAnalytics(models.Model):
     """Track analytics about user submissions"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -0,0 +1,98 @@
+"""Multi-core scoring for bulk predictions.
+
+Input frames are split into shards and scored in a process pool. Each worker
+loads the model artifact once, in its pool initializer, and results are
+merged back in input order.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .ai_model import HousePriceModel, registry
+
+logger = logging.getLogger(__name__)
+
+_worker_model = None
+_scorers = {}
+_scorer_lock = threading.Lock()
+
+
+def _init_worker(model_path, version, fast_path, threads):
+    # runs once per worker process; explicit arguments keep it independent of Django settings
+    global _worker_model
+    _worker_model = HousePriceModel(model_path, version=version, fast_path=fast_path)
+    # split the cores between workers instead of every booster grabbing all of them
+    if _worker_model.compiled is not None:
+        _worker_model.compiled.booster.set_param({'nthread': threads})
+    else:
+        _worker_model.model.set_params(model__n_jobs=threads)
+
+
+def _score_shard(shard):
+    return _worker_model.predict_frame(shard)
+
+
+class ParallelScorer:
+    """Process pool bound to one model version, with the same predict_frame API as HousePriceModel"""
+
+    def __init__(self, model, workers, shard_rows, start_method='spawn'):
+        self.version = model.version
+        self.path = model.path
+        self.workers = workers
+        self.shard_rows = shard_rows
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(model.path, model.version, model.compiled is not None,
+                      max(1, (os.cpu_count() or 1) // workers)),
+        )
+
+    def warm_up(self):
+        """Start every worker (and load its model) ahead of the first real batch"""
+        row = pd.DataFrame(np.nan, index=[0], columns=['Id'])
+        list(self._pool.map(_score_shard, [row] * self.workers))
+
+    def predict_frame(self, frame):
+        if len(frame) <= self.shard_rows:
+            shards = [frame]
+        else:
+            shards = [frame.iloc[start:start + self.shard_rows] for start in range(0, len(frame), self.shard_rows)]
+        # map() yields in submission order, so the merged predictions line up with the input rows
+        results = list(self._pool.map(_score_shard, shards))
+        return np.concatenate(results) if results else np.empty(0, dtype=np.float64)
+
+    def shutdown(self):
+        # shards already submitted still finish
+        self._pool.shutdown(wait=False)
+
+
+def get_scorer(model, workers=None, shard_rows=None):
+    """Bulk scorer for `model`: a shared process pool when parallel scoring is enabled, else the model itself"""
+    if workers is None:
+        workers = getattr(settings, 'HOUSE_PRICE_PARALLEL_WORKERS', 1)
+    if shard_rows is None:
+        shard_rows = getattr(settings, 'HOUSE_PRICE_PARALLEL_SHARD_ROWS', 10000)
+    if workers <= 1:
+        return model
+    key = (model.version, workers, shard_rows)
+    with _scorer_lock:
+        scorer = _scorers.get(key)
+        if scorer is None:
+            # each version gets workers that loaded that artifact; pools for versions the
+            # registry has dropped are retired, jobs still on a kept version keep theirs
+            loaded = set(registry.versions())
+            for stale_key in [k for k in _scorers if k[0] not in loaded and k[0] != model.version]:
+                _scorers.pop(stale_key).shutdown()
+            scorer = _scorers[key] = ParallelScorer(
+                model, workers, shard_rows,
+                start_method=getattr(settings, 'HOUSE_PRICE_PARALLEL_START_METHOD', 'spawn')
+            )
+            logger.info("Started %d scoring processes for model version %s", workers, model.version)
+        return scorer
@@ -0,0 +1,158 @@
+"""Prediction results cached per canonical feature vector and model version.
+
+The canonical form of a row is the float64 vector the regressor actually
+receives after preprocessing, so inputs that differ only in ways the model
+cannot see (column order, 3 vs 3.0, absent vs NaN numeric fields) share an
+entry, and equal keys always mean equal predictions. Rows are hashed with
+128-bit BLAKE2b; the cache key also carries the model version and artifact
+fingerprint, so a new or re-published model never reads an old entry and
+stale entries age out through the backend's LRU/TTL eviction. Batches look
+up all their keys with one get_many and only score the misses.
+
+The cache is for single properties and small batches, where repeats are
+common and a lookup is cheaper than a model call. Hashing and a cache round
+trip per row cost more than scoring a bulk upload, and one such upload
+would evict everything else, so batches above HOUSE_PRICE_PREDICTION_CACHE_MAX_ROWS
+rows bypass it (get_prediction_cache(rows) returns None for them).
+
+Feature contributions (dashboard.explanations) are cached the same way,
+under their own prefix next to the row's prediction.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+
+KEY_PREFIX = 'prediction'
+CONTRIBUTIONS_PREFIX = 'contributions'
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def row_keys(model, X, kind=KEY_PREFIX):
+    """Cache key per row of the transformed input matrix X"""
+    rows = np.ascontiguousarray(X, dtype=np.float64)
+    rows = rows + 0.0  # fold -0.0 into 0.0
+    prefix = f'{kind}:{model.version}:{model.fingerprint}:'
+    return [prefix + hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest() for row in rows]
+
+
+class PredictionCache:
+    """Read-through prediction cache on one Django cache alias, with hit/miss/eviction counters.
+
+    Evictions are counted when a key this process stored is missing again
+    before its timeout ran out, i.e. the backend dropped it to make room.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.cache = caches[alias]
+        self.timeout = self.cache.default_timeout
+        self.max_tracked = int(settings.CACHES[alias].get('OPTIONS', {}).get('MAX_ENTRIES', 300))
+        self.hits = self.misses = self.stores = self.evictions = 0
+        self._stored = OrderedDict()  # key -> expiry, for eviction accounting
+        self._lock = threading.Lock()
+
+    def predict_frame(self, model, frame):
+        started = time.perf_counter()
+        predictions = self.predict_matrix(model, model.transform(frame))
+        metrics.record_batch(len(predictions), time.perf_counter() - started)
+        return predictions
+
+    def predict_matrix(self, model, X):
+        """Predictions for the transformed matrix X"""
+        found = self._read_through(row_keys(model, X), X, lambda rows: model.predict_matrix(rows).tolist())
+        return np.array(found, dtype=np.float64)
+
+    def contributions_matrix(self, model, X, approximate=False):
+        """HousePriceModel.contributions_matrix(X, approximate), cached per row and method"""
+        kind = f'{CONTRIBUTIONS_PREFIX}-approx' if approximate else CONTRIBUTIONS_PREFIX
+        found = self._read_through(row_keys(model, X, kind), X,
+                                   lambda rows: list(model.contributions_matrix(rows, approximate)))
+        if not found:
+            return np.empty((0, len(model.feature_names) + 1), dtype=np.float32)
+        return np.vstack(found)
+
+    def _read_through(self, keys, X, score):
+        """Cached value per key, scoring the rows of X whose key is missing with score(rows)"""
+        first = {}
+        for position, key in enumerate(keys):
+            first.setdefault(key, position)
+        found = self.cache.get_many(list(first)) if first else {}
+        missing = [key for key in first if key not in found]
+        if missing:
+            fresh = dict(zip(missing, score(X[[first[key] for key in missing]])))
+            self.cache.set_many(fresh)
+            found.update(fresh)
+        self._record(len(first) - len(missing), missing)
+        return [found[key] for key in keys]
+
+    def _record(self, hits, missing):
+        now = time.monotonic()
+        expiry = now + self.timeout if self.timeout is not None else float('inf')
+        with self._lock:
+            self.hits += hits
+            self.misses += len(missing)
+            self.stores += len(missing)
+            for key in missing:
+                if self._stored.pop(key, 0) > now:
+                    self.evictions += 1
+                self._stored[key] = expiry
+            while len(self._stored) > self.max_tracked:
+                self._stored.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'alias': self.alias,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def get_prediction_cache(rows=None):
+    """Shared cache, or None when HOUSE_PRICE_PREDICTION_CACHE is unset or a batch of `rows` rows is too big for it"""
+    global _cache
+    alias = getattr(settings, 'HOUSE_PRICE_PREDICTION_CACHE', None)
+    if not alias:
+        return None
+    if rows is not None and rows > getattr(settings, 'HOUSE_PRICE_PREDICTION_CACHE_MAX_ROWS', 64):
+        return None
+    if _cache is None or _cache.alias != alias:
+        with _cache_lock:
+            if _cache is None or _cache.alias != alias:
+                _cache = PredictionCache(alias)
+    return _cache
+
+
+def cache_metrics():
+    """Prediction cache counters for /metrics"""
+    if _cache is None:
+        return []
+    stats = _cache.stats()
+    return [
+        metrics.Counter.of(f'house_price_prediction_cache_{name}_total', f'Prediction cache {name}', stats[name])
+        for name in ('hits', 'misses', 'stores', 'evictions')
+    ]
+
+
+metrics.registry.add_collector(cache_metrics)
+
+
+def cached_predict_frame(model, frame):
+    """model.predict_frame(frame) through the prediction cache, for single rows and small batches"""
+    cache = get_prediction_cache(len(frame))
+    if cache is None:
+        return model.predict_frame(frame)
+    return cache.predict_frame(model, frame)
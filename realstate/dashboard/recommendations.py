@@ -0,0 +1,227 @@
+"""Budget-constrained "best value" search over CandidateProperty.
+
+Candidates are loaded once into NumPy columns and bucketed by bedrooms and
+log-spaced listed-price band, overall and per neighborhood. Each bucket
+holds its rows sorted by value_score, best first, so a query only looks at
+buckets with enough bedrooms whose band starts under the budget, visits
+them in order of their best score and stops as soon as no remaining bucket
+can beat the current top N. Only the band containing the budget needs a
+price filter. Query cost depends on the number of buckets and N, not on
+how many candidates there are.
+"""
+import heapq
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .ai_model import get_model
+from .models import CandidateProperty, DataVersion
+
+logger = logging.getLogger(__name__)
+
+BANDS_PER_DECADE = 20  # each band spans ~12% of price
+MAX_RESULTS = 50
+SCAN_CHUNK_ROWS = 1024
+VERSION_NAME = 'recommendations'
+
+COLUMNS = [
+    'id', 'neighborhood', 'bedrooms', 'bathrooms', 'sqft',
+    'listed_price', 'predicted_price', 'value_score', 'features'
+]
+NUMERIC_COLUMNS = {
+    'id': 'int64', 'bedrooms': 'int64', 'bathrooms': 'float64', 'sqft': 'int64',
+    'listed_price': 'float64', 'predicted_price': 'float64', 'value_score': 'float64'
+}
+# (column, test, label) for the short feature list shown with each recommendation
+FEATURE_TAGS = [
+    ('GarageCars', lambda v: v > 0, 'Garage'),
+    ('Fireplaces', lambda v: v > 0, 'Fireplace'),
+    ('PoolArea', lambda v: v > 0, 'Pool'),
+    ('CentralAir', lambda v: v == 'Y', 'Central Air'),
+    ('KitchenQual', lambda v: v.isin(['Gd', 'Ex']), 'Modern Kitchen'),
+    ('YearRemodAdd', lambda v: v >= 2000, 'Recently Remodeled'),
+]
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def price_band(prices):
+    return np.floor(np.log10(np.maximum(prices, 1.0)) * BANDS_PER_DECADE).astype('int64')
+
+
+def value_score(predicted, listed):
+    """Percent the model price is above the listed price; higher is better value"""
+    return (predicted - listed) / listed * 100
+
+
+class RecommendationIndex:
+    def __init__(self, columns):
+        self.columns = columns
+        self.value = columns['value_score']
+        self.listed = columns['listed_price']
+        order = np.argsort(-self.value, kind='stable')
+        keys = pd.DataFrame({
+            'neighborhood': columns['neighborhood'][order],
+            'bedrooms': columns['bedrooms'][order],
+            'band': price_band(self.listed)[order],
+        })
+        # groups[neighborhood or None][bedrooms][band] -> rows, best value first
+        self.groups = {None: {}}
+        for (bedrooms, band), positions in keys.groupby(['bedrooms', 'band'], sort=False).indices.items():
+            self.groups[None].setdefault(int(bedrooms), {})[int(band)] = order[positions]
+        for (name, bedrooms, band), positions in keys.groupby(['neighborhood', 'bedrooms', 'band'], sort=False).indices.items():
+            self.groups.setdefault(name, {}).setdefault(int(bedrooms), {})[int(band)] = order[positions]
+
+    def __len__(self):
+        return len(self.value)
+
+    @classmethod
+    def from_database(cls, chunk_size=10000):
+        rows = CandidateProperty.objects.order_by().values_list(*COLUMNS).iterator(chunk_size=chunk_size)
+        values = dict(zip(COLUMNS, zip(*rows))) or dict.fromkeys(COLUMNS, ())
+        columns = {name: np.array(values[name], dtype=dtype) for name, dtype in NUMERIC_COLUMNS.items()}
+        for name in ('neighborhood', 'features'):
+            # filled element-wise so the feature lists stay Python objects
+            columns[name] = np.empty(len(values[name]), dtype=object)
+            columns[name][:] = list(values[name])
+        return cls(columns)
+
+    def search(self, budget, min_bedrooms=0, neighborhood=None, limit=5):
+        """Rows of the top `limit` value scores with listed_price <= budget and bedrooms >= min_bedrooms"""
+        if limit <= 0:
+            return []
+        budget_band = int(price_band(np.float64(budget)))
+        buckets = [
+            (rows, band)
+            for bedrooms, bands in self.groups.get(neighborhood or None, {}).items() if bedrooms >= min_bedrooms
+            for band, rows in bands.items() if band <= budget_band
+        ]
+        buckets.sort(key=lambda bucket: self.value[bucket[0][0]], reverse=True)
+
+        best = []  # min-heap of (value_score, row)
+        for rows, band in buckets:
+            if len(best) == limit and self.value[rows[0]] <= best[0][0]:
+                break
+            for row in (self._affordable(rows, budget, limit) if band == budget_band else rows[:limit]):
+                item = (self.value[row], int(row))
+                if len(best) < limit:
+                    heapq.heappush(best, item)
+                elif item > best[0]:
+                    heapq.heapreplace(best, item)
+                else:
+                    break
+        return [row for _, row in sorted(best, reverse=True)]
+
+    def _affordable(self, rows, budget, limit):
+        found = []
+        for start in range(0, len(rows), SCAN_CHUNK_ROWS):
+            chunk = rows[start:start + SCAN_CHUNK_ROWS]
+            found.extend(chunk[self.listed[chunk] <= budget][:limit - len(found)])
+            if len(found) == limit:
+                break
+        return found
+
+    def records(self, rows):
+        return [
+            {
+                'id': int(self.columns['id'][row]),
+                'neighborhood': self.columns['neighborhood'][row],
+                'listed_price': float(self.listed[row]),
+                'predicted_price': float(self.columns['predicted_price'][row]),
+                'bedrooms': int(self.columns['bedrooms'][row]),
+                'bathrooms': float(self.columns['bathrooms'][row]),
+                'sqft': int(self.columns['sqft'][row]),
+                'value_score': round(float(self.value[row]), 2),
+                'features': self.columns['features'][row],
+            }
+            for row in rows
+        ]
+
+
+def get_index():
+    """Index of the current candidates, rebuilt in this process whenever any process changed them"""
+    global _index, _index_version
+    version = DataVersion.current(VERSION_NAME)
+    if _index is None or version != _index_version:
+        with _index_lock:
+            if _index is None or version != _index_version:
+                started = time.perf_counter()
+                _index = RecommendationIndex.from_database()
+                _index_version = version
+                logger.info("Built recommendation index of %d candidates in %.2fs", len(_index), time.perf_counter() - started)
+    return _index
+
+
+def invalidate():
+    # stored in the database so every worker process sees it, and committed along with the change
+    DataVersion.bump(VERSION_NAME)
+
+
+def recommend(budget, min_bedrooms=0, neighborhood=None, limit=5):
+    index = get_index()
+    return index.records(index.search(budget, min_bedrooms, neighborhood, min(limit, MAX_RESULTS)))
+
+
+def feature_tags(chunk):
+    masks = [
+        (test(chunk[column]).fillna(False).to_numpy(dtype=bool), label)
+        for column, test, label in FEATURE_TAGS if column in chunk
+    ]
+    return [[label for mask, label in masks if mask[i]] for i in range(len(chunk))]
+
+
+def build_candidates(path, price_column='SalePrice', chunk_rows=50000):
+    """Score every listing in a CSV once and upsert it as a CandidateProperty; returns the row count"""
+    model = get_model()
+    source = os.path.basename(path)
+    total = 0
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        chunk = chunk[chunk[price_column] > 0]
+        if chunk.empty:
+            continue
+        predicted = model.predict_frame(chunk)
+        listed = chunk[price_column].to_numpy(dtype='float64')
+        scores = value_score(predicted, listed)
+        bathrooms = chunk['FullBath'].fillna(0) + 0.5 * chunk['HalfBath'].fillna(0)
+        candidates = [
+            CandidateProperty(
+                source_ref=f'{source}:{ref}',
+                neighborhood=neighborhood,
+                bedrooms=int(bedrooms),
+                bathrooms=float(baths),
+                sqft=int(sqft),
+                listed_price=round(float(price), 2),
+                predicted_price=round(float(prediction), 2),
+                value_score=float(score),
+                features=tags,
+                model_version=model.version,
+            )
+            for ref, neighborhood, bedrooms, baths, sqft, price, prediction, score, tags in zip(
+                chunk['Id'], chunk['Neighborhood'].fillna(''), chunk['BedroomAbvGr'].fillna(0), bathrooms,
+                chunk['GrLivArea'].fillna(0), listed, predicted, scores, feature_tags(chunk)
+            )
+        ]
+        CandidateProperty.objects.bulk_create(
+            candidates, update_conflicts=True, unique_fields=['source_ref'],
+            update_fields=[
+                'neighborhood', 'bedrooms', 'bathrooms', 'sqft', 'listed_price', 'predicted_price',
+                'value_score', 'features', 'model_version', 'updated_at'
+            ]
+        )
+        total += len(candidates)
+    invalidate()
+    return total
+
+
+@receiver(post_save, sender=CandidateProperty)
+@receiver(post_delete, sender=CandidateProperty)
+def invalidate_on_change(sender, **kwargs):
+    invalidate()
@@ -0,0 +1,75 @@
+"""Re-score PropertySubmission rows with the active model in bulk.
+
+Submissions are read in primary-key order, one chunk at a time, turned into
+model features column-wise, scored with one model call per chunk and
+written back with bulk_update. Every row
+records the model version that priced it, so an interrupted run picks up
+where it stopped: rows already priced by the active version are skipped.
+"""
+import logging
+import time
+
+from django.utils import timezone
+
+from .ai_model import confidence_percent, get_model
+from .features import build_feature_frame, submissions_frame
+from .market_stats import bulk_update_with_stats
+from .models import PropertySubmission
+
+logger = logging.getLogger(__name__)
+
+
+def chunks(queryset, chunk_size, after=0):
+    """Lists of up to chunk_size submissions, paging on pk.
+
+    Keyset pages instead of one long iterator() cursor: the rows are written
+    back while we read, which SQLite does not isolate within a connection.
+    """
+    last = after
+    while True:
+        chunk = list(queryset.filter(pk__gt=last).order_by('pk')[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1].pk
+
+
+def repredict_submissions(queryset=None, chunk_size=2000, force=False, after=0, progress=None):
+    """Price every submission in `queryset` with the active model; returns the number re-scored.
+
+    Without `force`, rows already priced by the active model version are
+    skipped, which makes reruns resume. `progress(done, total, last_pk)` is
+    called after each chunk.
+    """
+    model = get_model()
+    queryset = PropertySubmission.objects.all() if queryset is None else queryset
+    if not force:
+        queryset = queryset.exclude(prediction_version=model.version)
+    total = queryset.filter(pk__gt=after).count()
+    confidence = confidence_percent(model.coverage)
+    done = 0
+    started = time.perf_counter()
+    for chunk in chunks(queryset, chunk_size, after):
+        now = timezone.now()
+        frame = build_feature_frame(submissions_frame(chunk), now)
+        # bulk scoring skips the prediction cache, which is sized for single requests
+        predictions = model.predict_frame(frame)
+        bounds = model.bounds(frame, predictions)
+        lower, upper = (None, None) if bounds is None else (bounds[0].tolist(), bounds[1].tolist())
+        for i, (submission, prediction) in enumerate(zip(chunk, predictions.tolist())):
+            submission.predicted_price = round(prediction, 2)
+            submission.prediction_lower = None if lower is None else round(lower[i], 2)
+            submission.prediction_upper = None if upper is None else round(upper[i], 2)
+            submission.prediction_confidence = confidence
+            submission.prediction_timestamp = now
+            submission.prediction_version = model.version
+        # only the price and its interval differ per row; the rest goes out as one plain UPDATE
+        bulk_update_with_stats(
+            chunk, ['predicted_price', 'prediction_lower', 'prediction_upper'], prediction_confidence=confidence,
+            prediction_timestamp=now, prediction_version=model.version
+        )
+        done += len(chunk)
+        if progress:
+            progress(done, total, chunk[-1].pk)
+    logger.info("Re-scored %d submissions with model %s in %.1fs", done, model.version, time.perf_counter() - started)
+    return done
@@ -0,0 +1,151 @@
+"""Incremental retraining from verified sales.
+
+Verified PropertySubmission rows with a sale_price are labelled examples
+the deployed model has never seen. Instead of a full search (train_model),
+retrain() starts from the current version and either
+
+* "boost": adds a few boosting rounds fitted on the new rows only,
+  continuing the current booster; or
+* "window": refits the booster with the current hyperparameters on the
+  most recent `window` sales (the train.csv training split followed by
+  the verified submissions, oldest first).
+
+The fitted preprocessing is kept as is in both modes, so only the booster
+changes. A share of the new rows is held out, and the candidate is only
+accepted if its RMSE on that plus the train.csv holdout is not worse than
+the current model's. The candidate's prediction intervals are recalibrated
+on the same gate holdout. Each version's metrics.json lists the submissions
+it was trained on, so the next run only picks up rows verified since.
+"""
+import copy
+import json
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from .ai_model import _iteration_range
+from .features import SOURCE_FIELDS, build_feature_frame
+from .intervals import DEFAULT_COVERAGE, ConformalIntervals
+from .models import PropertySubmission
+from .training import (
+    METRICS_FILENAME, SPLIT_SEED, TrainingResult, holdout_split, load_training_frame, neighborhoods,
+    regression_metrics,
+)
+
+MODES = ('boost', 'window')
+
+
+def parent_metrics(model):
+    """metrics.json of the version `model` was loaded from ({} for artifacts without one)"""
+    try:
+        with open(os.path.join(os.path.dirname(model.path), METRICS_FILENAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def verified_sales(queryset=None):
+    """(X, y, pks) of verified submissions with a sale price, oldest first, X in the training columns"""
+    queryset = PropertySubmission.objects.all() if queryset is None else queryset
+    rows = list(queryset.filter(is_verified=True, sale_price__isnull=False)
+                .order_by('pk').values_list('pk', 'sale_price', *SOURCE_FIELDS))
+    frame = pd.DataFrame.from_records(rows, columns=['pk', 'sale_price'] + SOURCE_FIELDS)
+    X = build_feature_frame(frame[SOURCE_FIELDS])
+    return X, frame['sale_price'].astype(np.float64).to_numpy(), frame['pk'].to_numpy(dtype=np.int64)
+
+
+def _booster(regressor):
+    booster = regressor.get_booster()
+    end = _iteration_range(regressor)[1]
+    # drop rounds past best_iteration, the model never predicted with them
+    return booster[:end] if end else booster
+
+
+def retrain(model, mode='boost', rounds=50, learning_rate=None, window=None, holdout_fraction=0.2,
+            tolerance=0.0, min_rows=1, queryset=None, coverage=None):
+    """Candidate TrainingResult from `model` plus the verified sales it has not seen yet.
+
+    Returns None with fewer than `min_rows` new sales. The result's metrics hold
+    the holdout comparison and an `accepted` flag; it is published by the
+    caller, and only if accepted. Intervals keep the parent's coverage unless
+    `coverage` is given.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown retraining mode: {mode}")
+    if model.model is None:
+        raise ValueError(f"Version {model.version} has no sklearn pipeline to continue (compact artifact); "
+                         f"retrain its pickle version and export that")
+    started = time.perf_counter()
+    parent = parent_metrics(model)
+    seen = np.asarray(parent.get('submission_ids', []), dtype=np.int64)
+    X_sales, y_sales, pks = verified_sales(queryset)
+    new = ~np.isin(pks, seen)
+    if new.sum() < max(min_rows, 1):
+        return None
+
+    # hold out part of the new rows so the gate also sees the population they come from
+    new_index = np.flatnonzero(new)
+    holdout_count = math.floor(len(new_index) * holdout_fraction)
+    if holdout_count:
+        train_index, holdout_index = train_test_split(new_index, test_size=holdout_count, random_state=SPLIT_SEED)
+    else:
+        train_index, holdout_index = new_index, new_index[:0]
+    train_index = np.sort(train_index)
+
+    X, y = load_training_frame('train.csv')
+    X_train, X_holdout, y_train, y_holdout = holdout_split(X, y)
+    gate = pd.concat([X_holdout, X_sales.iloc[holdout_index]], ignore_index=True)
+    holdout = model.transform(gate)
+    y_gate = np.concatenate([y_holdout.to_numpy(dtype=np.float64), y_sales[holdout_index]])
+
+    pipeline = model.model
+    regressor = copy.deepcopy(pipeline.named_steps['model'])
+    if mode == 'boost':
+        params = {'n_estimators': rounds}
+        if learning_rate:
+            params['learning_rate'] = learning_rate
+        regressor.set_params(**params)
+        regressor.fit(model.transform(X_sales.iloc[train_index]), y_sales[train_index], xgb_model=_booster(regressor))
+        trained_on = len(train_index)
+    else:
+        # everything the parent was trained on plus the new training rows, oldest first
+        used = np.isin(pks, seen)
+        used[train_index] = True
+        X_window = pd.concat([X_train, X_sales[used]], ignore_index=True)
+        y_window = np.concatenate([y_train.to_numpy(dtype=np.float64), y_sales[used]])
+        if window:
+            X_window, y_window = X_window.iloc[-window:], y_window[-window:]
+        regressor = clone(regressor)
+        if learning_rate:
+            regressor.set_params(learning_rate=learning_rate)
+        regressor.fit(model.transform(X_window), y_window)
+        trained_on = len(X_window)
+
+    predictions = regressor.predict(holdout).astype(np.float64)
+    current = regression_metrics(y_gate, model.predict_matrix(holdout))
+    candidate = regression_metrics(y_gate, predictions)
+    intervals = ConformalIntervals.calibrate(predictions, y_gate, neighborhoods(gate),
+                                             coverage=coverage or model.coverage or DEFAULT_COVERAGE)
+    accepted = candidate['rmse'] <= current['rmse'] * (1 + tolerance)
+    metrics = {
+        'parent': model.version,
+        'mode': mode,
+        'params': {key: regressor.get_params()[key] for key in ('learning_rate', 'max_depth', 'n_estimators')},
+        'rows': {'new': int(new.sum()), 'trained_on': trained_on, 'new_holdout': len(holdout_index),
+                 'holdout': len(y_gate)},
+        'holdout': candidate,
+        'parent_holdout': current,
+        'interval': {'coverage': intervals.coverage, 'margin': intervals.metrics['margin']},
+        'tolerance': tolerance,
+        'accepted': bool(accepted),
+        'total_seconds': time.perf_counter() - started,
+        'submission_ids': sorted(set(seen.tolist()) | set(pks[train_index].tolist())),
+    }
+    pipeline = Pipeline([('preprocessor', pipeline.named_steps['preprocessor']), ('model', regressor)])
+    return TrainingResult(pipeline, list(model.features), metrics['params'], metrics, intervals)
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+
+def _column(df, name, default):
+    """Column from an uploaded frame, or a constant column when the upload lacks it"""
+    if name in df.columns:
+        return df[name].to_numpy()
+    return np.full(len(df), default, dtype=object)
+
+
+def prediction_rows(df, predictions, start_id=1, bounds=None):
+    """Response rows for an uploaded frame, built column-wise instead of walking row dicts.
+
+    `bounds` is the (lower, upper) pair from HousePriceModel.bounds(); without
+    one (uncalibrated model) the interval columns are left out.
+    """
+    rows = pd.DataFrame({
+        'id': np.arange(start_id, start_id + len(df)),
+        'bedrooms': _column(df, 'BedroomAbvGr', 0),
+        'bathrooms': _column(df, 'FullBath', 0),
+        'sqft_living': _column(df, 'GrLivArea', 0),
+        'neighborhood': _column(df, 'Neighborhood', 'Unknown'),
+        'year_built': _column(df, 'YearBuilt', 0),
+        'predicted_price': predictions
+    })
+    if bounds is not None:
+        rows['price_lower'], rows['price_upper'] = bounds
+    return rows
+
+
+def interval_payload(prediction):
+    """JSON form of a Prediction's interval, None when the model is uncalibrated"""
+    if prediction.lower is None:
+        return None
+    return {'lower': prediction.lower, 'upper': prediction.upper, 'coverage': prediction.coverage}
@@ -1,3 +1,936 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import threading
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import wait
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from .ai_model import (
+    HousePriceModel, ModelRegistry, ModelWatcher, PredictionBatcher, artifact_state, available_versions,
+    export_compact, get_model, legacy_model_path, predict_one, read_version_history, resolve_artifact,
+    write_active_version,
+)
+from .comparables import ComparablesIndex, training_sales
+from . import async_views, comparables, datasets, insights, jobs, metrics
+from .log import DebugSampleFilter, JsonFormatter, request_log
+from .features import build_feature_frame, submissions_frame
+from .explanations import SAABAS, TREE_SHAP, explain_frame, global_importance
+from .intervals import ConformalIntervals
+from .market_stats import bulk_update_with_stats, rebuild, update_with_stats
+from .models import CandidateProperty, DataVersion, MarketAggregate, MarketInsight, PredictionJob, PropertySubmission
+from .parallel import ParallelScorer
+from .prediction_cache import PredictionCache, cached_predict_frame, get_prediction_cache
+from .recommendations import RecommendationIndex
+from .retraining import retrain
+from .training import METRICS_FILENAME, load_training_frame, publish, train
+
+
+class CompiledPipelineParityTests(SimpleTestCase):
+    """The NumPy fast path must predict exactly what the sklearn pipeline predicts"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.model = get_model()
+
+    def assert_parity(self, frame):
+        self.assertIsNotNone(self.model.compiled)
+        expected = self.model.model.predict(self.model.align(frame))
+        np.testing.assert_array_equal(self.model.compiled.predict(frame), expected)
+
+    def test_train_csv(self):
+        self.assert_parity(pd.read_csv(os.path.join(settings.DATASET_DIR, 'train.csv')))
+
+    def test_test_csv(self):
+        self.assert_parity(pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv')))
+
+    def test_single_rows(self):
+        frame = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv'))
+        for i in range(20):
+            self.assert_parity(frame.iloc[[i]])
+
+    def test_missing_columns_and_unknown_categories(self):
+        frame = pd.DataFrame.from_records([
+            {'GrLivArea': 2000, 'Neighborhood': 'NAmes', 'OverallQual': 7},
+            {'Neighborhood': None, 'MSZoning': 'Unknown', 'LotArea': 9000},
+        ])
+        self.assert_parity(frame)
+
+
+class CompactArtifactTests(SimpleTestCase):
+    """An exported compact artifact loads without the pickle and predicts exactly like it"""
+
+    def test_round_trip(self):
+        source = get_model()
+        frame = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv'))
+        with tempfile.TemporaryDirectory() as root, override_settings(HOUSE_PRICE_MODEL_DIR=root):
+            staged = []
+
+            def check(path):
+                # the staged copy is checked before it becomes a version workers could serve
+                staged.append((os.path.basename(os.path.dirname(path)), available_versions()))
+                raise CommandError('mismatch')
+
+            with self.assertRaises(CommandError):
+                export_compact(source, os.path.join(root, 'compact'), check=check)
+            self.assertTrue(staged[0][0].startswith('.'))
+            self.assertEqual(staged[0][1], [])
+            self.assertEqual(os.listdir(root), [])
+
+            manifest = export_compact(source, os.path.join(root, 'compact'), check=lambda path: None)
+            exported = HousePriceModel(manifest, version='compact')
+            self.assertIsNone(exported.model)
+            self.assertIsInstance(exported.compiled.arrays['medians'], np.memmap)
+            np.testing.assert_array_equal(exported.predict_frame(frame), source.predict_frame(frame))
+            del exported
+
+
+class ModelRegistryTests(SimpleTestCase):
+    """Published versions hot-swap into a registry, a broken one is retried, and rollback walks back"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        overridden = override_settings(HOUSE_PRICE_MODEL_DIR=self.root)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+    def publish(self, version):
+        call_command('model_version', 'publish', legacy_model_path(), version, '--activate', stdout=io.StringIO())
+
+    def test_publish_hot_swap_and_rollback(self):
+        registry = ModelRegistry(history_size=1)
+        self.publish('v1')
+        watcher = ModelWatcher(registry, interval=0)
+        self.assertEqual(registry.refresh(), 'v1')
+        self.publish('v2')
+        # nothing but versions and the pointer files is left behind by publish
+        self.assertEqual(sorted(os.listdir(self.root)), ['ACTIVE', 'HISTORY', 'v1', 'v2'])
+        watcher.poll()
+        self.assertEqual(registry.active_version(), 'v2')
+        self.assertEqual(registry.previous_versions(), ['v1'])
+        self.publish('v3')
+        watcher.poll()
+        self.assertEqual((registry.active_version(), registry.previous_versions()), ('v3', ['v2']))
+        self.assertEqual(registry.rollback(), 'v2')
+        with self.assertRaises(KeyError):
+            registry.rollback()
+
+        # a version that fails to load keeps the current one serving, and is retried on the next poll
+        os.makedirs(os.path.join(self.root, 'v4'))
+        with open(os.path.join(self.root, 'v4', 'model.pkl'), 'wb') as f:
+            f.write(b'not a pickle')
+        write_active_version('v4')
+        state = watcher._state
+        with self.assertLogs('dashboard.ai_model', 'ERROR'):
+            watcher.poll()
+        self.assertEqual(registry.active_version(), 'v2')
+        self.assertEqual(watcher._state, state)
+
+        # each rollback goes one activation further back: v4 -> v3 -> v2 -> v1
+        for expected in ('v3', 'v2', 'v1'):
+            call_command('model_version', 'rollback', stdout=io.StringIO())
+            self.assertEqual(resolve_artifact()[0], expected)
+            watcher.poll()
+            self.assertEqual(registry.active_version(), expected)
+            self.assertEqual(watcher._state, artifact_state())
+        self.assertEqual(read_version_history(), ['v1'])
+        with self.assertRaises(CommandError):
+            call_command('model_version', 'rollback', stdout=io.StringIO())
+
+
+class TrainingTests(SimpleTestCase):
+    """Successive halving keeps the best trials, and a trained model publishes as a loadable version"""
+
+    def test_search_and_publish(self):
+        X, y = load_training_frame(os.path.join(settings.DATASET_DIR, 'train.csv'))
+        space = [{'learning_rate': 0.3, 'max_depth': 2}, {'learning_rate': 0.01, 'max_depth': 2},
+                 {'learning_rate': 0.3, 'max_depth': 4}, {'learning_rate': 0.1, 'max_depth': 3}]
+        result = train(X, y, space, max_rounds=40, factor=2, patience=10, workers=1)
+        rungs = result.metrics['search']['rungs']
+        self.assertEqual([rung['trials'] for rung in rungs], [4, 2, 1])
+        self.assertEqual([rung['rounds'] for rung in rungs], [10, 20, 40])
+        # the slow learner cannot survive the first rung
+        self.assertNotEqual(result.params['learning_rate'], 0.01)
+        self.assertLessEqual(result.params['n_estimators'], 40)
+        with tempfile.TemporaryDirectory() as root, override_settings(HOUSE_PRICE_MODEL_DIR=root):
+            # a publish or export still in progress is not a version yet
+            os.makedirs(os.path.join(root, '.train-partial'))
+            open(os.path.join(root, '.train-partial', 'model.pkl'), 'wb').close()
+            path = publish(result, 'trained')
+            self.assertEqual(available_versions(), ['trained'])
+            self.assertTrue(os.path.exists(os.path.join(root, 'trained', METRICS_FILENAME)))
+            model = HousePriceModel(path)
+            self.assertEqual(model.version, 'trained')
+            self.assertEqual(model.coverage, 0.9)
+            np.testing.assert_array_equal(model.predict_frame(X.iloc[:50]), result.pipeline.predict(X.iloc[:50]))
+
+
+class RetrainingTests(TestCase):
+    """Retraining only picks up verified sales the parent has not seen, and records the ones it used"""
+
+    def test_boost_from_new_sales(self):
+        model = get_model()
+        self.assertIsNone(retrain(model))
+        rng = np.random.default_rng(1)
+        PropertySubmission.objects.bulk_create([
+            PropertySubmission(
+                address=f'{i} Test St', city='Ames', state='IA', zip_code='50010', neighborhood='NAmes',
+                property_type='single_family', bedrooms=3, bathrooms=2, living_area=int(rng.integers(900, 3000)),
+                lot_area=9000, year_built=int(rng.integers(1950, 2010)), overall_quality=int(rng.integers(4, 9)),
+                overall_condition=5, is_verified=i < 20, sale_price=int(rng.integers(100, 300)) * 1000,
+            )
+            for i in range(25)
+        ])
+        result = retrain(model, rounds=5, tolerance=1.0)
+        self.assertEqual(result.metrics['rows'], {'new': 20, 'trained_on': 16, 'new_holdout': 4, 'holdout': 296})
+        self.assertEqual(len(result.metrics['submission_ids']), 16)
+        self.assertTrue(result.metrics['accepted'])
+        booster = result.pipeline.named_steps['model'].get_booster()
+        self.assertEqual(booster.num_boosted_rounds(), model.model[-1].get_booster().num_boosted_rounds() + 5)
+        with tempfile.TemporaryDirectory() as root, override_settings(HOUSE_PRICE_MODEL_DIR=root):
+            child = HousePriceModel(publish(result, 'retrained'))
+            # the held-out rows are still new to the published version
+            self.assertEqual(retrain(child, rounds=5).metrics['rows']['new'], 4)
+
+
+class RepredictTests(TestCase):
+    """Reruns only price rows the active version has not priced, and --after resumes past a pk"""
+
+    def repredict(self, *args):
+        out = io.StringIO()
+        call_command('repredict_submissions', '--chunk-size', '4', *args, stdout=out)
+        return out.getvalue()
+
+    def test_rerun_and_after(self):
+        PropertySubmission.objects.bulk_create([
+            PropertySubmission(
+                address=f'{i} Test St', city='Ames', state='IA', zip_code='50010', neighborhood='NAmes',
+                property_type='single_family', bedrooms=3, bathrooms=2, living_area=1000 + 100 * i,
+                lot_area=9000, year_built=1990, overall_quality=6, overall_condition=5,
+            )
+            for i in range(10)
+        ])
+        pks = list(PropertySubmission.objects.order_by('pk').values_list('pk', flat=True))
+        version = get_model().version
+
+        self.assertIn("Re-scored 6 submissions", self.repredict('--after', str(pks[3])))
+        priced = set(PropertySubmission.objects.filter(prediction_version=version).values_list('pk', flat=True))
+        self.assertEqual(priced, set(pks[4:]))
+
+        # a run that dies after its first chunk keeps what it wrote; the rerun prices only the rest
+        PropertySubmission.objects.filter(pk__in=pks[4:]).update(prediction_version='old')
+        writes = []
+
+        def write_then_die(*args, **kwargs):
+            writes.append(args[0])
+            if len(writes) == 2:
+                raise RuntimeError('killed')
+            return bulk_update_with_stats(*args, **kwargs)
+
+        with mock.patch('dashboard.repredict.bulk_update_with_stats', write_then_die):
+            with self.assertRaises(RuntimeError):
+                self.repredict()
+        output = self.repredict()
+        self.assertIn("Re-scored 6 submissions", output)
+        self.assertIn("6/6 submissions", output)
+        self.assertIn(f"last pk {pks[-1]}", output)
+        self.assertIn("Re-scored 0 submissions", self.repredict())
+        self.assertIn("Re-scored 10 submissions", self.repredict('--force'))
+        self.assertEqual(PropertySubmission.objects.filter(prediction_version=version).count(), 10)
+
+
+class IntervalTests(TestCase):
+    """Conformal intervals hold their coverage out of sample and reach every prediction path"""
+
+    def test_calibration_coverage(self):
+        rng = np.random.default_rng(0)
+        names = rng.choice(['A', 'B', 'C'], 4000)
+        predicted = rng.uniform(1e5, 4e5, 4000)
+        # neighborhood C is three times noisier, so its intervals must be wider
+        actual = predicted * np.exp(rng.normal(0, np.where(names == 'C', 0.3, 0.1)))
+        intervals = ConformalIntervals.calibrate(predicted[:2000], actual[:2000], names[:2000])
+        lower, upper = intervals.bounds(predicted[2000:], names[2000:])
+        covered = (actual[2000:] >= lower) & (actual[2000:] <= upper)
+        self.assertAlmostEqual(covered.mean(), 0.9, delta=0.03)
+        self.assertAlmostEqual(covered[names[2000:] == 'C'].mean(), 0.9, delta=0.05)
+        unknown = intervals.bounds([2e5], ['Nowhere'])
+        self.assertLess(intervals.bounds([2e5], ['A'])[1][0], unknown[1][0])
+        self.assertLess(unknown[1][0], intervals.bounds([2e5], ['C'])[1][0])
+
+    def test_batch_and_submission_paths(self):
+        model = get_model()
+        self.assertIsNotNone(model.intervals)
+        data = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv')).iloc[:100]
+        upload = SimpleUploadedFile('upload.csv', data.to_csv(index=False).encode(), content_type='text/csv')
+        rows = pd.DataFrame(Client().post('/dashboard/model-prediction/', {'file': upload}).json()['predictions'])
+        lower, upper = model.bounds(data, rows['predicted_price'].to_numpy())
+        np.testing.assert_allclose(rows['price_lower'], lower)
+        np.testing.assert_allclose(rows['price_upper'], upper)
+        self.assertTrue(((rows['price_lower'] < rows['predicted_price']) & (rows['predicted_price'] < rows['price_upper'])).all())
+
+        submission = PropertySubmission.objects.create(
+            address='1 Test St', city='Ames', state='IA', zip_code='50010', neighborhood='NAmes',
+            property_type='single_family', bedrooms=3, bathrooms=2, living_area=1500, lot_area=9000,
+            year_built=1990, overall_quality=6, overall_condition=5,
+        )
+        submission.predict_price()
+        submission.refresh_from_db()
+        self.assertEqual(submission.prediction_confidence, 90.0)
+        self.assertLess(submission.prediction_lower, submission.predicted_price)
+        self.assertLess(submission.predicted_price, submission.prediction_upper)
+
+
+class ExplanationTests(SimpleTestCase):
+    """Contributions add up to the prediction on both pipelines, are cached, and are bounded per request"""
+
+    def test_contributions_add_up(self):
+        frame = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv')).iloc[:30]
+        model = get_model()
+        sklearn_model = HousePriceModel(model.path, fast_path=False)
+        for method in (TREE_SHAP, SAABAS):
+            explanation = explain_frame(model, frame, method=method)
+            total = explanation.contributions.sum(axis=1, dtype=np.float64) + explanation.base_value
+            np.testing.assert_allclose(total, explanation.predictions, rtol=1e-5)
+            # the second call is served from the prediction cache
+            np.testing.assert_array_equal(explain_frame(model, frame, method=method).contributions,
+                                          explanation.contributions)
+            np.testing.assert_array_equal(explain_frame(sklearn_model, frame, method=method).contributions,
+                                          explanation.contributions)
+        self.assertEqual(explain_frame(model, frame).method, TREE_SHAP)
+        with override_settings(HOUSE_PRICE_EXPLAIN_EXACT_ROWS=10):
+            self.assertEqual(explain_frame(model, frame).method, SAABAS)
+        importance = global_importance(model)
+        self.assertIs(global_importance(model), importance)
+        self.assertAlmostEqual(sum(entry['share'] for entry in importance['features']), 1.0)
+
+    def test_endpoints(self):
+        rows = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv')).iloc[:3]
+        properties = [row.dropna().to_dict() for _, row in rows.iterrows()]
+        response = Client().post('/dashboard/api/explain/', json.dumps({'properties': properties, 'top': 4}),
+                                 content_type='application/json').json()
+        self.assertEqual(response['method'], TREE_SHAP)
+        self.assertEqual([len(row['contributions']) for row in response['explanations']], [4, 4, 4])
+        upload = SimpleUploadedFile('upload.csv', rows.to_csv(index=False).encode(), content_type='text/csv')
+        predictions = Client().post('/dashboard/model-prediction/?explain=2', {'file': upload}).json()['predictions']
+        self.assertEqual(predictions[0]['contributions'], response['explanations'][0]['contributions'][:2])
+        with override_settings(HOUSE_PRICE_EXPLAIN_MAX_ROWS=2):
+            response = Client().post('/dashboard/api/explain/', json.dumps({'properties': properties}),
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 413)
+
+
+class DatasetCacheTests(SimpleTestCase):
+    """The columnar cache reads back exactly what read_csv parses, and follows edits to the CSV"""
+
+    def test_round_trip_and_invalidation(self):
+        source = os.path.join(settings.DATASET_DIR, 'train.csv')
+        expected = pd.read_csv(source)
+        with tempfile.TemporaryDirectory() as root, override_settings(HOUSE_PRICE_DATASET_CACHE_DIR=root):
+            pd.testing.assert_frame_equal(datasets.read(source, raw=True), expected)
+            typed = datasets.read(source, columns=['SalePrice', 'Neighborhood', 'LotFrontage'])
+            self.assertEqual(list(typed.columns), ['SalePrice', 'Neighborhood', 'LotFrontage'])
+            self.assertEqual(typed['Neighborhood'].dtype, 'category')
+            self.assertEqual(typed['SalePrice'].dtype, np.int32)
+            self.assertEqual(typed['LotFrontage'].dtype, np.float32)
+            self.assertTrue(typed['Neighborhood'].astype(object).equals(expected['Neighborhood']))
+
+            edited = os.path.join(root, 'train.csv')
+            expected.iloc[:10].assign(SalePrice=1).to_csv(edited, index=False)
+            self.assertEqual(datasets.read(edited, columns=['SalePrice'])['SalePrice'].tolist(), [1] * 10)
+            expected.iloc[:5].to_csv(edited, index=False)
+            self.assertEqual(len(datasets.read(edited)), 5)
+            self.assertEqual(len([entry for entry in os.listdir(root) if entry.startswith('train-')]), 3)
+
+
+class PredictionJobTests(TransactionTestCase):
+    """Bulk jobs run in the background, and a job killed halfway resumes without losing or repeating rows"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        overridden = override_settings(MEDIA_ROOT=media, HOUSE_PRICE_JOB_CHUNK_ROWS=500)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        frame = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv'))
+        frame.insert(1, 'Notes', ['corner lot,\n"quiet" street' if i % 7 == 0 else '' for i in range(len(frame))])
+        self.rows = len(frame)
+        # quoted fields spanning lines and a blank line must not shift the row count or the resume point
+        self.csv = frame.iloc[:700].to_csv(index=False) + '\n' + frame.iloc[700:].to_csv(index=False, header=False)
+        self.expected = get_model().predict_frame(frame)
+
+    def upload(self):
+        return SimpleUploadedFile('houses.csv', self.csv.encode(), content_type='text/csv')
+
+    def assert_output(self, job):
+        output = pd.read_csv(job.output_file.path)
+        self.assertEqual(output['id'].tolist(), list(range(1, self.rows + 1)))
+        np.testing.assert_allclose(output['predicted_price'], self.expected, rtol=1e-6)
+
+    def test_submit_status_download(self):
+        client = Client()
+        response = client.post('/dashboard/api/prediction-jobs/', {'file': self.upload()})
+        self.assertEqual(response.status_code, 202)
+        body = response.json()
+        deadline = time.monotonic() + 60
+        while True:
+            job = client.get(body['status_url']).json()['job']
+            if job['status'] in ('completed', 'failed') or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        self.assertEqual((job['status'], job['rows_done'], job['total_rows']), ('completed', self.rows, self.rows))
+        response = client.get(body['download_url'])
+        self.assertEqual(response['X-Model-Version'], get_model().version)
+        self.assert_output(PredictionJob.objects.get(pk=body['job_id']))
+
+    def test_resume_after_crash(self):
+        with mock.patch.object(jobs, 'enqueue'):
+            job = jobs.submit_job(self.upload())
+        self.assertEqual(jobs.count_rows(job.input_file.path), self.rows)
+        # the worker dies after writing its third chunk but before recording it
+        with mock.patch.object(jobs.os, 'fsync', side_effect=[None, None, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                jobs.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_done, job.chunks_done), ('running', 1000, 2))
+        self.assertGreater(os.path.getsize(job.output_file.path), job.output_bytes)
+
+        # nobody takes the job over while its worker could still be alive
+        jobs.run_job(job.pk)
+        self.assertEqual(PredictionJob.objects.get(pk=job.pk).rows_done, 1000)
+        PredictionJob.objects.filter(pk=job.pk).update(updated_at=job.updated_at - timedelta(hours=1))
+        jobs.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_done, job.total_rows), ('completed', self.rows, self.rows))
+        self.assertEqual(job.model_version, get_model().version)
+        self.assertEqual(job.resumed_model_version, '')
+        self.assert_output(job)
+
+
+class MarketSnapshotTests(TestCase):
+    """The insights snapshot is reused while the source CSV is unchanged and recomputed once it changes"""
+
+    def test_reused_until_source_changes(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        path = os.path.join(root, 'train.csv')
+        train = pd.read_csv(os.path.join(settings.DATASET_DIR, 'train.csv'))
+        train.iloc[:1000].to_csv(path, index=False)
+        with override_settings(MARKET_INSIGHTS_DATA=path, HOUSE_PRICE_DATASET_CACHE_DIR=os.path.join(root, '.cache')), \
+                mock.patch.object(insights, 'compute_snapshot', wraps=insights.compute_snapshot) as compute:
+            first = insights.get_market_snapshot()
+            self.assertEqual(first['total_properties'], 1000)
+            self.assertEqual(insights.get_market_snapshot(), first)
+            # another process (empty cache) picks up the stored snapshot
+            cache.clear()
+            self.assertEqual(insights.get_market_snapshot(), first)
+            self.assertEqual(compute.call_count, 1)
+
+            train.to_csv(path, index=False)
+            second = insights.get_market_snapshot()
+            self.assertEqual(compute.call_count, 2)
+            self.assertEqual(second['total_properties'], len(train))
+            self.assertNotEqual(second['source_hash'], first['source_hash'])
+            self.assertEqual(MarketInsight.objects.count(), 2)
+
+
+class MarketAggregateTests(TestCase):
+    """Aggregates maintained write by write agree with a rebuild from scratch"""
+
+    def test_matches_rebuild(self):
+        rng = np.random.default_rng(2)
+        submissions = [
+            PropertySubmission.objects.create(
+                address=f'{i} Test St', city='Ames', state='IA', zip_code='50010',
+                neighborhood=['NAmes', 'CollgCr', 'OldTown'][i % 3], property_type='single_family',
+                bedrooms=3, bathrooms=2, living_area=int(rng.integers(900, 3000)), lot_area=9000,
+                year_built=1990, overall_quality=int(rng.integers(3, 10)), overall_condition=5,
+                is_verified=i % 2 == 0, sale_price=int(rng.integers(80, 400)) * 1000 if i % 4 else None,
+                predicted_price=float(rng.integers(80, 400)) * 1000 + 0.37 if i % 5 else None,
+                sale_date=date(2024, 1 + i % 12, 1) if i % 3 == 0 else None,
+            )
+            for i in range(40)
+        ]
+        for submission in submissions[:10]:
+            submission.neighborhood = 'Edwards'
+            submission.sale_price = 215000
+            submission.is_verified = not submission.is_verified
+            submission.save()
+        for submission in submissions[10:15]:
+            submission.delete()
+        update_with_stats(PropertySubmission.objects.filter(neighborhood='OldTown'), is_verified=True, living_area=1800)
+        changed = submissions[15:30]
+        for submission in changed:
+            submission.refresh_from_db()
+            submission.overall_quality = 7
+            submission.predicted_price = 199999.99
+            submission.neighborhood = 'Gilbert'
+        bulk_update_with_stats(changed, ['overall_quality', 'predicted_price'], batch_size=4, neighborhood='Gilbert')
+
+        # min/max only ever widen, so deleted or repriced extremes are the one expected difference
+        drift = rebuild(dry_run=True)
+        self.assertEqual([row for row in drift if row[2] not in ('min_price', 'max_price')], [])
+        self.assertTrue(MarketAggregate.objects.filter(scope='neighborhood', key='Gilbert', count=15).exists())
+        rebuild()
+        self.assertEqual(rebuild(dry_run=True), [])
+
+
+class ComparablesIndexTests(SimpleTestCase):
+    """The KD-tree, brute-force and append-buffer paths must return the same neighbours"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.sales = training_sales()
+
+    def nearest(self, index, sale, neighborhood):
+        # distances, not ids: train.csv has exact duplicates, so tied neighbours may come back in any order
+        return [c['distance'] for c in index.query(sale, neighborhood, k=5)]
+
+    def test_tree_matches_brute_force(self):
+        tree = ComparablesIndex(self.sales, brute_force_rows=10)
+        brute = ComparablesIndex(self.sales, brute_force_rows=len(self.sales))
+        for sale in self.sales.sample(50, random_state=0).to_dict('records'):
+            for neighborhood in (sale['Neighborhood'], None):
+                self.assertEqual(self.nearest(tree, sale, neighborhood), self.nearest(brute, sale, neighborhood))
+
+    def test_added_and_discarded_sales(self):
+        full = ComparablesIndex(self.sales, brute_force_rows=10)
+        index = ComparablesIndex(self.sales, brute_force_rows=10, rebuild_rows=5)
+        moved = self.sales.iloc[:100].to_dict('records')
+        for sale in moved:
+            index.discard(sale['id'])
+        for sale in moved:
+            index.add(sale['id'], sale['Neighborhood'], sale, sale['SalePrice'])
+        for sale in moved[:20]:
+            extra = dict(sale, id=sale['id'] + 'x')
+            index.add(extra['id'], extra['Neighborhood'], extra, extra['SalePrice'])
+            index.discard(extra['id'])
+        self.assertEqual(len(index), len(self.sales))
+        for sale in self.sales.sample(50, random_state=1).to_dict('records'):
+            self.assertEqual(self.nearest(index, sale, sale['Neighborhood']), self.nearest(full, sale, sale['Neighborhood']))
+        index.discard(moved[0]['id'])
+        ids = [c['id'] for c in index.query(moved[0], moved[0]['Neighborhood'], k=5)]
+        self.assertNotIn(moved[0]['id'], ids)
+
+
+class ComparablesBuildTests(TestCase):
+    """Submission changes reach the index: saved during a build, or made by another process"""
+
+    def submission(self, address):
+        return PropertySubmission.objects.create(
+            address=address, city='Ames', state='IA', zip_code='50010', neighborhood='NAmes',
+            property_type='single_family', bedrooms=3, bathrooms=2, living_area=1500, lot_area=9000,
+            year_built=1990, overall_quality=6, overall_condition=5, is_verified=True, sale_price=180000,
+        )
+
+    def test_changes_during_build(self):
+        kept, removed = self.submission('1 Kept St'), self.submission('2 Removed St')
+        built = comparables.build_index()
+        added = []
+
+        def build_index():
+            # the build has read the database; these writes land before it is published
+            added.append(self.submission('3 Added St'))
+            removed.delete()
+            return built
+
+        with mock.patch.object(comparables, '_index', None), mock.patch.object(comparables, '_index_version', None), \
+                mock.patch.object(comparables, 'build_index', build_index):
+            index = comparables.get_index()
+        self.assertIs(index, built)
+        self.assertIn(f'submission:{kept.pk}', index.locations)
+        self.assertIn(f'submission:{added[0].pk}', index.locations)
+        self.assertNotIn(f'submission:{removed.pk}', index.locations)
+        self.assertIsNone(comparables._pending)
+
+    def test_changes_from_other_processes(self):
+        with mock.patch.object(comparables, '_index', None), mock.patch.object(comparables, '_index_version', None):
+            first = comparables.get_index()
+            # this process's own writes update its index in place
+            kept = self.submission('1 Kept St')
+            self.assertIs(comparables.get_index(), first)
+            self.assertIn(f'submission:{kept.pk}', first.locations)
+            # another worker's write arrives here only as a moved DataVersion token
+            [other] = PropertySubmission.objects.bulk_create([PropertySubmission(
+                address='2 Other St', city='Ames', state='IA', zip_code='50010', neighborhood='NAmes',
+                property_type='single_family', bedrooms=3, bathrooms=2, living_area=1600, lot_area=9000,
+                year_built=1990, overall_quality=6, overall_condition=5, is_verified=True, sale_price=190000,
+            )])
+            DataVersion.bump('comparables')
+            rebuilt = comparables.get_index()
+            self.assertIsNot(rebuilt, first)
+            self.assertIn(f'submission:{other.pk}', rebuilt.locations)
+            self.assertIn(f'submission:{kept.pk}', rebuilt.locations)
+            self.assertIs(comparables.get_index(), rebuilt)
+
+
+class RecommendationIndexTests(SimpleTestCase):
+    """The bucketed search must return what a full scan of the candidates returns"""
+
+    def test_matches_linear_scan(self):
+        rng = np.random.default_rng(0)
+        rows = 20000
+        listed = rng.lognormal(12.2, 0.4, rows).round(2)
+        columns = {
+            'id': np.arange(rows),
+            'neighborhood': rng.choice(['NAmes', 'CollgCr', 'OldTown'], rows).astype(object),
+            'bedrooms': rng.integers(1, 6, rows),
+            'bathrooms': np.ones(rows),
+            'sqft': rng.integers(800, 3000, rows),
+            'listed_price': listed,
+            'predicted_price': listed,
+            'value_score': rng.normal(0, 10, rows),
+            'features': np.empty(rows, dtype=object),
+        }
+        index = RecommendationIndex(columns)
+        for budget, bedrooms, neighborhood in [(150000, 3, None), (250000, 2, 'OldTown'), (90000, 1, None), (1e7, 5, 'NAmes')]:
+            mask = (listed <= budget) & (columns['bedrooms'] >= bedrooms)
+            if neighborhood:
+                mask &= columns['neighborhood'] == neighborhood
+            candidates = np.flatnonzero(mask)
+            expected = candidates[np.argsort(-columns['value_score'][candidates], kind='stable')][:10]
+            self.assertEqual(index.search(budget, bedrooms, neighborhood, limit=10), list(expected))
+        self.assertEqual(index.search(100, 3), [])
+        self.assertEqual(index.search(1e7, 1, limit=0), [])
+
+
+class RecommendationEndpointTests(TestCase):
+    """A candidate change made by any process rebuilds the index, and limit is validated"""
+
+    def candidate(self, ref, price, score):
+        return CandidateProperty(
+            source_ref=ref, neighborhood='NAmes', bedrooms=3, bathrooms=2, sqft=1500,
+            listed_price=price, predicted_price=price, value_score=score,
+        )
+
+    def recommend(self, limit):
+        return Client().post('/dashboard/api/get-recommendations/', json.dumps({'budget': 300000, 'limit': limit}),
+                             content_type='application/json')
+
+    def test_shared_version_and_limit(self):
+        self.candidate('a', 200000, 5).save()
+        self.assertEqual([r['value_score'] for r in self.recommend(5).json()['recommendations']], [5])
+        # a bulk insert from another worker only bumps the shared version; no signal reaches this process
+        CandidateProperty.objects.bulk_create([self.candidate('b', 250000, 9), self.candidate('c', 100000, 1)])
+        self.assertEqual(len(self.recommend(5).json()['recommendations']), 1)
+        DataVersion.objects.filter(name='recommendations').update(version='other-process')
+        self.assertEqual([r['value_score'] for r in self.recommend(5).json()['recommendations']], [9, 5, 1])
+
+        self.assertEqual(len(self.recommend(0).json()['recommendations']), 1)
+        self.assertEqual(self.recommend(1000).json()['criteria']['limit'], 50)
+        self.assertEqual(self.recommend('many').status_code, 400)
+
+
+@override_settings(HOUSE_PRICE_PREDICTION_CACHE=None)
+class PredictionBatcherTests(SimpleTestCase):
+    """Coalesced predictions equal one-by-one ones, and a failed batch fails every caller in it"""
+
+    def rows(self):
+        frame = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv'), nrows=100)
+        rows = [{k: v for k, v in row.items() if not pd.isna(v)} for row in frame.to_dict('records')]
+        for row in rows[::7]:
+            # callers send different subsets of the fields
+            del row['GrLivArea'], row['Neighborhood']
+        return rows
+
+    def test_matches_unbatched(self):
+        rows = self.rows()
+        with override_settings(HOUSE_PRICE_BATCHING=False):
+            expected = [predict_one(row) for row in rows]
+        batcher = PredictionBatcher(max_batch_size=16, max_wait_ms=50)
+        futures = [batcher.submit(row) for row in rows]
+        self.assertEqual([future.result(10) for future in futures], expected)
+        self.assertEqual(batcher.stats.rows, len(rows))
+        self.assertLess(batcher.stats.batches, len(rows))
+
+    def test_failed_batch(self):
+        batcher = PredictionBatcher(max_batch_size=8, max_wait_ms=200)
+        error = RuntimeError('scoring failed')
+        with mock.patch('dashboard.ai_model.cached_predict_frame', side_effect=error):
+            futures = [batcher.submit(row) for row in self.rows()[:5]]
+            done, _ = wait(futures, timeout=10)
+        self.assertEqual(len(done), 5)
+        self.assertEqual(batcher.stats.batches, 1)
+        for future in futures:
+            self.assertIs(future.exception(), error)
+        # the batcher thread survives and keeps serving
+        self.assertEqual(batcher.predict(self.rows()[0], timeout=10).version, get_model().version)
+
+
+@override_settings(HOUSE_PRICE_STREAM_CHUNK_ROWS=500)
+class StreamingPredictionTests(SimpleTestCase):
+    """?format=ndjson|csv stream every row once, in order, across chunks; failures end the stream visibly"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(os.path.join(settings.DATASET_DIR, 'test.csv'), 'rb') as f:
+            cls.csv = f.read()
+        cls.expected = get_model().predict_frame(pd.read_csv(io.BytesIO(cls.csv)))
+
+    def stream(self, output_format):
+        response = Client().post(f'/dashboard/model-prediction/?format={output_format}',
+                                 {'file': SimpleUploadedFile('houses.csv', self.csv, content_type='text/csv')})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['X-Model-Version'], get_model().version)
+        return response
+
+    def assert_rows(self, rows):
+        self.assertEqual(rows['id'].tolist(), list(range(1, len(self.expected) + 1)))
+        np.testing.assert_allclose(rows['predicted_price'], self.expected, rtol=1e-6)
+
+    def test_ndjson(self):
+        response = self.stream('ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assert_rows(pd.DataFrame([json.loads(line) for line in lines]))
+
+    def test_csv_header_once(self):
+        response = self.stream('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('id,bedrooms,'), 1)
+        self.assert_rows(pd.read_csv(io.StringIO(body)))
+
+    def test_error_mid_stream(self):
+        predict_frame = HousePriceModel.predict_frame
+        calls = []
+
+        def fail_on_second_chunk(model, frame):
+            calls.append(len(frame))
+            if len(calls) == 2:
+                raise RuntimeError('scoring failed')
+            return predict_frame(model, frame)
+
+        with mock.patch.object(HousePriceModel, 'predict_frame', fail_on_second_chunk), \
+                self.assertLogs('dashboard.views', 'ERROR'):
+            lines = b''.join(self.stream('ndjson').streaming_content).decode().splitlines()
+            self.assertEqual(len(lines), 501)
+            self.assertEqual(json.loads(lines[-1]), {'success': False, 'error': 'scoring failed', 'row': 501})
+
+            calls.clear()
+            content = iter(self.stream('csv').streaming_content)
+            self.assertEqual(len(next(content).decode().splitlines()), 501)
+            with self.assertRaisesMessage(RuntimeError, 'scoring failed'):
+                next(content)
+
+        async def stream_async():
+            upload = SimpleUploadedFile('houses.csv', self.csv, content_type='text/csv')
+            response = await AsyncClient().post('/dashboard/async/model-prediction/?format=ndjson', {'file': upload})
+            return b''.join([part async for part in response.streaming_content]).decode().splitlines()
+
+        calls.clear()
+        with mock.patch.object(HousePriceModel, 'predict_frame', fail_on_second_chunk), \
+                self.assertLogs('dashboard.async_views', 'ERROR'):
+            self.assertEqual(asyncio.run(stream_async())[500:], [lines[-1]])
+
+
+class ParallelScorerTests(SimpleTestCase):
+    """Shards scored in worker processes come back merged in input order"""
+
+    def test_input_order_with_uneven_shards(self):
+        model = get_model()
+        frame = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv')).sample(frac=1, random_state=3)
+        # 1459 rows in shards of 400: the short last shard tends to finish first
+        scorer = ParallelScorer(model, workers=2, shard_rows=400)
+        self.addCleanup(scorer.shutdown)
+        np.testing.assert_array_equal(scorer.predict_frame(frame), model.predict_frame(frame))
+        np.testing.assert_array_equal(scorer.predict_frame(frame.iloc[:7]), model.predict_frame(frame.iloc[:7]))
+
+
+class PredictionCacheTests(SimpleTestCase):
+    """Cached predictions must equal fresh ones, and repeats must be served from the cache"""
+
+    def test_hits_match_fresh_predictions(self):
+        model = get_model()
+        cache = PredictionCache('predictions')
+        cache.cache.clear()
+        frame = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv')).iloc[:200]
+        expected = model.predict_frame(frame)
+        np.testing.assert_array_equal(cache.predict_frame(model, frame), expected)
+        # same properties again, reordered and with float-typed columns, plus one new row
+        again = pd.concat([frame.iloc[::-1].astype({'GrLivArea': float}), frame.iloc[:1].assign(GrLivArea=9999)])
+        np.testing.assert_array_equal(cache.predict_frame(model, again), model.predict_frame(again))
+        self.assertEqual(cache.stats()['hits'], 200)
+        self.assertEqual(cache.stats()['misses'], 201)
+
+    @override_settings(HOUSE_PRICE_PREDICTION_CACHE_MAX_ROWS=64)
+    def test_bulk_batches_bypass_the_cache(self):
+        model = get_model()
+        cache = get_prediction_cache()
+        frame = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv')).iloc[:200]
+        before = cache.stats()
+        np.testing.assert_array_equal(cached_predict_frame(model, frame), model.predict_frame(frame))
+        self.assertEqual(cache.stats(), before)
+        self.assertIsNone(get_prediction_cache(65))
+        cached_predict_frame(model, frame.iloc[:64])
+        stats = cache.stats()
+        self.assertEqual(stats['hits'] + stats['misses'], before['hits'] + before['misses'] + 64)
+
+
+class FeatureFrameTests(SimpleTestCase):
+    """build_feature_frame must reproduce get_property_features row for row"""
+
+    def test_matches_get_property_features(self):
+        rng = np.random.default_rng(0)
+        qualities = ['excellent', 'good', 'average', 'fair', 'poor', 'none', None]
+        types = ['single_family', 'townhouse', 'condo', 'multi_family', 'luxury', 'commercial', 'land', 'other']
+        submissions = [
+            PropertySubmission(
+                property_type=types[i % len(types)], neighborhood='NAmes',
+                bedrooms=int(rng.integers(0, 8)), bathrooms=float(rng.choice([0, 1, 1.5, 2, 2.5, 3.5])),
+                living_area=int(rng.integers(400, 5000)), lot_area=int(rng.choice([0, 1, 7200, 12345])),
+                year_built=int(rng.integers(1880, 2024)), year_remodeled=[None, 0, 2005][i % 3],
+                overall_quality=int(rng.integers(1, 11)), overall_condition=int(rng.integers(1, 11)),
+                garage_cars=int(rng.integers(0, 4)), garage_area=int(rng.integers(0, 900)),
+                basement_area=int(rng.choice([0, 850, 1333])), basement_quality=qualities[i % 7],
+                exterior_quality=qualities[(i + 1) % 7], kitchen_quality=qualities[(i + 2) % 7],
+                has_pool=bool(i % 2), pool_quality=qualities[(i + 3) % 7],
+                has_fireplace=bool(i % 3), fireplace_quality=qualities[(i + 4) % 7],
+            )
+            for i in range(300)
+        ]
+        frame = build_feature_frame(submissions_frame(submissions))
+        for submission, row in zip(submissions, frame.to_dict('records')):
+            expected = submission.get_property_features()
+            self.assertEqual(list(row), list(expected))
+            self.assertEqual(row, expected)
+        model = get_model()
+        expected_frame = pd.DataFrame.from_records([s.get_property_features() for s in submissions])
+        np.testing.assert_array_equal(model.predict_frame(frame), model.predict_frame(expected_frame))
+
+
+class MetricsTests(SimpleTestCase):
+    """/metrics reports stage timings and batch sizes, and records nothing when disabled"""
+
+    def test_prometheus_text(self):
+        model = get_model()
+        frame = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv')).iloc[:50]
+        metrics.registry.clear()
+        model.predict_frame(frame)
+        response = Client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('house_price_stage_seconds_count{stage="preprocess"} 1', body)
+        self.assertIn('house_price_stage_seconds_count{stage="booster"} 1', body)
+        self.assertIn('house_price_batch_rows_bucket{le="64"} 1', body)
+        self.assertIn('house_price_batch_rows_bucket{le="32"} 0', body)
+        self.assertIn('house_price_predicted_rows_total 50', body)
+
+    def test_disabled(self):
+        model = get_model()
+        frame = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv')).iloc[:5]
+        metrics.registry.clear()
+        with override_settings(HOUSE_PRICE_METRICS=False):
+            model.predict_frame(frame)
+            self.assertEqual(Client().get('/metrics').status_code, 404)
+        self.assertNotIn('\nhouse_price_predicted_rows_total ', metrics.render())
+
+
+class RequestLogTests(SimpleTestCase):
+    """One structured summary record per request; DEBUG detail only for sampled requests"""
+
+    def test_summary_record(self):
+        with self.assertLogs('dashboard.requests', 'INFO') as captured:
+            Client().post('/dashboard/model-prediction/')
+        [record] = captured.records
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry['view'], 'model_prediction')
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(entry['rows'], 1)
+        self.assertEqual(entry['model_version'], get_model().version)
+        self.assertGreater(entry['duration_ms'], 0)
+
+    @override_settings(HOUSE_PRICE_STREAM_CHUNK_ROWS=500)
+    def test_streamed_response(self):
+        with open(os.path.join(settings.DATASET_DIR, 'test.csv'), 'rb') as f:
+            data = f.read()
+
+        def post(path):
+            return Client().post(path, {'file': SimpleUploadedFile('houses.csv', data, content_type='text/csv')})
+
+        with self.assertLogs('dashboard.requests', 'INFO') as captured:
+            response = post('/dashboard/model-prediction/?format=csv')
+            # nothing is logged until the body has been sent
+            self.assertEqual(captured.records, [])
+            b''.join(response.streaming_content)
+        [record] = captured.records
+        self.assertEqual((record.status, record.rows, record.stream), (200, 1459, 'completed'))
+        self.assertEqual((record.streaming, record.model_version), ('csv', get_model().version))
+
+        predict_frame = HousePriceModel.predict_frame
+        calls = []
+
+        def fail_on_second_chunk(model, frame):
+            calls.append(len(frame))
+            if len(calls) == 2:
+                raise RuntimeError('scoring failed')
+            return predict_frame(model, frame)
+
+        async def stream_async():
+            upload = SimpleUploadedFile('houses.csv', data, content_type='text/csv')
+            response = await AsyncClient().post('/dashboard/async/model-prediction/?format=ndjson', {'file': upload})
+            return [part async for part in response.streaming_content]
+
+        with mock.patch.object(HousePriceModel, 'predict_frame', fail_on_second_chunk), \
+                self.assertLogs('dashboard.requests', 'INFO') as captured, self.assertLogs('dashboard', 'ERROR'):
+            asyncio.run(stream_async())
+        [record] = captured.records
+        self.assertEqual((record.rows, record.stream, record.error), (500, 'error', 'scoring failed'))
+
+    def test_debug_sampling(self):
+        sample = DebugSampleFilter(rate=0.0)
+        debug = logging.LogRecord('dashboard.views', logging.DEBUG, '', 0, 'detail %s', ('x',), None)
+        warning = logging.LogRecord('dashboard.views', logging.WARNING, '', 0, 'problem', (), None)
+        self.assertFalse(sample.filter(debug))
+        self.assertTrue(sample.filter(warning))
+        with self.assertLogs('dashboard.requests', 'INFO'):
+            with request_log('view', sample_rate=1.0):
+                self.assertTrue(sample.filter(debug))
+            with request_log('view', sample_rate=0.0):
+                self.assertFalse(sample.filter(debug))
+
+
+class AsyncViewTests(SimpleTestCase):
+    """Async endpoints answer like the sync ones and shed load with 429 once the executor is full"""
+
+    def upload(self):
+        data = pd.read_csv(os.path.join(settings.DATASET_DIR, 'test.csv')).iloc[:100].to_csv(index=False).encode()
+        return {'file': SimpleUploadedFile('upload.csv', data, content_type='text/csv')}
+
+    def test_matches_sync_view(self):
+        expected = Client().post('/dashboard/model-prediction/', self.upload()).json()
+        response = asyncio.run(AsyncClient().post('/dashboard/async/model-prediction/', self.upload()))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected)
+
+    def test_saturated_executor_returns_429(self):
+        executor = async_views.InferenceExecutor(workers=1, queue_depth=0)
+        release = threading.Event()
+        executor.submit(release.wait)
+        previous, async_views._executor = async_views._executor, executor
+        try:
+            with override_settings(HOUSE_PRICE_ASYNC_RETRY_AFTER=3):
+                response = asyncio.run(AsyncClient().post('/dashboard/async/model-prediction/', self.upload()))
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '3')
+            self.assertEqual(executor.rejected, 1)
+        finally:
+            release.set()
+            async_views._executor = previous
+            executor.shutdown()
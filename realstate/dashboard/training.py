@@ -0,0 +1,294 @@
+"""Training and hyperparameter search for the house price pipeline.
+
+Rebuilds the pipeline from dataset/model_train.ipynb (median imputer ->
+scaler for numeric columns, most-frequent imputer -> ordinal encoder for
+categorical ones, XGBRegressor) and replaces the notebook's GridSearchCV
+with successive halving:
+
+* boosting rounds are the budget: every candidate gets a few rounds, the
+  best 1/factor of them are continued from where they stopped, and so on
+  until the survivors reach max_rounds;
+* a validation fold carved out of the training split scores every round,
+  so n_estimators is never searched over and a candidate that stopped
+  improving for `patience` rounds gets no more rounds;
+* the preprocessing is fitted once, and trials run in a process pool on
+  the already encoded matrices with tree_method='hist'.
+
+The 80/20 holdout split is the notebook's (test_size=0.2, random_state=42)
+and is only used to score the final model and calibrate its prediction
+intervals (dashboard.intervals).
+"""
+import json
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import product
+
+import joblib
+import numpy as np
+import xgboost as xgb
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder, StandardScaler
+
+from . import datasets
+from .ai_model import ARTIFACT_FILENAME, HousePriceModel, model_dir
+from .intervals import DEFAULT_COVERAGE, INTERVALS_FILENAME, ConformalIntervals
+
+logger = logging.getLogger(__name__)
+
+TARGET = 'SalePrice'
+HOLDOUT_SIZE = 0.2
+SPLIT_SEED = 42
+MODEL_SEED = 12
+# the grid of dataset/model_train.ipynb; n_estimators becomes the max_rounds ceiling
+LEARNING_RATES = (0.06, 0.07, 0.08, 0.09)
+MAX_DEPTHS = (6, 7, 8)
+MAX_ROUNDS = 598
+METRICS_FILENAME = 'metrics.json'
+
+_worker_data = None
+
+
+def load_training_frame(path):
+    """(X, y) from a Kaggle-style CSV with a SalePrice column, in the dtypes pd.read_csv gives"""
+    frame = datasets.read(path, raw=True)
+    return frame.drop(columns=[TARGET]), frame[TARGET]
+
+
+def holdout_split(X, y):
+    """The notebook's train/holdout split; also what calibration and retraining score against"""
+    return train_test_split(X, y, test_size=HOLDOUT_SIZE, random_state=SPLIT_SEED)
+
+
+def build_preprocessor(X):
+    numeric_columns = X.select_dtypes(include=['int64', 'float64']).columns.tolist()
+    categorical_columns = X.select_dtypes(include=['object']).columns.tolist()
+    return ColumnTransformer(transformers=[
+        ('num', Pipeline([
+            ('imputer', SimpleImputer(strategy='median')),
+            ('scaler', StandardScaler()),
+        ]), numeric_columns),
+        ('cat', Pipeline([
+            ('imputer', SimpleImputer(strategy='most_frequent')),
+            ('encoder', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)),
+        ]), categorical_columns),
+    ])
+
+
+def build_pipeline(X, **params):
+    """Unfitted preprocessing + XGBRegressor pipeline for the columns of X"""
+    params = {'random_state': MODEL_SEED, 'tree_method': 'hist', **params}
+    return Pipeline([('preprocessor', build_preprocessor(X)), ('model', xgb.XGBRegressor(**params))])
+
+
+@dataclass
+class Trial:
+    params: dict
+    rounds: int = 0
+    # validation RMSE after every round trained so far
+    curve: list = field(default_factory=list)
+    booster: bytes = None
+    seconds: float = 0.0
+
+    @property
+    def best_round(self):
+        return int(np.argmin(self.curve)) + 1
+
+    @property
+    def score(self):
+        return min(self.curve) if self.curve else math.inf
+
+    def converged(self, patience):
+        return bool(self.curve) and len(self.curve) - self.best_round >= patience
+
+
+def search_space(learning_rates=LEARNING_RATES, max_depths=MAX_DEPTHS, **extra):
+    """Every combination of the given parameter lists, as xgboost parameter dicts"""
+    grid = {'learning_rate': learning_rates, 'max_depth': max_depths, **extra}
+    return [dict(zip(grid, values)) for values in product(*grid.values())]
+
+
+def rung_budgets(max_rounds, factor, candidates, min_rounds=None):
+    """Cumulative rounds per rung: max_rounds / factor**k down to the point where one candidate is left"""
+    rungs = max(1, math.ceil(math.log(max(candidates, 1), factor)))
+    budgets = [max(1, round(max_rounds / factor ** k)) for k in range(rungs, -1, -1)]
+    if min_rounds:
+        budgets = [b for b in budgets if b >= min_rounds] or [max_rounds]
+    return sorted(set(budgets))
+
+
+def _init_worker(train, validation, threads):
+    global _worker_data
+    _worker_data = (
+        xgb.QuantileDMatrix(train[0], label=train[1]),
+        xgb.DMatrix(validation[0], label=validation[1]),
+        threads,
+    )
+
+
+def _run_trial(params, booster, rounds, patience):
+    """Train `rounds` more rounds (continuing `booster` if given); returns (raw booster, curve, seconds)"""
+    dtrain, dvalidation, threads = _worker_data
+    started = time.perf_counter()
+    evals_result = {}
+    params = {'objective': 'reg:squarederror', 'eval_metric': 'rmse', 'tree_method': 'hist',
+              'seed': MODEL_SEED, 'nthread': threads, **params}
+    model = xgb.train(
+        params, dtrain, num_boost_round=rounds, evals=[(dvalidation, 'validation')],
+        early_stopping_rounds=patience, evals_result=evals_result, verbose_eval=False,
+        xgb_model=xgb.Booster(model_file=bytearray(booster)) if booster else None,
+    )
+    return bytes(model.save_raw('ubj')), evals_result['validation']['rmse'], time.perf_counter() - started
+
+
+class SuccessiveHalving:
+    """Successive halving over boosting rounds, trials spread over a process pool"""
+
+    def __init__(self, space, max_rounds=MAX_ROUNDS, factor=3, patience=50, workers=None, min_rounds=None):
+        self.trials = [Trial(params) for params in space]
+        self.max_rounds = max_rounds
+        self.factor = factor
+        self.patience = patience
+        self.workers = workers or os.cpu_count() or 1
+        # a rung shorter than the patience window could not stop anything early
+        self.budgets = rung_budgets(max_rounds, factor, len(self.trials), min_rounds or patience)
+        self.rungs = []
+
+    def run(self, train, validation):
+        """Search using train=(X, y) and validation=(X, y) as encoded arrays; returns the best Trial"""
+        workers = min(self.workers, len(self.trials))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        pool = None
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker, initargs=(train, validation, threads))
+        else:
+            _init_worker(train, validation, threads)
+        try:
+            alive = list(self.trials)
+            for rung, budget in enumerate(self.budgets):
+                started = time.perf_counter()
+                pending = [t for t in alive if t.rounds < budget and not t.converged(self.patience)]
+                calls = [(t.params, t.booster, budget - t.rounds, self.patience) for t in pending]
+                if pool and calls:
+                    results = pool.map(_run_trial, *zip(*calls))
+                else:
+                    results = [_run_trial(*call) for call in calls]
+                for trial, (booster, curve, seconds) in zip(pending, results):
+                    trial.booster = booster
+                    trial.curve.extend(curve)
+                    trial.rounds = budget
+                    trial.seconds += seconds
+                alive.sort(key=lambda t: t.score)
+                self.rungs.append({'rounds': budget, 'trials': len(alive), 'trained': len(pending),
+                                   'best_rmse': alive[0].score, 'seconds': time.perf_counter() - started})
+                logger.info("Rung %d: %d trials at %d rounds, best validation RMSE %.1f",
+                            rung, len(alive), budget, alive[0].score)
+                if rung < len(self.budgets) - 1:
+                    alive = alive[:max(1, len(alive) // self.factor)]
+        finally:
+            if pool:
+                pool.shutdown()
+        return alive[0]
+
+    def summary(self):
+        return {
+            'rungs': self.rungs,
+            'trials': [{'params': t.params, 'rounds': t.rounds, 'best_round': t.best_round,
+                        'validation_rmse': t.score, 'seconds': t.seconds}
+                       for t in sorted(self.trials, key=lambda t: t.score)],
+        }
+
+
+@dataclass
+class TrainingResult:
+    pipeline: Pipeline
+    features: list
+    params: dict
+    metrics: dict
+    intervals: ConformalIntervals | None = None
+
+    def artifact(self, version):
+        return {'pipeline': self.pipeline, 'features': self.features, 'version': version}
+
+
+def regression_metrics(y_true, y_pred):
+    return {
+        'r2': float(r2_score(y_true, y_pred)),
+        'rmse': float(math.sqrt(mean_squared_error(y_true, y_pred))),
+        'mae': float(mean_absolute_error(y_true, y_pred)),
+        'rmsle': float(math.sqrt(mean_squared_error(np.log1p(y_true), np.log1p(np.maximum(y_pred, 0))))),
+    }
+
+
+def neighborhoods(X):
+    return X['Neighborhood'].to_numpy(dtype=object) if 'Neighborhood' in X else None
+
+
+def train(X, y, space=None, validation_size=0.2, coverage=DEFAULT_COVERAGE, **search_options):
+    """Search hyperparameters on X/y minus the holdout, refit the winner, then score and calibrate it on the holdout"""
+    started = time.perf_counter()
+    X_train, X_holdout, y_train, y_holdout = holdout_split(X, y)
+    X_fit, X_validation, y_fit, y_validation = train_test_split(
+        X_train, y_train, test_size=validation_size, random_state=SPLIT_SEED)
+
+    preprocessor = build_preprocessor(X_fit).fit(X_fit)
+    search = SuccessiveHalving(space or search_space(), **search_options)
+    best = search.run((preprocessor.transform(X_fit), y_fit.to_numpy()),
+                      (preprocessor.transform(X_validation), y_validation.to_numpy()))
+    search_seconds = time.perf_counter() - started
+
+    # the validation fold only picked the round count; the final model sees the whole training split
+    params = {**best.params, 'n_estimators': best.best_round}
+    pipeline = build_pipeline(X_train, **params).fit(X_train, y_train)
+    predictions = pipeline.predict(X_holdout).astype(np.float64)
+    intervals = ConformalIntervals.calibrate(predictions, y_holdout.to_numpy(), neighborhoods(X_holdout), coverage=coverage)
+    metrics = {
+        'params': params,
+        'validation_rmse': best.score,
+        'holdout': regression_metrics(y_holdout.to_numpy(), predictions),
+        'interval': {'coverage': intervals.coverage, 'margin': intervals.metrics['margin']},
+        'rows': {'fit': len(X_fit), 'validation': len(X_validation), 'holdout': len(X_holdout)},
+        'search_seconds': search_seconds,
+        'total_seconds': time.perf_counter() - started,
+        'xgboost_version': xgb.__version__,
+        'search': {'factor': search.factor, 'patience': search.patience, 'workers': search.workers,
+                   **search.summary()},
+    }
+    return TrainingResult(pipeline, X.columns.tolist(), params, metrics, intervals)
+
+
+def publish(result, version):
+    """Write result as model.pkl + metrics.json (+ intervals.json) into a new version directory; returns the artifact path.
+
+    The artifact is smoke-tested from a temporary sibling directory, so no
+    worker can see the version before it is complete.
+    """
+    root = model_dir()
+    target = os.path.join(root, version)
+    if os.path.exists(target):
+        raise ValueError(f"Version {version} already exists")
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.train-', dir=root)
+    try:
+        joblib.dump(result.artifact(version), os.path.join(staging, ARTIFACT_FILENAME))
+        with open(os.path.join(staging, METRICS_FILENAME), 'w') as f:
+            json.dump({'version': version, **result.metrics}, f, indent=1)
+        if result.intervals is not None:
+            result.intervals.save(os.path.join(staging, INTERVALS_FILENAME))
+        HousePriceModel(os.path.join(staging, ARTIFACT_FILENAME), version=version).validate()
+        os.replace(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return os.path.join(target, ARTIFACT_FILENAME)
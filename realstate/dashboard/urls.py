@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'dashboard'
 urlpatterns = [
@@ -7,5 +7,16 @@ urlpatterns = [
     path('data-input-form/', views.Data_input_form, name='data_input_form'),
     path('api/market-insights/',views.get_market_insights, name='market_insights'),
     path('api/get-recommendations/',views.get_recommendations,name='recommendations'),
-    path('api/analyze-property/',views.analyze_property,name="analyze_property")
+    path('api/analyze-property/',views.analyze_property,name="analyze_property"),
+    path('api/prediction-jobs/', views.submit_prediction_job, name='prediction_job_submit'),
+    path('api/prediction-jobs/<uuid:job_id>/', views.prediction_job_status, name='prediction_job_status'),
+    path('api/prediction-jobs/<uuid:job_id>/download/', views.download_prediction_job, name='prediction_job_download'),
+    path('api/prediction-cache/', views.prediction_cache_stats, name='prediction_cache_stats'),
+    path('api/explain/', views.explain_prediction, name='explain_prediction'),
+    # async versions for ASGI servers; CPU work runs on a bounded executor, 429 when it is full
+    path('async/model-prediction/', async_views.model_prediction, name='async_model_prediction'),
+    path('async/api/market-insights/', async_views.get_market_insights, name='async_market_insights'),
+    path('async/api/get-recommendations/', async_views.get_recommendations, name='async_recommendations'),
+    path('async/api/analyze-property/', async_views.analyze_property, name='async_analyze_property'),
+    path('async/api/explain/', async_views.explain_prediction, name='async_explain_prediction'),
 ]
@@ -1,8 +1,20 @@
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
-from dashboard.ai_model import HousePriceModel
+from dashboard.ai_model import get_model, predict_one
+from dashboard.serializers import interval_payload, prediction_rows
+from dashboard.insights import get_market_snapshot, serving_model_metrics
+from dashboard.explanations import TooManyRows, check_rows, explain_frame, global_importance
+from dashboard.market_stats import market_summary
+from dashboard.comparables import get_index as get_comparables_index
+from dashboard.recommendations import MAX_RESULTS, recommend
+from dashboard.prediction_cache import get_prediction_cache
+from dashboard.jobs import submit_job
+from dashboard import metrics
+from dashboard.log import log_request
+from dashboard.models import PredictionJob
 import json
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, FileResponse
+from django.urls import reverse
 import logging
 from realstate.forms import HouseForm
 import pandas as pd
@@ -10,203 +22,247 @@ from datetime import datetime
 from django.db.models import Avg, Count, Q
 from django.core.cache import cache
 from django.conf import settings
-import os
 import numpy as np
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
-@csrf_exempt  
+
+STREAM_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+# Sample property scored when model_prediction is called without a file
+SAMPLE_PROPERTY = {
+    "Id":1,
+    "MSSubClass": 20,
+    "MSZoning": "RH",
+    "LotFrontage": 80,
+    "LotArea": 11622,
+    "Street": "Pave",
+    "Alley": "NA",
+    "LotShape": "Reg",
+    "LandContour": "Lvl",
+    "Utilities": "AllPub",
+    "LotConfig": "Inside",
+    "LandSlope": "Gtl",
+    "Neighborhood": "NAmes",
+    "Condition1": "Feedr",
+    "Condition2": "Norm",
+    "BldgType": "1Fam",
+    "HouseStyle": "1Story",
+    "OverallQual": 5,
+    "OverallCond": 6,
+    "YearBuilt": 1961,
+    "YearRemodAdd": 1961,
+    "RoofStyle": "Gable",
+    "RoofMatl": "CompShg",
+    "Exterior1st": "VinylSd",
+    "Exterior2nd": "VinylSd",
+    "MasVnrType": "None",
+    "MasVnrArea": 0,
+    "ExterQual": "TA",
+    "ExterCond": "TA",
+    "Foundation": "CBlock",
+    "BsmtQual": "TA",
+    "BsmtCond": "TA",
+    "BsmtExposure": "No",
+    "BsmtFinType1": "Rec",
+    "BsmtFinSF1": 468,
+    "BsmtFinType2": "LwQ",
+    "BsmtFinSF2": 144,
+    "BsmtUnfSF": 270,
+    "TotalBsmtSF": 882,
+    "Heating": "GasA",
+    "HeatingQC": "TA",
+    "CentralAir": "Y",
+    "Electrical": "SBrkr",
+    "1stFlrSF": 896,
+    "2ndFlrSF": 0,
+    "LowQualFinSF": 0,
+    "GrLivArea": 896,
+    "BsmtFullBath": 0,
+    "BsmtHalfBath": 0,
+    "FullBath": 1,
+    "HalfBath": 0,
+    "BedroomAbvGr": 2,
+    "KitchenAbvGr": 1,
+    "KitchenQual": "TA",
+    "TotRmsAbvGrd": 5,
+    "Functional": "Typ",
+    "Fireplaces": 0,
+    "FireplaceQu": "NA",
+    "GarageType": "Attchd",
+    "GarageYrBlt": 1961,
+    "GarageFinish": "Unf",
+    "GarageCars": 1,
+    "GarageArea": 730,
+    "GarageQual": "TA",
+    "GarageCond": "TA",
+    "PavedDrive": "Y",
+    "WoodDeckSF": 140,
+    "OpenPorchSF": 0,
+    "EnclosedPorch": 0,
+    "3SsnPorch": 0,
+    "ScreenPorch": 120,
+    "PoolArea": 0,
+    "PoolQC": "NA",
+    "Fence": "MnPrv",
+    "MiscFeature": "NA",
+    "MiscVal": 0,
+    "MoSold": 6,
+    "YrSold": 2010,
+    "SaleType": "WD",
+    "SaleCondition": "Normal"
+}
+
+
+def _stream_predictions(reader, model, output_format, summary=None):
+    """Predict one chunk at a time so memory stays flat and the first rows go out early.
+
+    `summary` (the request's log summary) gets the rows sent so far and any error.
+    """
+    summary = {} if summary is None else summary
+    summary['rows'] = 0
+    next_id = 1
+    for i, chunk in enumerate(reader):
+        try:
+            predictions = model.predict_frame(chunk)
+            results = prediction_rows(chunk, predictions, next_id, model.bounds(chunk, predictions))
+        except Exception as e:
+            # headers are already sent: NDJSON reports the failure in-band as a last line; CSV has
+            # no room for one, so the response is aborted rather than ending like a complete file
+            logger.error("Streaming prediction failed at row %d: %s", next_id, e, exc_info=True)
+            summary['error'] = str(e)
+            if output_format != 'ndjson':
+                raise
+            yield json.dumps({'success': False, 'error': str(e), 'row': next_id}) + '\n'
+            return
+        next_id += len(chunk)
+        with metrics.stage('serialize'):
+            if output_format == 'csv':
+                body = results.to_csv(index=False, header=(i == 0))
+            else:
+                body = results.to_json(orient='records', lines=True)
+        yield body
+        summary['rows'] = next_id - 1
+    logger.info("Streamed %d predictions", next_id - 1)
+
+
+def explain_param(request):
+    """Contributions per row requested with ?explain=N (0: no explanations)"""
+    return int(request.GET.get('explain') or request.POST.get('explain') or 0)
+
+
+def csv_prediction_payload(csv_file, explain=0):
+    """Read an uploaded CSV and return the JSON body with one prediction per row.
+
+    With `explain`, every row also lists its `explain` largest feature contributions.
+    """
+    with metrics.stage('parse'):
+        df = pd.read_csv(csv_file)
+    logger.debug("CSV loaded, shape %s, columns %s", df.shape, df.columns.tolist())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("First few rows:\n%s", df.head(3))
+
+    model = get_model()
+    explanation = None
+    if explain:
+        # one transform feeds both the prediction and the contributions
+        explanation = explain_frame(model, df)
+        predictions = explanation.predictions
+    else:
+        # a bulk upload skips the prediction cache: per-row lookups cost more than scoring it
+        predictions = model.predict_frame(df)
+    bounds = model.bounds(df, predictions)
+
+    # Process results column-wise instead of walking row dicts
+    with metrics.stage('serialize'):
+        results = prediction_rows(df, predictions, bounds=bounds).to_dict('records')
+        if explanation is not None:
+            for row, contributions in zip(results, explanation.top(explain)):
+                row['contributions'] = contributions
+
+    if results and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Sample result: %s", results[0])
+        logger.debug("Price stats - Min: $%.2f, Max: $%.2f, Avg: $%.2f",
+                     predictions.min(), predictions.max(), predictions.mean())
+
+    payload = {
+        'success': True,
+        'predictions': results,
+        'count': len(results),
+        'model_version': model.version
+    }
+    if explanation is not None:
+        payload['explanation'] = {'method': explanation.method, 'base_value': explanation.base_value}
+    return payload
+
+
+@csrf_exempt
+@metrics.instrument_view
+@log_request
 def model_prediction(request):
-    # Log request start
-    logger.info("=" * 60)
-    logger.info("model_prediction API called")
-    logger.info(f"Request method: {request.method}")
-    logger.info(f"Content-Type: {request.content_type}")
-    logger.info(f"Path: {request.path}")
+    # Step-by-step detail is DEBUG with %-style arguments, so it costs nothing unless
+    # enabled (and sampled in json mode); log_request writes the one-line summary
+    logger.debug("model_prediction %s %s (%s)", request.method, request.path, request.content_type)
     
     if request.method == 'POST':
         try:
-            logger.info("Processing POST request...")
-            
             # Check if file is uploaded
             if 'file' in request.FILES:
                 csv_file = request.FILES['file']
-                logger.info(f"CSV file received: {csv_file.name}")
-                logger.info(f"File size: {csv_file.size} bytes")
-                logger.info(f"Content type: {csv_file.content_type}")
+                logger.debug("CSV file received: %s, %d bytes, %s", csv_file.name, csv_file.size, csv_file.content_type)
                 
                 try:
-                    import pandas as pd
-                    logger.info("Reading CSV file with pandas...")
-                    df = pd.read_csv(csv_file)
-                    
-                    logger.info(f"CSV loaded successfully. Shape: {df.shape}")
-                    logger.info(f"Columns: {list(df.columns)}")
-                    logger.info(f"First few rows:\n{df.head(3)}")
-                    
-                    data = df.to_dict('records')
-                    logger.info(f"Converted to {len(data)} records")
-                    
-                    logger.info("Initializing HousePriceModel...")
-                    model = HousePriceModel()
-                    logger.info("Model initialized successfully")
-                    
-                    logger.info("Starting predictions...")
-                    predictions = model.predict(data)
-                    logger.info(f"Predictions generated: {len(predictions)}")
-                    logger.info(f"Sample prediction: {predictions[0] if predictions else 'No predictions'}")
-                    
-                    # Process results
-                    logger.info("Processing results...")
-                    results = []
-                    for i, (record, pred) in enumerate(zip(data, predictions)):
-                        results.append({
-                            'id': i + 1,
-                            'bedrooms': record.get('BedroomAbvGr', 0),
-                            'bathrooms': record.get('FullBath', 0),
-                            'sqft_living': record.get('GrLivArea', 0),
-                            'neighborhood': record.get('Neighborhood', 'Unknown'),
-                            'year_built': record.get('YearBuilt', 0),
-                            'predicted_price': pred
-                        })
-                    
-                    logger.info(f"Processed {len(results)} results")
-                    logger.info(f"Sample result: {results[0] if results else 'No results'}")
-                    
-                    # Log summary statistics
-                    if results:
-                        prices = [r['predicted_price'] for r in results]
-                        logger.info(f"Price stats - Min: ${min(prices):,.2f}, Max: ${max(prices):,.2f}, Avg: ${sum(prices)/len(prices):,.2f}")
-                    
-                    response_data = {
-                        'success': True,
-                        'predictions': results,
-                        'count': len(results)
-                    }
-                    
-                    logger.info(f"Returning successful response with {len(results)} predictions")
-                    logger.info("-" * 40)
+                    output_format = request.GET.get('format') or request.POST.get('format')
+                    if output_format in STREAM_CONTENT_TYPES:
+                        model = get_model()
+                        chunk_rows = getattr(settings, 'HOUSE_PRICE_STREAM_CHUNK_ROWS', 10000)
+                        logger.debug("Streaming %s predictions in chunks of %d rows", output_format, chunk_rows)
+                        # open the reader up front so unreadable uploads still get a JSON error
+                        reader = pd.read_csv(csv_file, chunksize=chunk_rows)
+                        request.log_summary.update(model_version=model.version, streaming=output_format)
+                        # the summary record is written once the last row has gone out
+                        response = StreamingHttpResponse(
+                            request.log_summary.stream(
+                                _stream_predictions(reader, model, output_format, request.log_summary)
+                            ),
+                            content_type=STREAM_CONTENT_TYPES[output_format]
+                        )
+                        response['X-Model-Version'] = model.version
+                        return response
                     
+                    response_data = csv_prediction_payload(csv_file, explain_param(request))
+                    request.log_summary.update(rows=response_data['count'], model_version=response_data['model_version'])
                     return JsonResponse(response_data)
                     
                 except Exception as file_error:
-                    logger.error(f"Error processing CSV file: {str(file_error)}")
-                    logger.error(f"File processing error details:", exc_info=True)
+                    logger.error("Error processing CSV file: %s", file_error)
                     raise file_error
             
             # No file uploaded - return test prediction
-            logger.info("No file uploaded, returning test prediction...")
+            logger.debug("No file uploaded, returning test prediction")
             
-            model = HousePriceModel()
-            logger.info("Model initialized for test prediction")
-            
-            test_data = {
-                "Id":1,
-                "MSSubClass": 20,
-                "MSZoning": "RH",
-                "LotFrontage": 80,
-                "LotArea": 11622,
-                "Street": "Pave",
-                "Alley": "NA",
-                "LotShape": "Reg",
-                "LandContour": "Lvl",
-                "Utilities": "AllPub",
-                "LotConfig": "Inside",
-                "LandSlope": "Gtl",
-                "Neighborhood": "NAmes",
-                "Condition1": "Feedr",
-                "Condition2": "Norm",
-                "BldgType": "1Fam",
-                "HouseStyle": "1Story",
-                "OverallQual": 5,
-                "OverallCond": 6,
-                "YearBuilt": 1961,
-                "YearRemodAdd": 1961,
-                "RoofStyle": "Gable",
-                "RoofMatl": "CompShg",
-                "Exterior1st": "VinylSd",
-                "Exterior2nd": "VinylSd",
-                "MasVnrType": "None",
-                "MasVnrArea": 0,
-                "ExterQual": "TA",
-                "ExterCond": "TA",
-                "Foundation": "CBlock",
-                "BsmtQual": "TA",
-                "BsmtCond": "TA",
-                "BsmtExposure": "No",
-                "BsmtFinType1": "Rec",
-                "BsmtFinSF1": 468,
-                "BsmtFinType2": "LwQ",
-                "BsmtFinSF2": 144,
-                "BsmtUnfSF": 270,
-                "TotalBsmtSF": 882,
-                "Heating": "GasA",
-                "HeatingQC": "TA",
-                "CentralAir": "Y",
-                "Electrical": "SBrkr",
-                "1stFlrSF": 896,
-                "2ndFlrSF": 0,
-                "LowQualFinSF": 0,
-                "GrLivArea": 896,
-                "BsmtFullBath": 0,
-                "BsmtHalfBath": 0,
-                "FullBath": 1,
-                "HalfBath": 0,
-                "BedroomAbvGr": 2,
-                "KitchenAbvGr": 1,
-                "KitchenQual": "TA",
-                "TotRmsAbvGrd": 5,
-                "Functional": "Typ",
-                "Fireplaces": 0,
-                "FireplaceQu": "NA",
-                "GarageType": "Attchd",
-                "GarageYrBlt": 1961,
-                "GarageFinish": "Unf",
-                "GarageCars": 1,
-                "GarageArea": 730,
-                "GarageQual": "TA",
-                "GarageCond": "TA",
-                "PavedDrive": "Y",
-                "WoodDeckSF": 140,
-                "OpenPorchSF": 0,
-                "EnclosedPorch": 0,
-                "3SsnPorch": 0,
-                "ScreenPorch": 120,
-                "PoolArea": 0,
-                "PoolQC": "NA",
-                "Fence": "MnPrv",
-                "MiscFeature": "NA",
-                "MiscVal": 0,
-                "MoSold": 6,
-                "YrSold": 2010,
-                "SaleType": "WD",
-                "SaleCondition": "Normal"
-            }
-            
-            logger.info("Generating test prediction...")
-            logger.info(f"Test data keys: {list(test_data.keys())}")
-            
-            prediction = model.predict(test_data)
-            logger.info(f"Test prediction generated: {prediction[0] if prediction else 'No prediction'}")
+            prediction = predict_one(SAMPLE_PROPERTY)
+            request.log_summary.update(rows=1, model_version=prediction.version)
             
             response_data = {
                 'success': True,
-                'prediction': prediction[0] if prediction else 0,
-                'test_mode': True
+                'prediction': prediction.price,
+                'interval': interval_payload(prediction),
+                'test_mode': True,
+                'model_version': prediction.version
             }
             
-            logger.info(f"Returning test response: {response_data}")
-            logger.info("-" * 40)
-            
+            logger.debug("Returning test response: %s", response_data)
             return JsonResponse(response_data)
             
+        except TooManyRows as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=413)
         except Exception as e:
-            logger.error("=" * 60)
-            logger.error("EXCEPTION in model_prediction:")
-            logger.error(f"Error type: {type(e).__name__}")
-            logger.error(f"Error message: {str(e)}")
-            logger.error("Full traceback:", exc_info=True)
-            logger.error("=" * 60)
+            logger.error("model_prediction failed: %s: %s", type(e).__name__, e, exc_info=True)
             
             import traceback
             error_response = {
@@ -219,14 +275,120 @@ def model_prediction(request):
             return JsonResponse(error_response, status=500)
     
     # Handle non-POST requests
-    logger.warning(f"Invalid request method: {request.method}")
-    logger.warning("Only POST requests are allowed")
+    logger.warning("Invalid request method: %s (only POST is allowed)", request.method)
     
     return JsonResponse({
         'success': False,
         'error': 'Only POST requests are allowed',
         'received_method': request.method
     }, status=405)
+
+
+@csrf_exempt
+@metrics.instrument_view
+def submit_prediction_job(request):
+    """Queue a large CSV for background prediction and return its job id straight away"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Only POST requests are allowed'}, status=405)
+    if 'file' not in request.FILES:
+        return JsonResponse({'success': False, 'error': 'No file uploaded'}, status=400)
+    try:
+        job = submit_job(request.FILES['file'], user=request.user)
+        logger.info(f"Queued prediction job {job.id} for {job.original_filename}")
+        return JsonResponse({
+            'success': True,
+            'job_id': str(job.id),
+            'status': job.status,
+            'status_url': reverse('dashboard:prediction_job_status', args=[job.id]),
+            'download_url': reverse('dashboard:prediction_job_download', args=[job.id])
+        }, status=202)
+    except Exception as e:
+        logger.error(f"Could not queue prediction job: {e}", exc_info=True)
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def prediction_job_status(request, job_id):
+    """Rows done, throughput and ETA for a bulk prediction job"""
+    try:
+        job = PredictionJob.objects.get(pk=job_id)
+    except PredictionJob.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Job not found'}, status=404)
+    return JsonResponse({'success': True, 'job': job.progress()})
+
+
+def download_prediction_job(request, job_id):
+    """Serve the finished predictions CSV"""
+    try:
+        job = PredictionJob.objects.get(pk=job_id)
+    except PredictionJob.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Job not found'}, status=404)
+    if job.status != 'completed':
+        return JsonResponse({'success': False, 'error': f'Job is {job.status}', 'job': job.progress()}, status=409)
+    response = FileResponse(job.output_file.open('rb'), as_attachment=True,
+                            filename=f'predictions-{job.id}.csv', content_type='text/csv')
+    response['X-Model-Version'] = ', '.join(filter(None, [job.model_version, job.resumed_model_version]))
+    return response
+
+
+def prediction_cache_stats(request):
+    """Hit/miss/eviction counters of the prediction cache in this process"""
+    cache = get_prediction_cache()
+    return JsonResponse({'success': True, 'enabled': cache is not None, 'stats': cache.stats() if cache else None})
+
+
+@csrf_exempt
+@metrics.instrument_view
+def explain_prediction(request):
+    """Feature contributions: GET for the serving version's global importance, POST for given properties"""
+    try:
+        if request.method == 'GET':
+            return JsonResponse({'success': True, 'importance': global_importance(get_model())})
+        if request.method != 'POST':
+            return JsonResponse({'success': False, 'error': 'Only GET and POST requests are allowed'}, status=405)
+        with metrics.stage('parse'):
+            data = json.loads(request.body)
+        return JsonResponse(explain_payload(data))
+    except TooManyRows as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=413)
+    except (ValueError, TypeError, KeyError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error("explain_prediction failed: %s", e, exc_info=True)
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+def explain_payload(data):
+    """Response body of explain_prediction for {'property': {...}} or {'properties': [...]}.
+
+    Optional 'top' limits the contributions listed per property; 'method'
+    ('tree_shap' or 'saabas') overrides the choice by batch size.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    properties = data['properties'] if 'properties' in data else [data['property']]
+    if not properties or not all(isinstance(row, dict) for row in properties):
+        raise ValueError("Expected a non-empty list of property objects")
+    check_rows(len(properties))
+    top = data.get('top')
+    with metrics.stage('features'):
+        frame = pd.DataFrame.from_records(properties)
+    explanation = explain_frame(get_model(), frame, method=data.get('method'))
+    with metrics.stage('serialize'):
+        rows = explanation.rows(int(top) if top else None)
+    return {
+        'success': True,
+        'model_version': explanation.model_version,
+        'method': explanation.method,
+        'base_value': explanation.base_value,
+        'explanations': rows,
+    }
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for this process's inference metrics"""
+    if not metrics.enabled():
+        return HttpResponse('metrics are disabled\n', status=404, content_type=metrics.CONTENT_TYPE)
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
     
     
 def Data_input_form(request):
@@ -280,194 +442,61 @@ def Data_input_form(request):
 
 
 @csrf_exempt
+@metrics.instrument_view
 def get_market_insights(request):
     """API endpoint for real market insights data based on predictions"""
     try:
-        # Initialize your model
-        model = HousePriceModel()
-        
-        # Load your training data or recent predictions to generate real insights
-        # You need to have access to your dataset
-        try:
-            # Method 1: Load from your training dataset
-            data_path = os.path.join(settings.BASE_DIR, 'dashboard', 'data', 'train.csv')
-            if os.path.exists(data_path):
-                df = pd.read_csv(data_path)
-                
-                # Calculate real insights from data
-                avg_price = df['SalePrice'].mean() if 'SalePrice' in df.columns else 250000
-                min_price = df['SalePrice'].min() if 'SalePrice' in df.columns else 100000
-                max_price = df['SalePrice'].max() if 'SalePrice' in df.columns else 500000
-                
-                # Calculate price trend (simulate based on time)
-                if 'YrSold' in df.columns and 'MoSold' in df.columns:
-                    # Group by month/year to get trends
-                    df['SaleDate'] = pd.to_datetime(df['YrSold'].astype(str) + '-' + df['MoSold'].astype(str) + '-01')
-                    monthly_prices = df.groupby(df['SaleDate'].dt.month)['SalePrice'].mean()
-                    
-                    # Calculate year-over-year change
-                    if len(monthly_prices) > 1:
-                        price_trend = ((monthly_prices.iloc[-1] - monthly_prices.iloc[0]) / monthly_prices.iloc[0]) * 100
-                        avg_price_trend = f"+{price_trend:.1f}%" if price_trend > 0 else f"{price_trend:.1f}%"
-                    else:
-                        avg_price_trend = "+5.2%"  # Fallback
-                else:
-                    avg_price_trend = "+5.2%"
-                
-                # Calculate top neighborhoods
-                if 'Neighborhood' in df.columns and 'SalePrice' in df.columns:
-                    neighborhood_stats = df.groupby('Neighborhood')['SalePrice'].agg(['mean', 'count']).reset_index()
-                    top_neighborhoods = neighborhood_stats.nlargest(3, 'mean')
-                    top_neighborhoods_list = []
-                    for _, row in top_neighborhoods.iterrows():
-                        top_neighborhoods_list.append({
-                            'name': row['Neighborhood'],
-                            'avg_price': int(row['mean']),
-                            'count': int(row['count'])
-                        })
-                else:
-                    top_neighborhoods_list = [
-                        {'name': 'NoRidge', 'avg_price': 750000, 'count': 45},
-                        {'name': 'StoneBr', 'avg_price': 680000, 'count': 32},
-                        {'name': 'NridgHt', 'avg_price': 680000, 'count': 28}
-                    ]
-                
-                # Calculate feature impact (simplified correlation analysis)
-                feature_impact_list = []
-                if 'OverallQual' in df.columns and 'SalePrice' in df.columns:
-                    corr_qual = df['OverallQual'].corr(df['SalePrice'])
-                    feature_impact_list.append({'feature': 'OverallQual', 'impact': abs(round(corr_qual, 2))})
-                
-                if 'GrLivArea' in df.columns and 'SalePrice' in df.columns:
-                    corr_area = df['GrLivArea'].corr(df['SalePrice'])
-                    feature_impact_list.append({'feature': 'GrLivArea', 'impact': abs(round(corr_area, 2))})
-                
-                if 'GarageCars' in df.columns and 'SalePrice' in df.columns:
-                    corr_garage = df['GarageCars'].corr(df['SalePrice'])
-                    feature_impact_list.append({'feature': 'GarageCars', 'impact': abs(round(corr_garage, 2))})
-                
-                if not feature_impact_list:
-                    feature_impact_list = [
-                        {'feature': 'OverallQual', 'impact': 0.85},
-                        {'feature': 'GrLivArea', 'impact': 0.76},
-                        {'feature': 'GarageCars', 'impact': 0.68}
-                    ]
-                
-                # Calculate seasonal trends from actual data
-                if 'MoSold' in df.columns and 'SalePrice' in df.columns:
-                    monthly_avg = df.groupby('MoSold')['SalePrice'].mean()
-                    seasonal_trends_list = []
-                    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-                    
-                    for month_num in range(1, 13):
-                        if month_num in monthly_avg.index:
-                            avg_price_month = int(monthly_avg[month_num])
-                        else:
-                            # Generate realistic seasonal pattern
-                            base_price = 280000
-                            seasonal_factor = 1 + 0.15 * np.sin((month_num - 6) * np.pi / 6)
-                            avg_price_month = int(base_price * seasonal_factor)
-                        
-                        seasonal_trends_list.append({
-                            'month': months[month_num - 1],
-                            'avg_price': avg_price_month
-                        })
-                else:
-                    seasonal_trends_list = [
-                        {'month': 'Jan', 'avg_price': 280000},
-                        {'month': 'Feb', 'avg_price': 285000},
-                        {'month': 'Mar', 'avg_price': 295000},
-                        {'month': 'Apr', 'avg_price': 305000},
-                        {'month': 'May', 'avg_price': 315000},
-                        {'month': 'Jun', 'avg_price': 325000},
-                        {'month': 'Jul', 'avg_price': 320000},
-                        {'month': 'Aug', 'avg_price': 310000},
-                        {'month': 'Sep', 'avg_price': 300000},
-                        {'month': 'Oct', 'avg_price': 290000},
-                        {'month': 'Nov', 'avg_price': 285000},
-                        {'month': 'Dec', 'avg_price': 280000}
-                    ]
-                
-                # Calculate property distribution
-                if 'BldgType' in df.columns:
-                    property_counts = df['BldgType'].value_counts(normalize=True) * 100
-                    property_distribution_list = []
-                    
-                    # Map building types to categories
-                    type_mapping = {
-                        '1Fam': 'Single Family',
-                        '2fmCon': 'Duplex',
-                        'Duplex': 'Multi-Family',
-                        'TwnhsE': 'Townhouse',
-                        'Twnhs': 'Townhouse'
-                    }
-                    
-                    for bldg_type, percentage in property_counts.items():
-                        category = type_mapping.get(bldg_type, bldg_type)
-                        property_distribution_list.append({
-                            'type': category,
-                            'percentage': round(percentage, 1)
-                        })
-                    
-                    # Limit to top 5 categories
-                    property_distribution_list = sorted(property_distribution_list, key=lambda x: x['percentage'], reverse=True)[:5]
-                else:
-                    property_distribution_list = [
-                        {'type': 'Single Family', 'percentage': 45},
-                        {'type': 'Townhouse', 'percentage': 25},
-                        {'type': 'Condo', 'percentage': 15},
-                        {'type': 'Multi-Family', 'percentage': 10},
-                        {'type': 'Luxury', 'percentage': 5}
-                    ]
-                
-                # Get model metrics from actual model evaluation
-                # You should store these metrics when training your model
-                model_metrics = {
-                    'accuracy': 91.5,  # Replace with actual R² score or accuracy
-                    'error_margin': 3.2,  # Replace with actual RMSE/MAE
-                    'r2_score': 0.89,
-                    'rmse': 25000,  # Root Mean Squared Error in dollars
-                    'mae': 18000    # Mean Absolute Error in dollars
-                }
-                
-                insights = {
-                    'avg_price_trend': avg_price_trend,
-                    'days_on_market': 42,  # This would come from actual data if available
-                    'avg_price': int(avg_price),
-                    'min_price': int(min_price),
-                    'max_price': int(max_price),
-                    'total_properties': len(df),
-                    'top_neighborhoods': top_neighborhoods_list,
-                    'feature_impact': feature_impact_list,
-                    'model_metrics': model_metrics,
-                    'seasonal_trends': seasonal_trends_list,
-                    'property_distribution': property_distribution_list,
-                    'data_source': 'real_data',
-                    'last_updated': datetime.now().isoformat()
-                }
-                
-            else:
-                # If no data file exists, generate realistic insights
-                insights = generate_realistic_insights()
-                
-        except Exception as data_error:
-            print(f"Error processing real data: {data_error}")
-            # Fallback to realistic generated insights
-            insights = generate_realistic_insights()
-        
-        return JsonResponse({
-            'success': True,
-            'insights': insights,
-            'timestamp': datetime.now().isoformat()
-        })
+        return JsonResponse(market_insights_payload())
         
     except Exception as e:
-        print(f"Error in get_market_insights: {e}")
+        logger.exception("get_market_insights failed")
         return JsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
 
+def market_insights_payload():
+    """Response body of get_market_insights (shared with the async view)"""
+    # Snapshot is computed once per version of the source data and served from cache
+    try:
+        insights = get_market_snapshot()
+        if insights is None:
+            # If no data file exists, generate realistic insights
+            insights = generate_realistic_insights()
+    except Exception:
+        logger.exception("Could not build the market insights snapshot, falling back to generated insights")
+        # Fallback to realistic generated insights
+        insights = generate_realistic_insights()
+
+    # Live figures over user submissions, maintained incrementally on every write
+    try:
+        live_market = market_summary()
+    except Exception as stats_error:
+        logger.error(f"Error reading live market stats: {stats_error}")
+        live_market = None
+
+    # measured on the serving version's holdout, replacing the snapshot's placeholder figures
+    try:
+        model = get_model()
+        insights = {
+            **insights,
+            'model_metrics': serving_model_metrics(model),
+            # share of the mean |TreeSHAP| contribution, in place of correlations with SalePrice
+            'feature_impact': [
+                {'feature': entry['feature'], 'impact': round(entry['share'], 3)}
+                for entry in global_importance(model)['features'][:3]
+            ],
+        }
+    except Exception as model_error:
+        logger.error("Error reading model metrics: %s", model_error)
+
+    return {
+        'success': True,
+        'insights': insights,
+        'live_market': live_market,
+        'timestamp': datetime.now().isoformat()
+    }
+
 def generate_realistic_insights():
     """Generate realistic insights based on typical housing market patterns"""
     import numpy as np
@@ -577,44 +606,15 @@ def generate_realistic_insights():
     }
         
 @csrf_exempt
+@metrics.instrument_view
 def get_recommendations(request):
     """Get property recommendations based on current market"""
     try:
         data = json.loads(request.body)
-        
-        # Get user preferences or use defaults
-        budget = data.get('budget', 500000)
-        bedrooms = data.get('bedrooms', 3)
-        
-        # Generate recommendations using your model
-        model = HousePriceModel()
-        
-        # Create sample properties based on user criteria
-        recommendations = []
-        
-      
-        # For now, return sample data
-        for i in range(5):
-            recommendations.append({
-                'id': i + 1,
-                'neighborhood': f'Neighborhood {i+1}',
-                'predicted_price': budget * (0.8 + i * 0.1),
-                'bedrooms': bedrooms,
-                'bathrooms': bedrooms - 1,
-                'sqft': 1500 + i * 200,
-                'value_score': 85 + i * 3,
-                'features': ['Good Schools', 'Near Park', 'Modern Kitchen'][:i+1]
-            })
-        
-        return JsonResponse({
-            'success': True,
-            'recommendations': recommendations,
-            'criteria': {
-                'budget': budget,
-                'bedrooms': bedrooms
-            }
-        })
-        
+        return JsonResponse(recommendations_payload(data))
+
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -622,43 +622,93 @@ def get_recommendations(request):
         }, status=500)
         
 
+def recommendations_payload(data):
+    """Response body of get_recommendations for the parsed request JSON"""
+    # Get user preferences or use defaults
+    budget = float(data.get('budget', 500000))
+    bedrooms = int(data.get('bedrooms', 3))
+    neighborhood = data.get('neighborhood') or None
+    try:
+        limit = int(data.get('limit', 5))
+    except (TypeError, ValueError):
+        raise ValueError(f"limit must be an integer from 1 to {MAX_RESULTS}")
+    limit = min(max(limit, 1), MAX_RESULTS)
+
+    # Best value (predicted vs listed price) among pre-scored candidates within budget
+    recommendations = recommend(budget, bedrooms, neighborhood, limit)
+
+    return {
+        'success': True,
+        'recommendations': recommendations,
+        'criteria': {
+            'budget': budget,
+            'bedrooms': bedrooms,
+            'neighborhood': neighborhood,
+            'limit': limit
+        }
+    }
+
+
 @csrf_exempt
+@metrics.instrument_view
 def analyze_property(request):
     """ analyze a specfic property's market position"""
     try:
-        data = json.loads(request.body)
-        property_data = {
-            'GrLivArea': data.get('sqft_living', 2000),
-            'BedroomAbvGr': data.get('bedrooms', 3),
-            'FullBath': data.get('bathrooms', 2),
-            'OverallQual': data.get('quality', 7),
-            'Neighborhood': data.get('neighborhood', 'NAmes')
-        }
-        model = HousePriceModel()
-        predicted_price = model.predict(property_data)
-        
-        # generated market analysis
-        analysis = {
-            'predicted': predicted_price[0] if predicted_price else 0,
-            'markket_position': 'Above Average' if predicted_price > 350000 else 'Average',
-            'comparable':[
-                {'price':predicted_price *0.35, 'sqft': property_data['GrLivArea'] *0.9},
-                {'price':predicted_price *1.05, 'sqft': property_data['GrLivArea'] *1.1}
-            ],
-            'recommendations': [
-                'Consider kitchen upgrades for higher ROI',
-                'Energy-efficient windows improve value',
-                'Updated bathrooms yield 80% ROI'
-            ]
-        }
-        return JsonResponse({
-            'success':True,
-            'analysis':analysis,
-            'property_data':property_data
-        })
+        with metrics.stage('parse'):
+            data = json.loads(request.body)
+        property_data = analysis_input(data)
+        prediction = predict_one(property_data)
+        return JsonResponse(analysis_payload(data, property_data, prediction))
         
     except Exception as e:
         return JsonResponse({
             'success': False,
             'error': str(e)
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+
+def analysis_input(data):
+    """Model input row of analyze_property for the parsed request JSON"""
+    return {
+        'GrLivArea': data.get('sqft_living', 2000),
+        'BedroomAbvGr': data.get('bedrooms', 3),
+        'FullBath': data.get('bathrooms', 2),
+        'OverallQual': data.get('quality', 7),
+        'Neighborhood': data.get('neighborhood', 'NAmes')
+    }
+
+
+def analysis_payload(data, property_data, prediction):
+    """Response body of analyze_property once the Prediction is known"""
+    predicted_price = prediction.price
+    # Nearest recorded sales in the same neighborhood
+    comparables = get_comparables_index().query(
+        {
+            'GrLivArea': property_data['GrLivArea'],
+            'OverallQual': property_data['OverallQual'],
+            'YearBuilt': data.get('year_built'),
+            'LotArea': data.get('lot_area'),
+            'GarageCars': data.get('garage_cars'),
+        },
+        neighborhood=property_data['Neighborhood'],
+        k=int(data.get('comparables', settings.HOUSE_PRICE_COMPARABLES_K))
+    )
+
+    # generated market analysis
+    analysis = {
+        'predicted': predicted_price,
+        'interval': interval_payload(prediction),
+        'markket_position': 'Above Average' if predicted_price > 350000 else 'Average',
+        'comparable': comparables,
+        'recommendations': [
+            'Consider kitchen upgrades for higher ROI',
+            'Energy-efficient windows improve value',
+            'Updated bathrooms yield 80% ROI'
+        ]
+    }
+    return {
+        'success':True,
+        'analysis':analysis,
+        'property_data':property_data,
+        'model_version': prediction.version
+    }
@@ -82,6 +82,20 @@ DATABASES = {
     }
 }
 
+# The 'predictions' cache holds model outputs keyed by feature hash + model version.
+# LocMemCache is per process; point it at Redis/Memcached to share hits across workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'predictions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'house-price-predictions',
+        'TIMEOUT': 24 * 3600,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -119,6 +133,72 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (property images, bulk prediction job inputs and outputs)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Kaggle train/test CSVs shipped next to the Django project
+DATASET_DIR = BASE_DIR.parent / 'dataset'
+# Source of the market insights snapshot; it is recomputed whenever this file's content changes
+MARKET_INSIGHTS_DATA = DATASET_DIR / 'train.csv'
+# Typed columnar copies of the CSVs (one directory per content hash), built on first read
+HOUSE_PRICE_DATASET_CACHE_DIR = DATASET_DIR / '.cache'
+
+# Prediction model
+# Load the model once per server process at startup (wsgi.py/asgi.py) instead of on the first request;
+# management commands always load it lazily
+HOUSE_PRICE_MODEL_PRELOAD = True
+# Versioned artifacts live in <dir>/<version>/model.pkl; the ACTIVE file names the version to serve
+HOUSE_PRICE_MODEL_DIR = BASE_DIR / 'dashboard' / 'artifacts'
+# Seconds between checks of the model directory for a new version (0 disables hot reload)
+HOUSE_PRICE_MODEL_WATCH_INTERVAL = 10
+# Previous versions kept in memory for instant rollback
+HOUSE_PRICE_MODEL_HISTORY = 3
+# Apply the exported preprocessing arrays with NumPy instead of running the sklearn ColumnTransformer
+HOUSE_PRICE_FAST_PATH = True
+# Coalesce concurrent single-property predictions into one model call
+HOUSE_PRICE_BATCHING = True
+HOUSE_PRICE_BATCH_MAX_SIZE = 64
+HOUSE_PRICE_BATCH_MAX_WAIT_MS = 2.0
+# Rows per chunk when model_prediction streams results (?format=ndjson or ?format=csv)
+HOUSE_PRICE_STREAM_CHUNK_ROWS = 10000
+# Cache alias for prediction results (None disables the cache), and the largest batch that uses it;
+# bigger batches (bulk uploads, repredict runs) are scored directly so they do not flush it
+HOUSE_PRICE_PREDICTION_CACHE = 'predictions'
+HOUSE_PRICE_PREDICTION_CACHE_MAX_ROWS = 64
+# Per-stage timings, batch sizes and cache counters served on /metrics (Prometheus text format)
+HOUSE_PRICE_METRICS = True
+# Background bulk prediction jobs: worker threads per process, rows per chunk, and how long a
+# running job may go without progress before another worker takes it over
+HOUSE_PRICE_JOB_WORKERS = 2
+HOUSE_PRICE_JOB_CHUNK_ROWS = 50000
+HOUSE_PRICE_JOB_STALE_SECONDS = 300
+# Seconds between sweeps that queue stale jobs in a server process (it also sweeps once at start; 0 disables)
+HOUSE_PRICE_JOB_SWEEP_SECONDS = 60
+# Score bulk job chunks in a process pool (1 = in-process). Each worker loads the model once.
+HOUSE_PRICE_PARALLEL_WORKERS = 1
+HOUSE_PRICE_PARALLEL_SHARD_ROWS = 10000
+HOUSE_PRICE_PARALLEL_START_METHOD = 'spawn'
+# Comparable sales index (train.csv + verified submissions), built in the background when a server
+# process starts (or on first use without PRELOAD).
+# Neighborhoods with at most BRUTE_FORCE_ROWS sales are searched with NumPy instead of a KD-tree;
+# a neighborhood is re-indexed once that many sales were added or removed since its last build.
+HOUSE_PRICE_COMPARABLES_PRELOAD = True
+HOUSE_PRICE_COMPARABLES_K = 5
+HOUSE_PRICE_COMPARABLES_BRUTE_FORCE_ROWS = 1024
+HOUSE_PRICE_COMPARABLES_REBUILD_ROWS = 1024
+# Async views (dashboard/async/...): threads for CPU-bound request work, requests allowed to wait
+# for one, and the Retry-After seconds sent with the 429 once both are used up
+HOUSE_PRICE_ASYNC_WORKERS = 4
+HOUSE_PRICE_ASYNC_QUEUE_DEPTH = 16
+HOUSE_PRICE_ASYNC_RETRY_AFTER = 1
+# Feature contributions: batches up to EXACT_ROWS get exact TreeSHAP, bigger ones the much cheaper
+# approximate (Saabas) attribution; requests above MAX_ROWS are refused. Global importance is the mean
+# |TreeSHAP| over IMPORTANCE_ROWS sampled train.csv rows, computed once per model version.
+HOUSE_PRICE_EXPLAIN_EXACT_ROWS = 100
+HOUSE_PRICE_EXPLAIN_MAX_ROWS = 10000
+HOUSE_PRICE_EXPLAIN_IMPORTANCE_ROWS = 500
+
 # for loggings
 # Add to your settings.py file
 
@@ -158,4 +238,36 @@ LOGGING = {
             'propagate': False,
         },
     },
-}
\ No newline at end of file
+}
+
+# HOUSE_PRICE_LOG_FORMAT=json switches to production logging: JSON lines written by a background
+# thread, one summary record per prediction request, and (with HOUSE_PRICE_LOG_LEVEL=DEBUG) step
+# detail for a sampled fraction of requests only
+HOUSE_PRICE_LOG_FORMAT = os.environ.get('HOUSE_PRICE_LOG_FORMAT', 'text')
+HOUSE_PRICE_LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('HOUSE_PRICE_LOG_DEBUG_SAMPLE_RATE', '0.01'))
+
+if HOUSE_PRICE_LOG_FORMAT == 'json':
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'filters': {
+            'sample_debug': {
+                '()': 'dashboard.log.DebugSampleFilter',
+                'rate': HOUSE_PRICE_LOG_DEBUG_SAMPLE_RATE,
+            },
+        },
+        'handlers': {
+            'queue': {
+                '()': 'dashboard.log.queue_handler',
+                'filename': 'dashboard_api.log',
+                'filters': ['sample_debug'],
+            },
+        },
+        'loggers': {
+            'dashboard': {
+                'handlers': ['queue'],
+                'level': os.environ.get('HOUSE_PRICE_LOG_LEVEL', 'INFO'),
+                'propagate': False,
+            },
+        },
+    }
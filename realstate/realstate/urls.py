@@ -17,9 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include
 from . import views
+from dashboard.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.index,name='index'),
     path('dashboard/',include('dashboard.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realstate.settings')
 
 application = get_wsgi_application()
+
+# server processes only: management commands never import this module
+from dashboard.apps import start_server  # noqa: E402
+
+start_server()